@@ -1,3 +1,4 @@
 def classFactory(iface):
-    from .year_range_filter import YearRangeFilterPlugin
+    # Only the lightweight entry point is imported at QGIS startup; the panel loads on first use
+    from .plugin import YearRangeFilterPlugin
     return YearRangeFilterPlugin(iface) 
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""Benchmark suite for the year filter path.
+
+Creates synthetic layers with random year intervals in memory, shapefile,
+GeoPackage and SpatiaLite storage, then times apply_filter, reset_filter,
+featureCount and a map render for several window widths. Results are
+written to JSON so regressions in the filter path show up between releases.
+
+Runs headless (offscreen Qt, no network). From the QGIS plugins directory,
+with the QGIS Python interpreter:
+
+    python -m year_range_filter.benchmark_year_range_filter --sizes 10000 100000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from qgis.core import (QgsApplication, QgsVectorLayer, QgsFields, QgsField, QgsFeature, QgsGeometry,
+                       QgsRectangle, QgsVectorFileWriter, QgsCoordinateReferenceSystem, QgsWkbTypes,
+                       QgsProject, QgsDataSourceUri, QgsMapSettings, QgsMapRendererSequentialJob, Qgis)
+from qgis.gui import QgsMapCanvas, QgsMessageBar
+from qgis.PyQt.QtCore import QVariant, QSize, QCoreApplication
+
+from .year_range_filter import YearRangeFilterDialog, MODE_SUBSET, MODE_RENDER
+from .index_manager import YearIndexManager
+
+STORAGE_KINDS = ["memory", "shapefile", "gpkg", "spatialite"]
+DEFAULT_SIZES = [10000, 100000, 1000000, 5000000]
+DEFAULT_WIDTHS = [1, 10, 50, 200]
+CRS = "EPSG:28992"
+
+
+class _HeadlessIface:
+    """Just enough of QgisInterface for the dialog to run outside the QGIS desktop"""
+
+    def __init__(self, layer):
+        self.layer = layer
+        self.canvas = QgsMapCanvas()
+        self.canvas.resize(QSize(800, 600))
+        self.bar = QgsMessageBar()
+
+    def activeLayer(self):
+        return self.layer
+
+    def mapCanvas(self):
+        return self.canvas
+
+    def messageBar(self):
+        return self.bar
+
+    def layerTreeView(self):
+        return None
+
+    def mainWindow(self):
+        return None
+
+
+def year_fields():
+    """Fields of the synthetic layers"""
+    fields = QgsFields()
+    fields.append(QgsField("beginjaar", QVariant.Int))
+    fields.append(QgsField("eindjaar", QVariant.Int))
+    return fields
+
+
+def synthetic_features(fields, count, seed):
+    """Yield square parcels with random [beginjaar, eindjaar] intervals"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        x = rng.uniform(180000, 200000)
+        y = rng.uniform(320000, 340000)
+        begin = rng.randint(1800, 2000)
+        end = begin + int(rng.expovariate(1 / 30.0))
+        feature = QgsFeature(fields)
+        feature.setGeometry(QgsGeometry.fromRect(QgsRectangle(x, y, x + 10, y + 10)))
+        feature.setAttributes([begin, end])
+        yield feature
+
+
+def create_layer(kind, count, directory, seed):
+    """Create a synthetic layer of `count` features in the given storage kind"""
+    fields = year_fields()
+    name = f"{kind}_{count}"
+    if kind == "memory":
+        layer = QgsVectorLayer(f"Polygon?crs={CRS}&field=beginjaar:integer&field=eindjaar:integer", name, "memory")
+        batch = []
+        for feature in synthetic_features(fields, count, seed):
+            batch.append(feature)
+            if len(batch) == 50000:
+                layer.dataProvider().addFeatures(batch)
+                batch = []
+        layer.dataProvider().addFeatures(batch)
+        return layer
+
+    extension = {"shapefile": "shp", "gpkg": "gpkg", "spatialite": "sqlite"}[kind]
+    path = os.path.join(directory, f"{name}.{extension}")
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = {"shapefile": "ESRI Shapefile", "gpkg": "GPKG", "spatialite": "SQLite"}[kind]
+    options.layerName = "parcels"
+    if kind == "spatialite":
+        options.datasourceOptions = ["SPATIALITE=YES"]
+    writer = QgsVectorFileWriter.create(path, fields, QgsWkbTypes.Polygon, QgsCoordinateReferenceSystem(CRS),
+                                        QgsProject.instance().transformContext(), options)
+    if writer.hasError() != QgsVectorFileWriter.NoError:
+        raise RuntimeError(f"Could not create {path}: {writer.errorMessage()}")
+    for feature in synthetic_features(fields, count, seed):
+        writer.addFeature(feature)
+    writer = None  # Closes the file
+
+    if kind == "spatialite":
+        uri = QgsDataSourceUri()
+        uri.setDatabase(path)
+        uri.setDataSource("", "parcels", "GEOMETRY")
+        return QgsVectorLayer(uri.uri(), name, "spatialite")
+    return QgsVectorLayer(path, name, "ogr")
+
+
+def wait_for_tasks():
+    """Process events until the QGIS task manager is idle"""
+    manager = QgsApplication.taskManager()
+    while manager.countActiveTasks() > 0:
+        QCoreApplication.processEvents()
+        time.sleep(0.001)
+    QCoreApplication.processEvents()
+
+
+def timed(func):
+    """Run func and return the elapsed wall time in seconds"""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def render(layer, extent):
+    """Render the layer offscreen, the same work a canvas refresh does"""
+    settings = QgsMapSettings()
+    settings.setLayers([layer])
+    settings.setDestinationCrs(layer.crs())
+    settings.setExtent(extent)
+    settings.setOutputSize(QSize(800, 600))
+    job = QgsMapRendererSequentialJob(settings)
+    job.start()
+    job.waitForFinished()
+
+
+def pin_filter_mode(dialog, mode):
+    """Use the given filter mode whatever the user last chose, without storing it in the settings"""
+    dialog.mode_combo.blockSignals(True)
+    dialog.mode_combo.setCurrentIndex(dialog.mode_combo.findData(mode))
+    dialog.mode_combo.blockSignals(False)
+
+
+def benchmark_layer(layer, widths, repeat, base_year=1850, mode=MODE_SUBSET):
+    """Time each filter stage on one layer in the given filter mode; returns a list of result records"""
+    records = []
+    iface = _HeadlessIface(layer)
+    QgsProject.instance().addMapLayer(layer)
+    extent = layer.extent()
+    feature_total = layer.featureCount()
+
+    def record(stage, width, runs):
+        records.append({
+            "provider": layer.providerType(),
+            "layer": layer.name(),
+            "features": feature_total,
+            "window_width": width,
+            "mode": mode,
+            "stage": stage,
+            "median_seconds": statistics.median(runs),
+            "runs": runs,
+        })
+
+    # Cold apply: the interval index does not exist yet and is built by the filter task
+    dialog = YearRangeFilterDialog(None, iface, YearIndexManager())
+    # The dialog restores the mode from QSettings; pin it so results compare between machines
+    pin_filter_mode(dialog, mode)
+    wait_for_tasks()
+    dialog.from_year.setValue(base_year)
+    dialog.to_year.setValue(base_year + widths[0] - 1)
+    record("apply_filter_cold", widths[0], [timed(lambda: (dialog.apply_filter(), wait_for_tasks()))])
+
+    for width in widths:
+        from_year, to_year = base_year, base_year + width - 1
+        expression = f'"beginjaar" <= {to_year} AND "eindjaar" >= {from_year}'
+
+        def apply():
+            dialog.from_year.setValue(from_year)
+            dialog.to_year.setValue(to_year)
+            dialog.apply_filter()
+            wait_for_tasks()
+
+        record("apply_filter", width, [timed(apply) for _ in range(repeat)])
+
+        reset_runs = []
+        for _ in range(repeat):
+            apply()
+            reset_runs.append(timed(dialog.reset_filter))
+        record("reset_filter", width, reset_runs)
+
+        layer.setSubsetString(expression)
+        record("featureCount", width, [timed(layer.featureCount) for _ in range(repeat)])
+        record("canvas_refresh", width, [timed(lambda: render(layer, extent)) for _ in range(repeat)])
+        layer.setSubsetString("")
+
+    dialog.close()
+    QgsProject.instance().removeMapLayer(layer.id())
+    return records
+
+
+def parse_args(argv):
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark the year range filter path")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--storage", nargs="+", choices=STORAGE_KINDS, default=STORAGE_KINDS)
+    parser.add_argument("--widths", nargs="+", type=int, default=DEFAULT_WIDTHS, help="Window widths in years")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mode", choices=[MODE_SUBSET, MODE_RENDER], default=MODE_SUBSET,
+                        help="Filter mode timed by apply_filter/reset_filter")
+    parser.add_argument("--seed", type=int, default=1842)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--data-dir", help="Keep the generated data here instead of a temporary directory")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Generate the layers, run all benchmarks and write the JSON report"""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    app = QgsApplication([], True)
+    app.initQgis()
+    try:
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = args.data_dir or tmp
+            os.makedirs(directory, exist_ok=True)
+            for size in args.sizes:
+                for kind in args.storage:
+                    start = time.perf_counter()
+                    layer = create_layer(kind, size, directory, args.seed)
+                    if not layer.isValid():
+                        raise RuntimeError(f"Synthetic {kind} layer with {size} features is not valid")
+                    print(f"{kind} {size}: created in {time.perf_counter() - start:.1f}s", flush=True)
+                    results.extend(benchmark_layer(layer, args.widths, args.repeat, mode=args.mode))
+
+        report = {
+            "meta": {
+                "qgis_version": Qgis.QGIS_VERSION,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "mode": args.mode,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.output}")
+        return 0
+    finally:
+        app.exitQgis()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
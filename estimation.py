@@ -0,0 +1,182 @@
+"""Approximate window counts with error bounds for layers too large to count exactly.
+
+Two estimators answer "about how many features overlap [from, to]" in
+milliseconds:
+
+- ReservoirSample keeps a uniform sample of (begin, end) pairs and scales
+  the matching fraction up to the population, with a Wilson score interval.
+- StatsEstimator reads PostgreSQL planner statistics (pg_stats) of the two
+  year columns. Features with ``begin > to`` and features with
+  ``end < from`` never overlap each other's ranges unless begin > end, so the
+  count is the population minus those two tails. Each tail comes from the
+  column's most common values plus its equi-depth histogram.
+
+Both return a CountEstimate.
+"""
+import math
+import random
+from bisect import bisect_right
+
+# Rows kept by a reservoir sample
+DEFAULT_SAMPLE_SIZE = 10000
+
+# z value of the 95% confidence level
+Z_95 = 1.96
+
+# Sampling margin of pg_stats: ANALYZE samples 30000 rows at the default statistics target
+PG_SAMPLE_MARGIN = Z_95 * math.sqrt(0.25 / 30000)
+
+
+class CountEstimate:
+    """An approximate count with lower and upper bounds"""
+
+    def __init__(self, value, low, high, exact=False):
+        self.value = value
+        self.low = low
+        self.high = high
+        self.exact = exact
+
+    def describe(self):
+        """'12345' for exact counts, else 'ongeveer 12300 (11900-12700)'"""
+        if self.exact:
+            return f"{self.value}"
+        return f"ongeveer {self.value} ({self.low}-{self.high})"
+
+
+class ReservoirSample:
+    """Uniform sample of at most `capacity` (begin, end) pairs (Algorithm R).
+
+    `population` is the total number of features when the sample is drawn
+    from part of the data (e.g. TABLESAMPLE); otherwise every added row is
+    counted and the estimate is exact while the sample holds all of them.
+    """
+
+    def __init__(self, capacity=DEFAULT_SAMPLE_SIZE, population=None, seed=None):
+        self.capacity = capacity
+        self.population = population
+        self.seen = 0
+        self._rows = []  # (begin, end); NULL years are kept so they dilute the matching fraction
+        self._rng = random.Random(seed)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, begin, end):
+        """Offer one row to the sample"""
+        self.seen += 1
+        if len(self._rows) < self.capacity:
+            self._rows.append((begin, end))
+            return
+        slot = self._rng.randrange(self.seen)
+        if slot < self.capacity:
+            self._rows[slot] = (begin, end)
+
+    def estimate(self, from_year, to_year, z=Z_95):
+        """CountEstimate of the features with begin <= to_year and end >= from_year"""
+        n = len(self._rows)
+        population = self.population if self.population is not None else self.seen
+        matches = sum(1 for begin, end in self._rows
+                      if begin is not None and end is not None and begin <= to_year and end >= from_year)
+        if n == 0 or (n == population and self.population is None):
+            return CountEstimate(matches, matches, matches, exact=True)
+        p = matches / n
+        # Wilson score interval, narrowed by the finite population correction
+        denominator = 1 + z * z / n
+        center = (p + z * z / (2 * n)) / denominator
+        half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+        if population > 1:
+            half_width *= math.sqrt(max(population - n, 0) / (population - 1))
+        low = max(0.0, center - half_width)
+        high = min(1.0, center + half_width)
+        return CountEstimate(round(p * population), math.floor(low * population), math.ceil(high * population))
+
+
+def parse_pg_array(value):
+    """Elements of a PostgreSQL array literal such as '{1800,1850,"a b"}' as strings; None for NULL"""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    text = str(value).strip()
+    if not (text.startswith("{") and text.endswith("}")):
+        raise ValueError(f"Not a PostgreSQL array: {text}")
+    elements, current, quoted, escaped = [], [], False, False
+    for char in text[1:-1]:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            elements.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current or elements:
+        elements.append("".join(current))
+    return elements
+
+
+class ColumnStats:
+    """Planner statistics of one numeric column: NULL fraction, most common values and histogram bounds"""
+
+    def __init__(self, null_frac, common_values, common_freqs, bounds):
+        self.null_frac = null_frac
+        self.common = list(zip(common_values, common_freqs))
+        self.bounds = list(bounds)
+        # Share of the rows described by the histogram: everything not NULL and not a common value
+        self.histogram_share = max(0.0, 1.0 - null_frac - sum(common_freqs))
+
+    @classmethod
+    def from_pg_stats(cls, null_frac, most_common_vals, most_common_freqs, histogram_bounds):
+        """Build from the text columns of a pg_stats row; raises ValueError for non-numeric columns"""
+        values = [float(v) for v in parse_pg_array(most_common_vals) or []]
+        freqs = [float(f) for f in parse_pg_array(most_common_freqs) or []]
+        bounds = [float(b) for b in parse_pg_array(histogram_bounds) or []]
+        return cls(float(null_frac or 0.0), values, freqs, bounds)
+
+    def fraction_le(self, x):
+        """(fraction of all rows with a value <= x, uncertainty of that fraction)"""
+        common = sum(freq for value, freq in self.common if value <= x)
+        if len(self.bounds) < 2:
+            # No histogram: the rows it would describe could lie on either side
+            return common + self.histogram_share / 2, self.histogram_share / 2
+        buckets = len(self.bounds) - 1
+        if x < self.bounds[0]:
+            return common, 0.0
+        if x >= self.bounds[-1]:
+            return common + self.histogram_share, 0.0
+        i = bisect_right(self.bounds, x) - 1
+        low, high = self.bounds[i], self.bounds[i + 1]
+        position = i + ((x - low) / (high - low) if high > low else 1.0)
+        # Values are only known to lie somewhere in their bucket
+        return common + self.histogram_share * position / buckets, self.histogram_share / buckets
+
+
+class StatsEstimator:
+    """Window counts from the planner statistics of the begin and end columns"""
+
+    def __init__(self, total_rows, begin_stats, end_stats, sampling_margin=PG_SAMPLE_MARGIN):
+        self.total_rows = total_rows
+        self.begin_stats = begin_stats
+        self.end_stats = end_stats
+        self.sampling_margin = sampling_margin
+
+    def estimate(self, from_year, to_year):
+        """CountEstimate of begin <= to_year AND end >= from_year; None when from_year > to_year"""
+        if from_year > to_year:
+            return None  # Needs both values per row, which the column statistics do not relate
+        begin_null, end_null = self.begin_stats.null_frac, self.end_stats.null_frac
+        begin_le, begin_error = self.begin_stats.fraction_le(to_year)
+        end_lt, end_error = self.end_stats.fraction_le(from_year - 1)
+        begins_after = 1.0 - begin_null - begin_le
+        # Rows with NULL in either column never match; assume the NULLs mostly coincide
+        fraction = 1.0 - max(begin_null, end_null) - begins_after - end_lt
+        error = begin_error + end_error + self.sampling_margin
+        low = min(max(0.0, fraction - error - min(begin_null, end_null)), 1.0)
+        high = min(max(0.0, fraction + error), 1.0)
+        fraction = min(max(fraction, low), high)
+        return CountEstimate(round(fraction * self.total_rows), math.floor(low * self.total_rows),
+                             math.ceil(high * self.total_rows))
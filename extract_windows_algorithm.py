@@ -0,0 +1,84 @@
+"""Processing algorithm extracting several year windows from a layer in one pass"""
+from qgis.core import (QgsProcessingAlgorithm, QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterField, QgsProcessingParameterString,
+                       QgsProcessingParameterEnum, QgsProcessingParameterFolderDestination,
+                       QgsProcessingOutputMultipleLayers, QgsProcessingOutputNumber,
+                       QgsProcessingException, QgsProcessing)
+
+from .multi_window import parse_windows
+from .window_export import export_year_windows
+
+
+class ExtractYearWindowsAlgorithm(QgsProcessingAlgorithm):
+    """Writes one output file per year window, reading the input only once"""
+
+    INPUT = 'INPUT'
+    BEGIN_FIELD = 'BEGIN_FIELD'
+    END_FIELD = 'END_FIELD'
+    WINDOWS = 'WINDOWS'
+    FORMAT = 'FORMAT'
+    OUTPUT_FOLDER = 'OUTPUT_FOLDER'
+    OUTPUT_LAYERS = 'OUTPUT_LAYERS'
+    FEATURE_COUNT = 'FEATURE_COUNT'
+
+    FORMATS = ['GPKG', 'FlatGeobuf', 'CSV', 'ESRI Shapefile']
+
+    def name(self):
+        return 'extractyearwindows'
+
+    def displayName(self):
+        return 'Jaarvensters extraheren'
+
+    def group(self):
+        return 'Jaarfilter'
+
+    def groupId(self):
+        return 'yearfilter'
+
+    def shortHelpString(self):
+        return ("Schrijft voor elk jaarvenster (bijv. '1840-1849;1850-1859') de objecten met "
+                "begin <= eind van het venster en eind >= begin van het venster naar een eigen bestand. "
+                "De invoer wordt maar één keer gelezen, ongeacht het aantal vensters.")
+
+    def createInstance(self):
+        return ExtractYearWindowsAlgorithm()
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.INPUT, 'Invoerlaag', [QgsProcessing.TypeVector]))
+        self.addParameter(QgsProcessingParameterField(
+            self.BEGIN_FIELD, 'Begin jaar veld', 'beginjaar', self.INPUT))
+        self.addParameter(QgsProcessingParameterField(
+            self.END_FIELD, 'Eind jaar veld', 'eindjaar', self.INPUT))
+        self.addParameter(QgsProcessingParameterString(
+            self.WINDOWS, 'Jaarvensters (bijv. 1840-1849;1850-1859)'))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.FORMAT, 'Uitvoerformaat', self.FORMATS, defaultValue=0))
+        self.addParameter(QgsProcessingParameterFolderDestination(
+            self.OUTPUT_FOLDER, 'Uitvoermap'))
+        self.addOutput(QgsProcessingOutputMultipleLayers(self.OUTPUT_LAYERS, 'Uitvoerbestanden'))
+        self.addOutput(QgsProcessingOutputNumber(self.FEATURE_COUNT, 'Totaal aantal geschreven objecten'))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        if source is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+        begin_field = self.parameterAsString(parameters, self.BEGIN_FIELD, context)
+        end_field = self.parameterAsString(parameters, self.END_FIELD, context)
+        driver = self.FORMATS[self.parameterAsEnum(parameters, self.FORMAT, context)]
+        output_folder = self.parameterAsString(parameters, self.OUTPUT_FOLDER, context)
+        try:
+            windows = parse_windows(self.parameterAsString(parameters, self.WINDOWS, context))
+            result = export_year_windows(source, begin_field, end_field, windows, output_folder,
+                                         driver=driver, feedback=feedback,
+                                         transform_context=context.transformContext())
+        except (ValueError, RuntimeError) as e:
+            raise QgsProcessingException(str(e))
+
+        for (from_year, to_year), (path, count) in result.items():
+            feedback.pushInfo(f"{from_year}-{to_year}: {count} objecten -> {path}")
+        return {
+            self.OUTPUT_FOLDER: output_folder,
+            self.OUTPUT_LAYERS: [path for path, _ in result.values()],
+            self.FEATURE_COUNT: sum(count for _, count in result.values()),
+        }
@@ -0,0 +1,66 @@
+"""Headless entry point: extract year windows from a data source without the QGIS GUI.
+
+Run from the QGIS plugins directory (or with it on PYTHONPATH), using the
+Python interpreter that ships with QGIS:
+
+    python -m year_range_filter.extract_windows_cli percelen.shp --decades 1800 1999 --output-dir slices
+
+The same algorithm is available to qgis_process as
+``yearrangefilter:extractyearwindows`` once the plugin is enabled.
+"""
+import argparse
+import logging
+import os
+import sys
+
+from qgis.core import QgsApplication, QgsVectorLayer, QgsProject, QgsFeedback
+
+from .multi_window import parse_windows
+from .window_export import decade_windows, export_year_windows, DRIVER_EXTENSIONS
+
+
+def parse_args(argv):
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(description="Extract year windows from a vector data source in one pass")
+    parser.add_argument("source", help="Vector data source (file path or provider URI)")
+    parser.add_argument("--provider", default="ogr", help="QGIS data provider (default: ogr)")
+    parser.add_argument("--begin-field", default="beginjaar")
+    parser.add_argument("--end-field", default="eindjaar")
+    windows = parser.add_mutually_exclusive_group(required=True)
+    windows.add_argument("--windows", help="Year windows, e.g. 1840-1849;1850-1859")
+    windows.add_argument("--decades", nargs=2, type=int, metavar=("FIRST", "LAST"),
+                         help="One window per decade from FIRST to LAST")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--format", default="GPKG", choices=sorted(DRIVER_EXTENSIONS))
+    parser.add_argument("--prefix", default="", help="Prefix for the output file names")
+    parser.add_argument("--fields", nargs="+", help="Attributes to export (default: all)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Initialise QGIS without a GUI, run the extraction and print one line per window"""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    windows = parse_windows(args.windows) if args.windows else decade_windows(*args.decades)
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QgsApplication([], False)
+    app.initQgis()
+    try:
+        layer = QgsVectorLayer(args.source, "source", args.provider)
+        if not layer.isValid():
+            print(f"Could not open {args.source}", file=sys.stderr)
+            return 1
+        result = export_year_windows(layer, args.begin_field, args.end_field, windows, args.output_dir,
+                                     driver=args.format, prefix=args.prefix, feedback=QgsFeedback(),
+                                     transform_context=QgsProject.instance().transformContext(),
+                                     attributes=args.fields)
+        for (from_year, to_year), (path, count) in result.items():
+            print(f"{from_year}-{to_year}\t{count}\t{path}")
+        return 0
+    finally:
+        app.exitQgis()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
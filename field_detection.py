@@ -0,0 +1,65 @@
+"""Heuristic detection of the begin and end year fields of a layer.
+
+Works on (field name, kind) pairs, where kind is "int", "text" or "date"
+as returned by layer_utils.field_kind(), so it has no QGIS dependency.
+Names are compared lower-cased with separators removed, so "Begin_Jaar",
+"beginjaar" and "begin-jaar" all look the same.
+"""
+import re
+
+# Names that are known to hold the begin or end of a feature's lifetime, best first
+BEGIN_NAMES = ["beginjaar", "startjaar", "vanjaar", "jaarvan", "beginyear", "startyear", "yearfrom", "fromyear",
+               "begindatum", "startdatum", "datumvan", "begindate", "startdate", "datefrom", "validfrom",
+               "beginkaart", "bouwjaar"]
+END_NAMES = ["eindjaar", "stopjaar", "totjaar", "jaartot", "endyear", "stopyear", "yearto", "toyear",
+             "einddatum", "stopdatum", "datumtot", "enddate", "stopdate", "dateto", "validto",
+             "eindkaart", "sloopjaar"]
+
+# Name fragments hinting at the begin or end of a period, and at a year or date value
+BEGIN_TOKENS = ("begin", "start", "van", "from", "sinds", "since")
+END_TOKENS = ("eind", "einde", "end", "stop", "tot", "until", "to")
+TIME_TOKENS = ("jaar", "year", "datum", "date", "jr", "yr")
+
+# Field kinds that can hold a year
+YEAR_KINDS = ("int", "text", "date")
+
+
+def _normalise(name):
+    """Lower-case name without separators"""
+    return re.sub(r"[^0-9a-z]", "", name.lower())
+
+
+def _score(name, kind, known_names, tokens):
+    """How likely a field is to be the begin (or end) field; 0 means not a candidate"""
+    if kind not in YEAR_KINDS:
+        return 0
+    normalised = _normalise(name)
+    if normalised in known_names:
+        return 200 - known_names.index(normalised)
+    parts = [part for part in re.split(r"[^0-9a-z]+", name.lower()) if part]
+    has_side = any(part in tokens for part in parts) or any(normalised.startswith(token) for token in tokens
+                                                           if len(token) > 3)
+    has_time = any(token in normalised for token in TIME_TOKENS)
+    if not has_side:
+        return 0
+    score = 50 + (30 if has_time else 0)
+    # Text fields only qualify when their name says they hold a year or date
+    if kind == "text":
+        return score - 20 if has_time else 0
+    return score + 10
+
+
+def rank_year_fields(fields):
+    """Return (begin candidates, end candidates): field names from [(name, kind), ...], best first"""
+    begin = [(_score(name, kind, BEGIN_NAMES, BEGIN_TOKENS), i, name) for i, (name, kind) in enumerate(fields)]
+    end = [(_score(name, kind, END_NAMES, END_TOKENS), i, name) for i, (name, kind) in enumerate(fields)]
+    rank = lambda scored: [name for score, _, name in sorted(scored, key=lambda s: (-s[0], s[1])) if score > 0]
+    return rank(begin), rank(end)
+
+
+def detect_year_fields(fields):
+    """Best (begin field, end field) pair of distinct fields, with None where nothing qualifies"""
+    begin_candidates, end_candidates = rank_year_fields(fields)
+    begin = begin_candidates[0] if begin_candidates else None
+    end = next((name for name in end_candidates if name != begin), None)
+    return begin, end
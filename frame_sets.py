@@ -0,0 +1,77 @@
+"""Precomputed feature changes between the frames of a temporal animation.
+
+For a sequence of year windows (one per animation frame) the features that
+enter and leave the window between consecutive frames are computed ahead
+of time from the interval index. Stepping through the animation is then a
+dictionary lookup plus adding and removing those features, with no
+expression evaluated per frame.
+"""
+import datetime
+
+
+def year_window(begin, end, include_end=False):
+    """(from year, to year) covered by a datetime range; an exclusive end on 1 January belongs to the year before"""
+    from_year = begin.year
+    to_year = end.year
+    if not include_end and (end.month, end.day, end.time()) == (1, 1, datetime.time()) and to_year > from_year:
+        to_year -= 1
+    return from_year, max(from_year, to_year)
+
+
+def frame_windows(ranges):
+    """Year windows of consecutive frames given as (begin, end, include_end); repeated windows are merged"""
+    windows = []
+    for begin, end, include_end in ranges:
+        window = year_window(begin, end, include_end)
+        if not windows or windows[-1] != window:
+            windows.append(window)
+    return windows
+
+
+class FrameSets:
+    """Per-frame feature changes for a list of windows, answering like the interval index it was built from.
+
+    feature_ids() and window_delta() have the signatures of
+    YearIntervalIndex, so a ScrubSession can use a FrameSets as its index:
+    steps between neighbouring frames come from the precomputed deltas and
+    any other step is passed on to the interval index.
+    """
+
+    def __init__(self, index, windows, is_canceled=None):
+        """Compute the deltas between consecutive windows; stops early (complete=False) when is_canceled() is true"""
+        self.index = index
+        self.windows = [tuple(window) for window in windows]
+        self._position = {}
+        self._deltas = []  # (entered, left) moving from windows[n] to windows[n + 1]
+        self.complete = True
+        for n, window in enumerate(self.windows):
+            self._position.setdefault(window, n)
+            if n == 0:
+                continue
+            if is_canceled is not None and n % 100 == 0 and is_canceled():
+                self.complete = False
+                break
+            entered, left = index.window_delta(self.windows[n - 1], window)
+            self._deltas.append((frozenset(entered), frozenset(left)))
+
+    def __len__(self):
+        """Number of frames"""
+        return len(self.windows)
+
+    def feature_ids(self, from_year, to_year):
+        """Feature ids in a window, from the interval index"""
+        return self.index.feature_ids(from_year, to_year)
+
+    def window_delta(self, old_window, new_window):
+        """(entered, left) fid sets between two windows; precomputed when they are neighbouring frames"""
+        old, new = self._position.get(tuple(old_window)), self._position.get(tuple(new_window))
+        if old is not None and new is not None:
+            if new == old:
+                return set(), set()
+            if new == old + 1 and old < len(self._deltas):
+                entered, left = self._deltas[old]
+                return set(entered), set(left)
+            if new == old - 1 and new < len(self._deltas):
+                entered, left = self._deltas[new]
+                return set(left), set(entered)
+        return self.index.window_delta(old_window, new_window)
@@ -0,0 +1,57 @@
+"""Least-recently-used cache of rendered images bounded by a memory budget"""
+from collections import OrderedDict
+
+
+def _image_bytes(image):
+    """Memory used by a QImage"""
+    return image.sizeInBytes()
+
+
+class LruImageCache:
+    """Keeps the most recently used images while their total size fits the budget"""
+
+    def __init__(self, budget_bytes, size_of=_image_bytes):
+        self.budget_bytes = budget_bytes
+        self._size_of = size_of
+        self._items = OrderedDict()  # key -> (image, size), least recently used first
+        self.used_bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """Return the image for key and mark it as most recently used, or None"""
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, image):
+        """Store an image, evicting the least recently used ones to stay within the budget.
+
+        An image larger than the whole budget is not stored.
+        """
+        size = self._size_of(image)
+        self.discard(key)
+        if size > self.budget_bytes:
+            return
+        self._items[key] = (image, size)
+        self.used_bytes += size
+        while self.used_bytes > self.budget_bytes:
+            _, (_, evicted_size) = self._items.popitem(last=False)
+            self.used_bytes -= evicted_size
+
+    def discard(self, key):
+        """Remove an image if it is cached"""
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.used_bytes -= item[1]
+
+    def clear(self):
+        """Drop every image"""
+        self._items.clear()
+        self.used_bytes = 0
@@ -0,0 +1,251 @@
+"""Per-layer cache of interval indexes, histograms, snapshots, spatio-temporal indexes and count estimators"""
+import hashlib
+import logging
+import os
+from contextlib import contextmanager
+
+from qgis.core import QgsProviderRegistry
+
+from .interval_index import YearIntervalIndex
+from .layer_utils import unfiltered_source, iter_year_rows, to_year, to_ordinal
+from .year_histogram import YearHistogram, file_signature, load_histogram, save_histogram
+from .year_snapshot import REMOTE_PROVIDERS
+
+
+class YearIndexManager:
+    """Builds one interval index and histogram per (layer, begin field, end field) and drops them when the layer changes"""
+
+    # Layer signals after which the cached values can no longer be trusted
+    INVALIDATING_SIGNALS = ("dataChanged", "featureAdded", "featureDeleted", "attributeValueChanged")
+
+    def __init__(self):
+        self.logger = logging.getLogger('YearRangeFilter')
+        self._indexes = {}  # (layer id, begin field, end field) -> YearIntervalIndex
+        self._histograms = {}  # (layer id, begin field, end field) -> YearHistogram
+        self._snapshots = {}  # (layer id, begin field, end field) -> YearSnapshot
+        self._spatiotemporal = {}  # (layer id, begin field, end field) -> SpatioTemporalIndex
+        self._estimators = {}  # (layer id, begin field, end field) -> StatsEstimator or ReservoirSample
+        self._watched = {}  # layer id -> (layer, [(signal, slot), ...])
+        self._ignored = set()  # layer ids whose change signals are currently ignored
+
+    @staticmethod
+    def _index_key(layer, begin_field, end_field, precision):
+        """Cache key of an index; "year" indexes hold years, "day" indexes date ordinals"""
+        key = (layer.id(), begin_field, end_field)
+        return key if precision == "year" else key + (precision,)
+
+    def index_for(self, layer, begin_field, end_field, precision="year"):
+        """Return the index for the layer, building it with one provider scan if needed"""
+        key = self._index_key(layer, begin_field, end_field, precision)
+        index = self._indexes.get(key)
+        if index is None:
+            self.logger.debug(f"Building {precision} interval index for layer {layer.name()} "
+                              f"({begin_field}, {end_field})")
+            source = unfiltered_source(layer)
+            convert = to_ordinal if precision == "day" else to_year
+            index = YearIntervalIndex(iter_year_rows(source, layer.fields(), begin_field, end_field, convert))
+            self.logger.debug(f"Interval index for {layer.name()} holds {len(index)} features, "
+                              f"{index.skipped} skipped with NULL values")
+            self.store(layer, begin_field, end_field, index, precision)
+        return index
+
+    def cached_index(self, layer, begin_field, end_field, precision="year"):
+        """Return the index if one has already been built, without scanning the layer"""
+        return self._indexes.get(self._index_key(layer, begin_field, end_field, precision))
+
+    def store(self, layer, begin_field, end_field, index, precision="year"):
+        """Register an index built elsewhere (e.g. by a background task)"""
+        self._indexes[self._index_key(layer, begin_field, end_field, precision)] = index
+        self._watch(layer)
+
+    def cached_histogram(self, layer, begin_field, end_field):
+        """Return the histogram from memory, the on-disk cache or a cached index; None if it must be built"""
+        key = (layer.id(), begin_field, end_field)
+        histogram = self._histograms.get(key)
+        if histogram is not None:
+            return histogram
+        location = self._histogram_cache_location(layer)
+        if location:
+            cache_file, entry_key, signature = location
+            histogram = load_histogram(cache_file, f"{entry_key}|{begin_field}|{end_field}", signature)
+            if histogram is not None:
+                self.logger.debug(f"Loaded year histogram for {layer.name()} from {cache_file}")
+        if histogram is None:
+            rows_source = self._indexes.get(key, self._snapshots.get(key))
+            if rows_source is None:
+                return None
+            histogram = YearHistogram.from_rows(rows_source.rows())
+        self._histograms[key] = histogram
+        self._watch(layer)
+        return histogram
+
+    def store_histogram(self, layer, begin_field, end_field, histogram):
+        """Keep a histogram built elsewhere and persist it next to the data source"""
+        self._histograms[(layer.id(), begin_field, end_field)] = histogram
+        self._watch(layer)
+        location = self._histogram_cache_location(layer)
+        if location:
+            cache_file, entry_key, signature = location
+            try:
+                save_histogram(cache_file, f"{entry_key}|{begin_field}|{end_field}", signature, histogram)
+                self.logger.debug(f"Saved year histogram for {layer.name()} to {cache_file}")
+            except OSError as e:
+                self.logger.warning(f"Could not save year histogram to {cache_file}: {str(e)}")
+
+    @staticmethod
+    def is_remote(layer):
+        """True for layers whose provider answers every request over the network"""
+        return layer.providerType() in REMOTE_PROVIDERS
+
+    def cached_snapshot(self, layer, begin_field, end_field):
+        """Return the year snapshot of a remote layer, or None if none has been taken yet"""
+        return self._snapshots.get((layer.id(), begin_field, end_field))
+
+    def store_snapshot(self, layer, begin_field, end_field, snapshot):
+        """Keep a snapshot taken by a background task; a histogram derived from the previous one is dropped"""
+        key = (layer.id(), begin_field, end_field)
+        if key in self._snapshots:
+            self._histograms.pop(key, None)
+        self._snapshots[key] = snapshot
+        self._watch(layer)
+
+    def cached_estimator(self, layer, begin_field, end_field):
+        """Return the count estimator of the layer, or None if it has not been prepared"""
+        return self._estimators.get((layer.id(), begin_field, end_field))
+
+    def store_estimator(self, layer, begin_field, end_field, estimator):
+        """Keep an estimator prepared by a background task"""
+        self._estimators[(layer.id(), begin_field, end_field)] = estimator
+        self._watch(layer)
+
+    def cached_spatiotemporal(self, layer, begin_field, end_field):
+        """Return the spatio-temporal index of the layer, or None if it has to be (re)built"""
+        key = (layer.id(), begin_field, end_field)
+        index = self._spatiotemporal.get(key)
+        if index is not None and index.stale:
+            # Feature ids may have changed with a commit or rollback
+            index.detach()
+            del self._spatiotemporal[key]
+            return None
+        return index
+
+    def store_spatiotemporal(self, layer, begin_field, end_field, index):
+        """Keep a spatio-temporal index built by a background task; it follows the layer's edits itself"""
+        key = (layer.id(), begin_field, end_field)
+        previous = self._spatiotemporal.get(key)
+        if previous is not None:
+            previous.detach()
+        index.attach(layer)
+        self._spatiotemporal[key] = index
+        self._watch(layer)
+
+    def _histogram_cache_location(self, layer):
+        """(cache file, entry key, source signature) for file-based layers, else None.
+
+        Also None while the layer has uncommitted edits: histograms are read
+        through the layer's edit buffer, with any subset string lifted (see
+        unfiltered_source), and the file's signature does not cover those edits.
+        """
+        if layer.isEditable() and layer.isModified():
+            return None
+        parts = QgsProviderRegistry.instance().decodeUri(layer.providerType(), layer.source()) or {}
+        path = parts.get("path")
+        if not path or not os.path.isfile(path):
+            return None
+        # Shapefile attributes live in the .dbf, so its changes must invalidate the cache too
+        watched = [path]
+        if path.lower().endswith(".shp"):
+            watched.append(os.path.splitext(path)[0] + ".dbf")
+        signature = file_signature(watched)
+
+        data_dir = os.path.dirname(path)
+        if os.access(data_dir, os.W_OK):
+            cache_file = path + ".yearhist.json"
+        else:
+            # Read-only data directory: keep the cache in the plugin directory instead
+            cache_dir = os.path.join(os.path.dirname(__file__), 'cache')
+            os.makedirs(cache_dir, exist_ok=True)
+            digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+            cache_file = os.path.join(cache_dir, f"{digest}.yearhist.json")
+        return cache_file, str(parts.get("layerName") or parts.get("layerId") or ""), signature
+
+    def invalidate(self, layer_id, reloaded=False):
+        """Drop every index, histogram and snapshot built for the given layer.
+
+        The spatio-temporal index follows edits itself, so it is only marked
+        stale when `reloaded`: after dataChanged, where a reload or a write
+        past the edit buffer may have changed any feature id or geometry.
+        """
+        if layer_id in self._ignored:
+            return
+        if reloaded:
+            for key, index in self._spatiotemporal.items():
+                if key[0] == layer_id:
+                    index.stale = True
+        stale = [key for key in self._indexes if key[0] == layer_id]
+        for key in stale:
+            del self._indexes[key]
+        stale_histograms = [key for key in self._histograms if key[0] == layer_id]
+        for key in stale_histograms:
+            del self._histograms[key]
+        stale_snapshots = [key for key in self._snapshots if key[0] == layer_id]
+        for key in stale_snapshots:
+            del self._snapshots[key]
+        for key in [key for key in self._estimators if key[0] == layer_id]:
+            del self._estimators[key]
+        if stale or stale_histograms or stale_snapshots:
+            self.logger.debug(f"Interval index invalidated for layer id {layer_id}")
+
+    @contextmanager
+    def ignoring_changes(self, layer):
+        """Ignore change signals emitted while the plugin itself touches the layer.
+
+        Providers emit dataChanged when the subset string changes, but the
+        indexes are built over the unfiltered data so they stay valid.
+        """
+        self._ignored.add(layer.id())
+        try:
+            yield
+        finally:
+            self._ignored.discard(layer.id())
+
+    def _watch(self, layer):
+        """Connect the layer's change signals to invalidate()"""
+        layer_id = layer.id()
+        if layer_id in self._watched:
+            return
+        connections = []
+        for name in self.INVALIDATING_SIGNALS:
+            slot = lambda *args, layer_id=layer_id, name=name: self.invalidate(layer_id, name == "dataChanged")
+            getattr(layer, name).connect(slot)
+            connections.append((name, slot))
+        forget = lambda layer_id=layer_id: self._forget(layer_id)
+        layer.willBeDeleted.connect(forget)
+        connections.append(("willBeDeleted", forget))
+        self._watched[layer_id] = (layer, connections)
+
+    def _forget(self, layer_id):
+        """Drop indexes and signal bookkeeping for a layer that is being deleted"""
+        self._ignored.discard(layer_id)
+        self.invalidate(layer_id)
+        for key in [key for key in self._spatiotemporal if key[0] == layer_id]:
+            self._spatiotemporal.pop(key).detach()
+        self._watched.pop(layer_id, None)
+
+    def clear(self):
+        """Disconnect from all layers and drop every index"""
+        for layer, connections in self._watched.values():
+            for name, slot in connections:
+                try:
+                    getattr(layer, name).disconnect(slot)
+                except (TypeError, RuntimeError):
+                    pass  # Layer already deleted or slot already disconnected
+        self._watched.clear()
+        for index in self._spatiotemporal.values():
+            index.detach()
+        self._spatiotemporal.clear()
+        self._indexes.clear()
+        self._histograms.clear()
+        self._snapshots.clear()
+        self._estimators.clear()
+        self._ignored.clear()
@@ -0,0 +1,183 @@
+"""In-memory interval index over begin/end year values.
+
+The index answers the two questions the filter dialog keeps asking about a
+layer - "how many features overlap [from, to]" and "which features overlap
+[from, to]" - without going back to the data provider. Counts come from two
+binary searches over sorted begin/end arrays (O(log n)); feature id sets come
+from a centered interval tree (O(log n + k)).
+
+The match rule is the same one the subset string uses:
+``begin <= to AND end >= from``.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class _Node:
+    """Node of the centered interval tree, holding the intervals that contain its center"""
+    __slots__ = ("center", "left", "right", "begins", "begin_idx", "ends", "end_idx")
+
+
+class YearIntervalIndex:
+    """Static index over (fid, begin, end) rows"""
+
+    def __init__(self, rows):
+        """Build the index from an iterable of (fid, begin, end) tuples.
+
+        Rows with a missing begin or end value are skipped, in the same way a
+        comparison against NULL never matches in the provider. Rows with
+        begin > end cannot be stored as intervals and are kept aside in a
+        small list that is checked linearly.
+        """
+        self._fids = array("q")
+        self._begins = array("q")
+        self._ends = array("q")
+        self._reversed = []  # (fid, begin, end) rows where begin > end
+        self.skipped = 0
+
+        for fid, begin, end in rows:
+            if begin is None or end is None:
+                self.skipped += 1
+                continue
+            if begin > end:
+                self._reversed.append((fid, begin, end))
+                continue
+            self._fids.append(fid)
+            self._begins.append(begin)
+            self._ends.append(end)
+
+        # Row indices ordered by begin/end, with the matching sorted values for bisecting
+        self._begin_order = array("q", sorted(range(len(self._fids)), key=self._begins.__getitem__))
+        self._sorted_begins = array("q", (self._begins[i] for i in self._begin_order))
+        self._end_order = array("q", sorted(range(len(self._fids)), key=self._ends.__getitem__))
+        self._sorted_ends = array("q", (self._ends[i] for i in self._end_order))
+        self._root = self._build(list(range(len(self._fids))))
+
+    def __len__(self):
+        """Number of indexed features (rows with NULL values excluded)"""
+        return len(self._fids) + len(self._reversed)
+
+    def rows(self):
+        """Yield the indexed (fid, begin, end) rows"""
+        yield from zip(self._fids, self._begins, self._ends)
+        yield from self._reversed
+
+    def _build(self, indices):
+        """Build the interval tree for the given row indices"""
+        if not indices:
+            return None
+        begins = self._begins
+        ends = self._ends
+
+        # The median begin value guarantees that both subtrees hold at most
+        # half of the intervals, which keeps the tree depth at O(log n).
+        sorted_begins = sorted(begins[i] for i in indices)
+        center = sorted_begins[len(sorted_begins) // 2]
+
+        here, left, right = [], [], []
+        for i in indices:
+            if ends[i] < center:
+                left.append(i)
+            elif begins[i] > center:
+                right.append(i)
+            else:
+                here.append(i)
+
+        node = _Node()
+        node.center = center
+        by_begin = sorted(here, key=begins.__getitem__)
+        node.begins = array("q", (begins[i] for i in by_begin))
+        node.begin_idx = array("q", by_begin)
+        by_end = sorted(here, key=ends.__getitem__)
+        node.ends = array("q", (ends[i] for i in by_end))
+        node.end_idx = array("q", by_end)
+        node.left = self._build(left)
+        node.right = self._build(right)
+        return node
+
+    def _overlapping(self, lo, hi):
+        """Collect row indices of intervals overlapping [lo, hi] (lo <= hi)"""
+        out = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if hi < node.center:
+                # Every interval here ends at or after the center, so only begin matters
+                k = bisect_right(node.begins, hi)
+                out.extend(node.begin_idx[:k])
+                stack.append(node.left)
+            elif lo > node.center:
+                # Every interval here begins at or before the center, so only end matters
+                k = bisect_left(node.ends, lo)
+                out.extend(node.end_idx[k:])
+                stack.append(node.right)
+            else:
+                out.extend(node.begin_idx)
+                stack.append(node.left)
+                stack.append(node.right)
+        return out
+
+    def _reversed_matches(self, from_year, to_year):
+        """Yield fids of begin > end rows that satisfy the filter rule"""
+        for fid, begin, end in self._reversed:
+            if begin <= to_year and end >= from_year:
+                yield fid
+
+    def count(self, from_year, to_year):
+        """Number of features with begin <= to_year and end >= from_year"""
+        if from_year <= to_year:
+            # For a valid interval, end < from_year implies begin <= to_year,
+            # so the second set is a subset of the first one.
+            matched = (bisect_right(self._sorted_begins, to_year)
+                       - bisect_left(self._sorted_ends, from_year))
+        else:
+            matched = len(self._containing(to_year, from_year))
+        return matched + sum(1 for _ in self._reversed_matches(from_year, to_year))
+
+    def _containing(self, lo, hi):
+        """Row indices of intervals that contain the whole of [lo, hi]"""
+        ends = self._ends
+        return [i for i in self._overlapping(lo, lo) if ends[i] >= hi]
+
+    def feature_ids(self, from_year, to_year):
+        """Set of fids with begin <= to_year and end >= from_year"""
+        if from_year <= to_year:
+            rows = self._overlapping(from_year, to_year)
+        else:
+            rows = self._containing(to_year, from_year)
+        fids = self._fids
+        result = {fids[i] for i in rows}
+        result.update(self._reversed_matches(from_year, to_year))
+        return result
+
+    def window_delta(self, old_window, new_window):
+        """Return (entered, left) fid sets when moving from one (from, to) window to another.
+
+        A feature can only change state if its begin lies between the two
+        'to' values or its end lies between the two 'from' values, so only
+        those rows are looked at: the cost is O(log n + changed features),
+        independent of the size of either window.
+        """
+        old_from, old_to = old_window
+        new_from, new_to = new_window
+        candidates = set()
+        low, high = sorted((old_to, new_to))
+        candidates.update(self._begin_order[bisect_right(self._sorted_begins, low):
+                                            bisect_right(self._sorted_begins, high)])
+        low, high = sorted((old_from, new_from))
+        candidates.update(self._end_order[bisect_left(self._sorted_ends, low):
+                                          bisect_left(self._sorted_ends, high)])
+
+        entered, left = set(), set()
+        fids, begins, ends = self._fids, self._begins, self._ends
+        rows = [(fids[i], begins[i], ends[i]) for i in candidates]
+        for fid, begin, end in rows + self._reversed:
+            was_in = begin <= old_to and end >= old_from
+            is_in = begin <= new_to and end >= new_from
+            if is_in and not was_in:
+                entered.add(fid)
+            elif was_in and not is_in:
+                left.add(fid)
+        return entered, left
@@ -0,0 +1,239 @@
+"""Helpers for reading begin/end year values from vector layers"""
+import datetime
+import re
+
+from qgis.core import QgsFeatureRequest, QgsVectorLayerFeatureSource, NULL
+from qgis.PyQt.QtCore import QVariant, QDate, QDateTime
+
+from .field_detection import rank_year_fields
+
+# Layer custom properties holding the year fields chosen for a layer
+BEGIN_FIELD_PROPERTY = "YearRangeFilter/beginField"
+END_FIELD_PROPERTY = "YearRangeFilter/endField"
+# Layer custom property holding the subset string the plugin last set on a layer
+APPLIED_SUBSET_PROPERTY = "YearRangeFilter/appliedSubset"
+
+# Default field names, used when a layer has neither a stored choice nor a detectable candidate
+DEFAULT_BEGIN_FIELD = "beginjaar"
+DEFAULT_END_FIELD = "eindjaar"
+
+_INT_TYPES = (QVariant.Int, QVariant.UInt, QVariant.LongLong, QVariant.ULongLong, QVariant.Double)
+_DATE_TYPES = (QVariant.Date, QVariant.DateTime)
+
+_detected = {}  # layer id -> (schema signature, (begin candidates, end candidates))
+
+# Leading year of a text value, such as "1850-03-01" or "1850 ca."; also used in QGIS expressions
+TEXT_YEAR_PATTERN = r"\s*(-?\d{1,4})(?!\d)"
+
+
+def unfiltered_source(layer):
+    """QgsVectorLayerFeatureSource over every feature of `layer`, whatever its subset string.
+
+    Indexes and caches must cover every feature, not only the ones that pass
+    the filter currently applied by the dialog, and must include the
+    layer's uncommitted edits. The source is therefore taken from the layer
+    itself, edit buffer included, with the provider's subset string cleared
+    while the snapshot is taken and restored right after; the provider's
+    signals are blocked meanwhile so neither the canvas nor the index caches
+    react. The snapshot can be read from a worker thread.
+    """
+    if not layer.subsetString():
+        return QgsVectorLayerFeatureSource(layer)
+    provider = layer.dataProvider()
+    subset = provider.subsetString()
+    was_blocked = provider.blockSignals(True)
+    try:
+        provider.setSubsetString("", False)
+        return QgsVectorLayerFeatureSource(layer)
+    finally:
+        provider.setSubsetString(subset, False)
+        provider.blockSignals(was_blocked)
+
+
+def set_year_subset(layer, expression):
+    """Set a year filter as the layer's subset string and remember that the plugin set it"""
+    applied = layer.setSubsetString(expression)
+    if applied:
+        layer.setCustomProperty(APPLIED_SUBSET_PROPERTY, expression)
+    return applied
+
+
+def is_year_subset(layer):
+    """True when the layer's subset string is the year filter the plugin set, not one of the user's own"""
+    subset = layer.subsetString()
+    return bool(subset) and subset == layer.customProperty(APPLIED_SUBSET_PROPERTY)
+
+
+def to_year(value):
+    """Convert an attribute value (number, year string or date) to an int year, or None for NULL/unparseable values"""
+    if value is None or value == NULL:
+        return None
+    if isinstance(value, QDateTime):
+        value = value.date()
+    if isinstance(value, QDate):
+        return value.year() if value.isValid() else None
+    if isinstance(value, datetime.date):
+        return value.year
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    # Text such as "1850-03-01" or "1850 ca."
+    match = re.match(TEXT_YEAR_PATTERN, str(value))
+    return int(match.group(1)) if match else None
+
+
+def to_ordinal(value):
+    """Convert a date, datetime or ISO date string to a proleptic Gregorian day number, or None"""
+    if value is None or value == NULL:
+        return None
+    if isinstance(value, QDateTime):
+        value = value.date()
+    if isinstance(value, QDate):
+        return value.toPyDate().toordinal() if value.isValid() else None
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    try:
+        return datetime.date.fromisoformat(str(value).strip()[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def field_kind(field):
+    """"int", "text" or "date" for fields that can hold a year, else None"""
+    if field.type() in _INT_TYPES:
+        return "int"
+    if field.type() in _DATE_TYPES:
+        return "date"
+    if field.type() == QVariant.String:
+        return "text"
+    return None
+
+
+def _kind_of(fields, name):
+    """Kind of a named field; "int" when the fields are unknown"""
+    if fields is None or fields.indexOf(name) < 0:
+        return "int"
+    return field_kind(fields.field(name)) or "int"
+
+
+def _short_text_year(field):
+    """Condition on a text field: its leading year has fewer than four digits, like "950" or "950 ca."
+
+    Written with substr() and plain comparisons only, so it reads the same in
+    QGIS expressions and the SQL dialects of the providers.
+    """
+    fourth = f'substr("{field}", 4, 1)'
+    return f"({fourth} < '0' OR {fourth} > '9')"
+
+
+def year_filter_expression(begin_field, end_field, from_year, to_year, fields=None):
+    """Subset expression selecting features whose [begin, end] overlaps [from_year, to_year].
+
+    With `fields`, the literals follow the field types: year strings for text
+    fields and ISO dates for date fields, so the provider compares values of
+    the column's own type and can still use its indexes.
+
+    Text fields are compared as strings, so the clauses are written to agree
+    with to_year(): the upper bound is "before the next year", which keeps
+    "1900-05-01" and "1900 ca." in a window ending in 1900, and years with
+    fewer than four digits are placed before every four-digit year instead
+    of sorting by their first digit. Years outside 1000-9999 are compared
+    zero-padded.
+    """
+    begin_kind, end_kind = _kind_of(fields, begin_field), _kind_of(fields, end_field)
+    if begin_kind == "date":
+        begin_clause = f"\"{begin_field}\" < '{to_year + 1:04d}-01-01'"
+    elif begin_kind == "text":
+        begin_clause = f"\"{begin_field}\" < '{to_year + 1:04d}'"
+        if 1000 <= to_year < 9999:
+            begin_clause = f"({begin_clause} OR {_short_text_year(begin_field)})"
+    else:
+        begin_clause = f'"{begin_field}" <= {to_year}'
+    if end_kind == "date":
+        end_clause = f"\"{end_field}\" >= '{from_year:04d}-01-01'"
+    elif end_kind == "text":
+        end_clause = f"\"{end_field}\" >= '{from_year:04d}'"
+        if 1000 <= from_year <= 9999:
+            end_clause = f"{end_clause} AND NOT {_short_text_year(end_field)}"
+    else:
+        end_clause = f'"{end_field}" >= {from_year}'
+    return f"{begin_clause} AND {end_clause}"
+
+
+def iso_date_literal(day):
+    """Quoted ISO date, understood by most SQL dialects and by QGIS expressions"""
+    return f"'{day.isoformat()}'"
+
+
+def expression_date_literal(day):
+    """Date literal for QGIS expressions (renderer rules, non-SQL providers)"""
+    return f"to_date('{day.isoformat()}')"
+
+
+def date_filter_expression(begin_field, end_field, from_date, to_date, literal=iso_date_literal):
+    """Expression selecting features whose [begin, end] dates overlap [from_date, to_date], whole days inclusive.
+
+    The upper bound compares against the next day so datetime values later
+    on to_date still match. `literal` formats a datetime.date for the
+    dialect the expression is evaluated in.
+    """
+    next_day = to_date + datetime.timedelta(days=1)
+    return f'"{begin_field}" < {literal(next_day)} AND "{end_field}" >= {literal(from_date)}'
+
+
+def year_field_candidates(layer):
+    """(begin candidates, end candidates) for a layer, best first; cached per layer and schema"""
+    fields = layer.fields()
+    signature = tuple((field.name(), field.type()) for field in fields)
+    cached = _detected.get(layer.id())
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    candidates = rank_year_fields([(field.name(), field_kind(field)) for field in fields])
+    _detected[layer.id()] = (signature, candidates)
+    return candidates
+
+
+def configured_year_fields(layer):
+    """(begin field, end field) for a layer: the stored choice, else the detected pair, else the defaults.
+
+    A field that no longer exists in the layer is reported as None.
+    """
+    fields = layer.fields()
+    begin = layer.customProperty(BEGIN_FIELD_PROPERTY)
+    end = layer.customProperty(END_FIELD_PROPERTY)
+    if not begin or not end:
+        begin_candidates, end_candidates = year_field_candidates(layer)
+        begin = begin or (begin_candidates[0] if begin_candidates else DEFAULT_BEGIN_FIELD)
+        end = end or next((name for name in end_candidates if name != begin), DEFAULT_END_FIELD)
+    return (begin if fields.indexOf(begin) >= 0 else None,
+            end if fields.indexOf(end) >= 0 else None)
+
+
+def remember_year_fields(layer, begin_field, end_field):
+    """Store the year fields chosen for a layer; they are saved with the project"""
+    layer.setCustomProperty(BEGIN_FIELD_PROPERTY, begin_field)
+    layer.setCustomProperty(END_FIELD_PROPERTY, end_field)
+
+
+def year_request(fields, begin_field, end_field):
+    """Attribute-only request fetching just the two year fields"""
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes([begin_field, end_field], fields)
+    return request
+
+
+def iter_year_rows(source, fields, begin_field, end_field, convert=to_year):
+    """Yield (fid, begin, end) tuples from a layer or feature source.
+
+    `source` may be a QgsVectorLayer or a QgsVectorLayerFeatureSource (the
+    latter is safe to iterate from a background thread). `convert` turns
+    attribute values into integers: years by default, or day numbers with
+    to_ordinal for date-precision indexes.
+    """
+    begin_idx = fields.indexOf(begin_field)
+    end_idx = fields.indexOf(end_field)
+    for feature in source.getFeatures(year_request(fields, begin_field, end_field)):
+        attributes = feature.attributes()
+        yield feature.id(), convert(attributes[begin_idx]), convert(attributes[end_idx])
@@ -0,0 +1,100 @@
+"""Comparison of several year windows in a single pass.
+
+Every feature is tagged with a bitmask of the windows it overlaps (bit n
+set for windows[n]), using the same rule as the subset string:
+``begin <= to AND end >= from``. One pass over the (fid, begin, end) rows
+yields the count per window and per combination of windows, however many
+windows are compared.
+"""
+import re
+
+# More windows make the combinations legend unreadable
+MAX_WINDOWS = 8
+
+
+def parse_windows(text):
+    """Parse '1840-1849;1850-1859' (separated by ';' or ',') into [(1840, 1849), (1850, 1859)]"""
+    windows = []
+    for part in re.split(r"[;,]", text):
+        part = part.strip()
+        if not part:
+            continue
+        match = re.fullmatch(r"(-?\d+)\s*[-:]\s*(-?\d+)", part)
+        if not match:
+            raise ValueError(f"Invalid year window '{part}', expected e.g. 1840-1849")
+        from_year, to_year = int(match.group(1)), int(match.group(2))
+        if from_year > to_year:
+            raise ValueError(f"Invalid year window '{part}': start year is after end year")
+        windows.append((from_year, to_year))
+    if not windows:
+        raise ValueError("No year windows given")
+    return windows
+
+
+def window_mask(begin, end, windows):
+    """Bitmask of the windows that [begin, end] overlaps; 0 for NULL years"""
+    if begin is None or end is None:
+        return 0
+    mask = 0
+    for n, (from_year, to_year) in enumerate(windows):
+        if begin <= to_year and end >= from_year:
+            mask |= 1 << n
+    return mask
+
+
+def combination_label(mask, windows):
+    """Legend label of a mask, e.g. '1842-1860 + 1900-1920'"""
+    labels = [f"{from_year}-{to_year}" for n, (from_year, to_year) in enumerate(windows) if mask & (1 << n)]
+    return " + ".join(labels) if labels else "Geen bereik"
+
+
+def mask_expression(windows, condition):
+    """Expression computing the mask per feature; condition(from, to) returns the filter expression of a window"""
+    terms = [f"(CASE WHEN {condition(from_year, to_year)} THEN {1 << n} ELSE 0 END)"
+             for n, (from_year, to_year) in enumerate(windows)]
+    return " + ".join(terms)
+
+
+class WindowTally:
+    """Per-window and per-combination counts of one pass over year rows"""
+
+    def __init__(self, windows):
+        if len(windows) > MAX_WINDOWS:
+            raise ValueError(f"At most {MAX_WINDOWS} year windows can be compared")
+        self.windows = [tuple(window) for window in windows]
+        self.counts = [0] * len(self.windows)  # Features per window
+        self.combinations = {}  # mask -> number of features with exactly that mask
+        self.total = 0
+
+    @classmethod
+    def from_rows(cls, rows, windows, skipped=0):
+        """Tally (fid, begin, end) rows; rows with NULL years count under mask 0.
+
+        `skipped` adds rows with NULL years that are not among `rows`, such
+        as those an interval index or snapshot leaves out.
+        """
+        tally = cls(windows)
+        for _, begin, end in rows:
+            tally.add(begin, end)
+        if skipped:
+            tally.total += skipped
+            tally.combinations[0] = tally.combinations.get(0, 0) + skipped
+        return tally
+
+    def add(self, begin, end):
+        """Tag one feature and return its mask"""
+        mask = window_mask(begin, end, self.windows)
+        self.total += 1
+        self.combinations[mask] = self.combinations.get(mask, 0) + 1
+        n = 0
+        bits = mask
+        while bits:
+            if bits & 1:
+                self.counts[n] += 1
+            bits >>= 1
+            n += 1
+        return mask
+
+    def summary(self):
+        """One line per window: '1842-1860: 120'"""
+        return [f"{from_year}-{to_year}: {count}" for (from_year, to_year), count in zip(self.windows, self.counts)]
@@ -0,0 +1,200 @@
+"""Pre-rendered year windows for smooth step-by-step playback.
+
+Every year window in the current canvas extent is rendered once, in the
+background, with the filtered layer replaced by a clone whose subset string
+selects the window's features. The images are kept in an LRU cache, so stepping back
+and forth through the years shows a finished image in a canvas item on top
+of the map instead of re-rendering every feature.
+"""
+import datetime
+import logging
+
+from qgis.core import QgsMapSettings, QgsMapRendererParallelJob
+from qgis.gui import QgsMapCanvasItem
+from qgis.PyQt.QtCore import QSettings
+
+from .image_cache import LruImageCache
+from .layer_utils import year_filter_expression, date_filter_expression
+from .timing import timings
+
+JOBS_SETTINGS_KEY = "YearRangeFilter/playbackJobs"
+CACHE_SETTINGS_KEY = "YearRangeFilter/playbackCacheMb"
+DEFAULT_JOBS = 2
+DEFAULT_CACHE_MB = 256
+
+# Windows on either side of the current one that are rendered ahead
+PREFETCH_STEPS = 5
+
+
+def playback_settings():
+    """(concurrent render jobs, cache budget in bytes) from the QGIS settings"""
+    settings = QSettings()
+    jobs = settings.value(JOBS_SETTINGS_KEY, DEFAULT_JOBS, type=int)
+    cache_mb = settings.value(CACHE_SETTINGS_KEY, DEFAULT_CACHE_MB, type=int)
+    return max(1, jobs), max(1, cache_mb) * 1024 * 1024
+
+
+def shift_window(window, years):
+    """The window moved by a number of years; windows hold years or datetime.date days"""
+    if not isinstance(window[0], datetime.date):
+        return window[0] + years, window[1] + years
+
+    def shift(day):
+        try:
+            return day.replace(year=day.year + years)
+        except ValueError:  # 29 February in a year that has none
+            return day.replace(year=day.year + years, day=28)
+    return shift(window[0]), shift(window[1])
+
+
+def window_layer(layer, begin_field, end_field, window):
+    """A clone of the layer, with the same style, whose subset string selects one window.
+
+    Cloning is cheap for every provider, memory layers included (their clone
+    shares the feature store), so nothing is read on the GUI thread: the
+    render job evaluates the subset string in the background.
+    """
+    copy = layer.clone()
+    if isinstance(window[0], datetime.date):
+        copy.setSubsetString(date_filter_expression(begin_field, end_field, *window))
+    else:
+        copy.setSubsetString(year_filter_expression(begin_field, end_field, *window, fields=layer.fields()))
+    return copy
+
+
+class PlaybackOverlay(QgsMapCanvasItem):
+    """Canvas item that draws a pre-rendered map image over its extent"""
+
+    def __init__(self, canvas):
+        super().__init__(canvas)
+        self.image = None
+        self.setZValue(100)
+
+    def show_image(self, image, extent):
+        """Draw the image over the given map extent"""
+        self.image = image
+        self.setRect(extent)
+        self.setVisible(True)
+        self.update()
+
+    def hide_image(self):
+        """Stop drawing the image and reveal the live map underneath"""
+        self.image = None
+        self.setVisible(False)
+
+    def paint(self, painter, option=None, widget=None):
+        """Draw the image stretched over the item's bounding rectangle"""
+        if self.image is not None:
+            painter.drawImage(self.boundingRect(), self.image)
+
+
+class YearPlayback:
+    """Renders year windows in the background and shows them from an LRU image cache"""
+
+    def __init__(self, canvas, layer, begin_field, end_field, max_jobs=None, budget_bytes=None):
+        self.logger = logging.getLogger('YearRangeFilter')
+        default_jobs, default_budget = playback_settings()
+        self.canvas = canvas
+        self.layer = layer
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.max_jobs = max_jobs or default_jobs
+        self.cache = LruImageCache(budget_bytes or default_budget)
+        self.overlay = PlaybackOverlay(canvas)
+        self.overlay.hide_image()
+        self.window = None  # Window currently wanted on screen
+        self._queue = []  # Windows waiting for a render job, most urgent first
+        self._jobs = {}  # cache key -> (job, window layer) of running renders
+        self.canvas.extentsChanged.connect(self._on_extent_changed)
+
+    def _key(self, window):
+        """Cache key of a window in the canvas' current view"""
+        settings = self.canvas.mapSettings()
+        size = settings.outputSize()
+        return (tuple(window), settings.visibleExtent().toString(), size.width(), size.height())
+
+    def show(self, window):
+        """Show a window from the cache, or render it first; then prefetch its neighbours"""
+        self.window = tuple(window)
+        image = self.cache.get(self._key(self.window))
+        if image is not None:
+            self.overlay.show_image(image, self.canvas.mapSettings().visibleExtent())
+        else:
+            # The previous window's image must not stand in for this one while it renders
+            self.overlay.hide_image()
+            self._enqueue(self.window, urgent=True)
+        for step in range(1, PREFETCH_STEPS + 1):
+            self._enqueue(shift_window(self.window, step))
+            self._enqueue(shift_window(self.window, -step))
+        self._pump()
+
+    def _enqueue(self, window, urgent=False):
+        """Queue a window for rendering unless it is cached or already being rendered"""
+        key = self._key(window)
+        if key in self.cache or key in self._jobs:
+            return
+        if window in self._queue:
+            self._queue.remove(window)
+        if urgent:
+            self._queue.insert(0, window)
+        else:
+            self._queue.append(window)
+
+    def _pump(self):
+        """Start render jobs for queued windows up to the concurrency limit"""
+        while self._queue and len(self._jobs) < self.max_jobs:
+            self._start_job(self._queue.pop(0))
+
+    def _start_job(self, window):
+        """Render one window in the background with the filtered layer swapped for a window copy"""
+        key = self._key(window)
+        settings = QgsMapSettings(self.canvas.mapSettings())
+        copy = window_layer(self.layer, self.begin_field, self.end_field, window)
+        settings.setLayers([copy if layer.id() == self.layer.id() else layer for layer in settings.layers()])
+        job = QgsMapRendererParallelJob(settings)
+        # The slot keeps the job and the window copy alive until the render has finished, even if canceled
+        job.finished.connect(lambda job=job, copy=copy, key=key, window=window: self._job_finished(job, key, window))
+        self._jobs[key] = (job, copy)
+        job.start()
+
+    def _job_finished(self, job, key, window):
+        """Cache the rendered image and show it if its window is the one wanted"""
+        job.finished.disconnect()  # Drops the slot, which holds the last reference to the job
+        running = self._jobs.get(key)
+        if running is None or running[0] is not job:
+            return  # Canceled by stop() or an extent change
+        del self._jobs[key]
+        self.cache.put(key, job.renderedImage())
+        timings.add("playback render", (self.layer.name(), self.layer.providerType()), job.renderingTime() / 1000.0)
+        self.logger.debug(f"Playback window {window[0]}-{window[1]} rendered in {job.renderingTime()} ms, "
+                          f"{len(self.cache)} images cached ({self.cache.used_bytes // (1024 * 1024)} MB)")
+        if window == self.window and key == self._key(window):
+            self.overlay.show_image(self.cache.get(key), self.canvas.mapSettings().visibleExtent())
+        self._pump()
+
+    def _cancel_jobs(self):
+        """Cancel running render jobs and forget queued windows"""
+        self._queue.clear()
+        jobs = list(self._jobs.values())
+        self._jobs.clear()
+        for job, _ in jobs:
+            job.cancelWithoutBlocking()  # Still emits finished, which releases the job
+
+    def _on_extent_changed(self):
+        """Images of the old view no longer line up: render the current window for the new view"""
+        self.overlay.hide_image()
+        self._cancel_jobs()
+        if self.window is not None:
+            self.show(self.window)
+
+    def stop(self):
+        """Cancel rendering, remove the overlay and free the cached images"""
+        try:
+            self.canvas.extentsChanged.disconnect(self._on_extent_changed)
+        except (TypeError, RuntimeError):
+            pass
+        self._cancel_jobs()
+        self.canvas.scene().removeItem(self.overlay)
+        self.overlay = None
+        self.cache.clear()
+        self.window = None
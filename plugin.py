@@ -0,0 +1,196 @@
+"""Lightweight plugin entry point.
+
+QGIS creates the plugin at every start, so this module only imports what
+registering the actions and the Processing provider needs. The panel and
+its Qt widgets, the log file and the index caches are loaded the first
+time the user opens the panel or the timing statistics. The duration of
+each startup and first-use stage is recorded in the timing statistics
+(layer "(plugin)") and written to the log once logging is set up.
+"""
+import os
+from time import perf_counter
+
+_import_started = perf_counter()
+
+from .timing import timings
+
+# Timing key of the startup stages in the timing statistics
+STARTUP_KEY = ("(plugin)", "")
+
+_startup_stages = []  # (stage, seconds) measured before logging was set up
+
+
+def _record_stage(stage, started):
+    """Record the time since `started` as a startup stage"""
+    seconds = perf_counter() - started
+    timings.add(stage, STARTUP_KEY, seconds)
+    _startup_stages.append((stage, seconds))
+
+
+class YearRangeFilterPlugin:
+    """Registers the toolbar action at startup and loads everything else on first use"""
+
+    def __init__(self, iface):
+        started = perf_counter()
+        self.iface = iface
+        self.action = None
+        self.dock = None # Dock panel, created on the first run and kept until unload
+        self.index_manager = None # Shared across the panel's layers, created on first use
+        self.provider = None # Processing provider, registered in initProcessing()
+        self.stats_action = None
+        self.stats_dialog = None
+        self.logger = None # Set by _load() on first use
+        self._render_started = None # perf_counter() value when the canvas started rendering
+        _record_stage("startup: plugin init", started)
+
+    def initProcessing(self):
+        """Register the Processing provider (also called by qgis_process without a GUI)"""
+        started = perf_counter()
+        from qgis.core import QgsApplication
+        from .processing_provider import YearRangeFilterProvider
+        self.provider = YearRangeFilterProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+        _record_stage("startup: processing provider", started)
+
+    def initGui(self):
+        """Add the toolbar button and menu entries; nothing else is loaded yet"""
+        self.initProcessing()
+        started = perf_counter()
+        from qgis.PyQt.QtWidgets import QAction
+        from qgis.PyQt.QtGui import QIcon
+
+        icon_path = os.path.join(os.path.dirname(__file__), 'icon.png')
+        self.action = QAction('Kaart Jaar Filter', self.iface.mainWindow())
+        if os.path.exists(icon_path): # Check if icon exists before trying to set it
+            self.action.setIcon(QIcon(icon_path))
+        self.action.setToolTip("Filter lagen op jaarbereik") # Tooltip for the action
+        self.action.triggered.connect(self.run)
+
+        # Add to toolbar and menu
+        self.iface.addToolBarIcon(self.action)
+        # This adds a new top-level menu named "Kaart Jaar Filter"
+        self.iface.addPluginToMenu('&Kaart Jaar Filter', self.action)
+
+        self.stats_action = QAction('Timing Statistieken', self.iface.mainWindow())
+        self.stats_action.setToolTip("Toon hoe lang elke stap van het jaarfilter duurt")
+        self.stats_action.triggered.connect(self.show_timing_stats)
+        self.iface.addPluginToMenu('&Kaart Jaar Filter', self.stats_action)
+        _record_stage("startup: initGui", started)
+
+    def _load(self):
+        """Import the panel and set up logging, timing and the index caches; does nothing after the first call"""
+        if self.logger is not None:
+            return
+        started = perf_counter()
+        from .plugin_logging import configure_logging
+        # Records go through a queue to a background writer; the log file is opened on the first record
+        self.logger = configure_logging()
+        _record_stage("first use: logging", started)
+
+        started = perf_counter()
+        from .timing_panel import load_timing_setting
+        from .index_manager import YearIndexManager
+        from . import year_range_filter # The panel, its tasks and the Qt widget imports
+        _record_stage("first use: import panel", started)
+
+        started = perf_counter()
+        load_timing_setting()
+        self.index_manager = YearIndexManager()
+        # Canvas rendering is asynchronous, so its duration is taken from the canvas signals
+        canvas = self.iface.mapCanvas()
+        canvas.renderStarting.connect(self.on_render_starting)
+        canvas.mapCanvasRefreshed.connect(self.on_render_finished)
+        _record_stage("first use: caches and timing", started)
+
+        for stage, seconds in _startup_stages:
+            self.logger.info(f"Plugin stage '{stage}' took {seconds * 1000:.1f} ms")
+        del _startup_stages[:]
+        self.logger.info("YearRangeFilterPlugin loaded")
+
+    def on_render_starting(self):
+        """Remember when the canvas started rendering"""
+        if timings.enabled:
+            self._render_started = perf_counter()
+
+    def on_render_finished(self):
+        """Record the canvas render time as a timing span"""
+        if timings.enabled and self._render_started is not None:
+            timings.add("canvas render", ("(canvas)", ""), perf_counter() - self._render_started)
+        self._render_started = None
+
+    def show_timing_stats(self):
+        """Open the timing statistics panel"""
+        self._load()
+        from .timing_panel import TimingStatsDialog
+        if self.stats_dialog is None:
+            self.stats_dialog = TimingStatsDialog(self.iface.mainWindow())
+        self.stats_dialog.show()
+        self.stats_dialog.raise_()
+
+    def unload(self):
+        """Clean up when plugin is unloaded"""
+        if self.action:
+            self.iface.removeToolBarIcon(self.action)
+            # Correctly remove the plugin menu item using its text and the action
+            self.iface.removePluginMenu('&Kaart Jaar Filter', self.action)
+            del self.action # Explicitly delete to help with garbage collection
+            self.action = None
+        if self.stats_action:
+            self.iface.removePluginMenu('&Kaart Jaar Filter', self.stats_action)
+            self.stats_action = None
+        if self.provider is not None:
+            from qgis.core import QgsApplication
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
+        if self.logger is None:
+            return # Never used: nothing else was loaded
+
+        canvas = self.iface.mapCanvas()
+        canvas.renderStarting.disconnect(self.on_render_starting)
+        canvas.mapCanvasRefreshed.disconnect(self.on_render_finished)
+        if self.stats_dialog is not None:
+            self.stats_dialog.close()
+            self.stats_dialog = None
+        if self.dock is not None:
+            self.dock.cleanup()
+            self.iface.removeDockWidget(self.dock)
+            self.dock.deleteLater()
+            self.dock = None
+        from .render_filter import clear_render_filters
+        from .window_comparison import clear_comparisons
+        from .plugin_logging import shutdown_logging
+        clear_render_filters()
+        clear_comparisons()
+        self.index_manager.clear()
+        self.logger.info("YearRangeFilterPlugin unloaded")
+        shutdown_logging()
+        self.logger = None
+
+    def run(self):
+        """Run the plugin: show the dock panel, loading and creating it on first use"""
+        try:
+            self._load()
+            self.logger.debug("Plugin run method called.")
+            if self.dock is None:
+                started = perf_counter()
+                from qgis.PyQt.QtCore import Qt
+                from .year_range_filter import YearRangeFilterDock
+                # Built once: the widgets, per-layer windows and caches survive closing and reopening
+                self.dock = YearRangeFilterDock(self.iface, self.index_manager)
+                self.iface.addDockWidget(Qt.RightDockWidgetArea, self.dock)
+                _record_stage("first use: dock panel", started)
+                self.logger.info(f"Plugin stage 'first use: dock panel' took "
+                                 f"{_startup_stages.pop()[1] * 1000:.1f} ms")
+            else:
+                self.dock.panel.set_layer(self.iface.activeLayer())
+            self.dock.show()
+            self.dock.raise_()
+
+        except Exception as e:
+            from qgis.PyQt.QtWidgets import QMessageBox
+            if self.logger is not None:
+                self.logger.error(f"Error running plugin: {str(e)}", exc_info=True)
+            QMessageBox.critical(self.iface.mainWindow(), "Plugin Error", f"An unexpected error occurred while running the plugin: {str(e)}")
+
+
+_record_stage("startup: import plugin module", _import_started)
@@ -0,0 +1,82 @@
+"""Non-blocking logging for the plugin.
+
+Log records are put on a queue by a QueueHandler and written to a
+size-capped rotating file by a QueueListener thread, so the GUI thread never
+waits on disk I/O. The level can be switched at runtime and is remembered
+in the QGIS settings.
+"""
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from qgis.PyQt.QtCore import QSettings
+
+LOGGER_NAME = 'YearRangeFilter'
+LEVEL_SETTINGS_KEY = "YearRangeFilter/logLevel"
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+DEFAULT_LEVEL = "INFO"
+MAX_LOG_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+_queue_handler = None
+
+
+def _writer_handlers():
+    """Handlers used by the background writer: a rotating log file, or the console as a fallback"""
+    formatter = logging.Formatter(LOG_FORMAT)
+    log_dir = os.path.join(os.path.dirname(__file__), 'logs')
+    log_file = os.path.join(log_dir, 'year_range_filter.log')
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        handler = RotatingFileHandler(log_file, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                      encoding='utf-8', delay=True)
+    except OSError as e:
+        # This can happen if the plugin is in a read-only location
+        print(f"Could not set up log file: {log_file}. Error: {e}")
+        handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
+    return [handler]
+
+
+def configure_logging():
+    """Attach the queue-based handlers to the plugin logger (once) and return the logger"""
+    global _listener, _queue_handler
+    logger = logging.getLogger(LOGGER_NAME)
+    if _queue_handler is not None:
+        return logger
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    _listener = QueueListener(log_queue, *_writer_handlers(), respect_handler_level=True)
+    _listener.start()
+    logger.addHandler(_queue_handler)
+    logger.propagate = False
+    logger.setLevel(QSettings().value(LEVEL_SETTINGS_KEY, DEFAULT_LEVEL, type=str))
+    return logger
+
+
+def current_level():
+    """Name of the plugin logger's level"""
+    return logging.getLevelName(logging.getLogger(LOGGER_NAME).level)
+
+
+def set_log_level(level_name):
+    """Switch the plugin logger's level at runtime and remember it"""
+    logging.getLogger(LOGGER_NAME).setLevel(level_name)
+    QSettings().setValue(LEVEL_SETTINGS_KEY, level_name)
+
+
+def shutdown_logging():
+    """Flush pending records and stop the writer thread (on plugin unload)"""
+    global _listener, _queue_handler
+    if _queue_handler is None:
+        return
+    logging.getLogger(LOGGER_NAME).removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
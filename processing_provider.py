@@ -0,0 +1,17 @@
+"""Processing provider exposing the year filter algorithms to the toolbox and qgis_process"""
+from qgis.core import QgsProcessingProvider
+
+from .extract_windows_algorithm import ExtractYearWindowsAlgorithm
+
+
+class YearRangeFilterProvider(QgsProcessingProvider):
+    """Provider for the Year Range Filter algorithms"""
+
+    def id(self):
+        return 'yearrangefilter'
+
+    def name(self):
+        return 'Kaart Jaar Filter'
+
+    def loadAlgorithms(self):
+        self.addAlgorithm(ExtractYearWindowsAlgorithm())
@@ -0,0 +1,320 @@
+"""Provider-aware pushdown of the year filter.
+
+Inspects the provider behind a layer, checks whether the year fields are
+indexed, writes the filter predicate in the form that backend evaluates
+best and, where the provider allows it, creates the missing indexes.
+"""
+import datetime
+import logging
+import os
+import re
+import sqlite3
+from contextlib import closing
+
+from qgis.core import QgsProviderRegistry, QgsDataSourceUri, QgsVectorDataProvider, Qgis
+from qgis.PyQt.QtWidgets import QPushButton
+
+from .layer_utils import year_filter_expression, date_filter_expression, expression_date_literal, field_kind
+
+# Provider kinds whose subset strings are native SQL rather than QGIS expressions
+SQL_KINDS = ("postgres", "spatialite", "gpkg", "shapefile", "ogr")
+
+# Definition of a GiST index on int4range(begin, end, '[]') as printed by pg_get_indexdef
+_IDENTIFIER = r'(\w+|"(?:[^"]|"")+")'
+_RANGE_INDEX_DEF = re.compile(
+    rf"USING gist \(int4range\({_IDENTIFIER}, {_IDENTIFIER}, '\[\]'(?:::text)?\)\)$", re.IGNORECASE)
+
+
+def _quote_identifier(name):
+    """Double-quote an SQL identifier"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _unquote_identifier(name):
+    """Inverse of _quote_identifier for identifiers printed by PostgreSQL"""
+    if name.startswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name
+
+
+def range_index_fields(indexdef):
+    """(begin field, end field) of an index definition on exactly int4range(begin, end, '[]'), else None"""
+    match = _RANGE_INDEX_DEF.search(indexdef or "")
+    if not match:
+        return None
+    return _unquote_identifier(match.group(1)), _unquote_identifier(match.group(2))
+
+
+def _quote_literal(value):
+    """Single-quote an SQL string literal"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def native_date_literal(kind, day):
+    """Date literal in the dialect of the provider kind, so the provider compares real dates"""
+    if kind == "postgres":
+        return f"'{day.isoformat()}'::date"
+    if kind in ("gpkg", "spatialite"):
+        return f"'{day.isoformat()}'"  # Dates are stored as ISO 8601 text
+    if kind in ("shapefile", "ogr"):
+        return f"'{day:%Y/%m/%d}'"  # OGR SQL date format
+    return expression_date_literal(day)
+
+
+class PushdownPlan:
+    """How a year window will be evaluated by the layer's provider"""
+
+    def __init__(self, kind, expression, indexed, full_scan, can_create_index, native_sql, notes):
+        self.kind = kind
+        self.expression = expression
+        self.indexed = indexed  # field name -> True/False/None (unknown)
+        self.full_scan = full_scan
+        self.can_create_index = can_create_index
+        self.native_sql = native_sql
+        self.notes = notes
+
+    def describe(self):
+        """One-line summary for logs and the message bar"""
+        state = "volledige scan" if self.full_scan else "index"
+        details = "; ".join(self.notes)
+        return f"{self.kind}: {state}" + (f" ({details})" if details else "")
+
+
+class FilterPushdown:
+    """Builds PushdownPlans for one layer.
+
+    Everything read from the layer is captured in the constructor (on the
+    main thread); index detection and planning only use that snapshot, so
+    they can run inside a background task.
+    """
+
+    def __init__(self, layer):
+        self.logger = logging.getLogger('YearRangeFilter')
+        provider = layer.dataProvider()
+        self.provider_key = layer.providerType()
+        self.fields = layer.fields()
+        self.source = provider.dataSourceUri()
+        self.storage_type = provider.storageType() if provider else ""
+        self.can_create_attribute_index = bool(
+            provider and provider.capabilities() & QgsVectorDataProvider.CreateAttributeIndex)
+        self.kind = self._detect_kind()
+        self._indexes = None  # field name -> True/False/None, filled on first use
+        self._range_indexes = set()  # (begin, end) pairs with a PostgreSQL GiST index on int4range(begin, end, '[]')
+
+    def _detect_kind(self):
+        """Classify the provider as postgres, spatialite, gpkg, shapefile, ogr, delimitedtext or other"""
+        if self.provider_key in ("postgres", "spatialite", "delimitedtext", "memory"):
+            return self.provider_key
+        if self.provider_key == "ogr":
+            path = self._ogr_parts().get("path", "")
+            extension = os.path.splitext(path)[1].lower()
+            if self.storage_type == "GPKG" or extension == ".gpkg":
+                return "gpkg"
+            if self.storage_type == "ESRI Shapefile" or extension == ".shp":
+                return "shapefile"
+            return "ogr"
+        return self.provider_key
+
+    def _ogr_parts(self):
+        """Decoded OGR data source URI (path, layerName, ...)"""
+        return QgsProviderRegistry.instance().decodeUri("ogr", self.source) or {}
+
+    def detect_indexes(self, field_names):
+        """Return {field name: True/False/None} telling whether each field leads an index"""
+        if self._indexes is not None and all(name in self._indexes for name in field_names):
+            return {name: self._indexes[name] for name in field_names}
+        try:
+            indexed_columns = self._indexed_columns()
+        except Exception as e:
+            self.logger.warning(f"Could not inspect indexes of {self.kind} source: {str(e)}")
+            indexed_columns = None
+        if indexed_columns is None:
+            self._indexes = {name: None for name in field_names}
+        else:
+            self._indexes = {name: name in indexed_columns for name in field_names}
+        return dict(self._indexes)
+
+    def _indexed_columns(self):
+        """Set of leading index columns of the source table, or None if unknown"""
+        if self.kind == "gpkg":
+            parts = self._ogr_parts()
+            return self._sqlite_indexed_columns(parts.get("path"), parts.get("layerName"))
+        if self.kind == "spatialite":
+            uri = QgsDataSourceUri(self.source)
+            return self._sqlite_indexed_columns(uri.database(), uri.table())
+        if self.kind == "postgres":
+            return self._postgres_indexed_columns()
+        if self.kind == "shapefile":
+            # OGR keeps shapefile attribute indexes in .idm/.ind sidecar files
+            base = os.path.splitext(self._ogr_parts().get("path", ""))[0]
+            return None if os.path.exists(base + ".idm") else set()
+        if self.kind in ("delimitedtext", "memory"):
+            return set()
+        return None
+
+    def _sqlite_indexed_columns(self, path, table):
+        """Leading columns of all indexes on a table in a GeoPackage/SpatiaLite file"""
+        if not path or not table:
+            return None
+        columns = set()
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            for row in conn.execute(f"PRAGMA index_list({_quote_identifier(table)})"):
+                info = conn.execute(f"PRAGMA index_info({_quote_identifier(row[1])})").fetchall()
+                columns.update(column[2] for column in info if column[0] == 0)
+        return columns
+
+    def _postgres_connection(self):
+        """Database connection for the layer's PostgreSQL source"""
+        metadata = QgsProviderRegistry.instance().providerMetadata("postgres")
+        return metadata.createConnection(QgsDataSourceUri(self.source).uri(False), {})
+
+    def _postgres_table(self):
+        """Quoted schema-qualified name of the layer's table"""
+        uri = QgsDataSourceUri(self.source)
+        schema = uri.schema() or "public"
+        return f"{_quote_identifier(schema)}.{_quote_identifier(uri.table())}"
+
+    def _postgres_indexed_columns(self):
+        """Leading index columns of the PostgreSQL table; also detects range GiST indexes.
+
+        Only a full (non-partial) index on exactly int4range(begin, end, '[]')
+        counts as a range index: PostgreSQL evaluated that expression for
+        every row when building it, so no row has begin > end and the range
+        predicate cannot fail on the table.
+        """
+        sql = ("SELECT a.attname, pg_get_indexdef(i.indexrelid), i.indpred IS NULL FROM pg_index i "
+               "LEFT JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0] "
+               f"WHERE i.indrelid = {_quote_literal(self._postgres_table())}::regclass")
+        columns = set()
+        self._range_indexes = set()
+        for attname, indexdef, full in self._postgres_connection().executeSql(sql):
+            if attname:
+                columns.add(attname)
+            elif full in (True, "t", "true"):
+                fields = range_index_fields(indexdef)
+                if fields:
+                    self._range_indexes.add(fields)
+        return columns
+
+    def postgres_row_estimate(self):
+        """Planner estimate of the table's row count (pg_class.reltuples); None if never analysed"""
+        rows = self._postgres_connection().executeSql(
+            f"SELECT reltuples FROM pg_class WHERE oid = {_quote_literal(self._postgres_table())}::regclass")
+        reltuples = float(rows[0][0]) if rows and rows[0][0] is not None else -1
+        return int(reltuples) if reltuples > 0 else None
+
+    def postgres_column_statistics(self, field_names):
+        """{field: (null_frac, most_common_vals, most_common_freqs, histogram_bounds)} from pg_stats, as text"""
+        uri = QgsDataSourceUri(self.source)
+        names = ", ".join(_quote_literal(name) for name in field_names)
+        sql = ("SELECT attname, null_frac, most_common_vals::text, most_common_freqs::text, "
+               "histogram_bounds::text FROM pg_stats "
+               f"WHERE schemaname = {_quote_literal(uri.schema() or 'public')} "
+               f"AND tablename = {_quote_literal(uri.table())} AND attname IN ({names})")
+        return {row[0]: tuple(row[1:]) for row in self._postgres_connection().executeSql(sql)}
+
+    def postgres_count(self, predicate):
+        """Exact number of rows matching a native SQL predicate, counted by the server"""
+        rows = self._postgres_connection().executeSql(
+            f"SELECT count(*) FROM {self._postgres_table()} WHERE {predicate}")
+        return int(rows[0][0])
+
+    def postgres_sample(self, field_names, percent):
+        """Rows of the given columns from a TABLESAMPLE SYSTEM sample of about `percent` of the table's pages"""
+        columns = ", ".join(_quote_identifier(name) for name in field_names)
+        return self._postgres_connection().executeSql(
+            f"SELECT {columns} FROM {self._postgres_table()} TABLESAMPLE SYSTEM ({percent:.4f})")
+
+    def plan(self, begin_field, end_field, from_year, to_year):
+        """Return the PushdownPlan for a window of years (ints) or days (datetime.date)"""
+        indexed = self.detect_indexes([begin_field, end_field])
+        notes = []
+        kinds = [field_kind(self.fields.field(name)) for name in (begin_field, end_field)
+                 if self.fields.indexOf(name) >= 0]
+        integer_fields = all(kind == "int" for kind in kinds)
+        by_date = isinstance(from_year, datetime.date)
+        if not by_date and kinds and all(kind == "date" for kind in kinds):
+            # A year window on date columns: compare with date literals so date indexes are used
+            from_year, to_year, by_date = datetime.date(from_year, 1, 1), datetime.date(to_year, 12, 31), True
+        if by_date:
+            expression = date_filter_expression(begin_field, end_field, from_year, to_year,
+                                                lambda day: native_date_literal(self.kind, day))
+        else:
+            expression = year_filter_expression(begin_field, end_field, from_year, to_year, self.fields)
+        full_scan = not any(indexed.values())
+        can_create_index = False
+
+        if (self.kind == "postgres" and (begin_field, end_field) in self._range_indexes and integer_fields
+                and not by_date and from_year <= to_year):
+            # A GiST index on int4range(begin, end, '[]') answers overlap queries directly
+            begin, end = _quote_identifier(begin_field), _quote_identifier(end_field)
+            expression = (f"{begin} IS NOT NULL AND {end} IS NOT NULL AND {begin} <= {end} AND "
+                          f"int4range({begin}, {end}, '[]') && int4range({from_year}, {to_year}, '[]')")
+            full_scan = False
+            notes.append("GiST range-index")
+        elif self.kind == "shapefile":
+            # OGR only uses shapefile attribute indexes for equality lookups
+            full_scan = True
+            notes.append("shapefile-indexen versnellen geen bereikvergelijkingen; aantallen komen uit de interval-index")
+        elif self.kind in ("delimitedtext", "memory"):
+            notes.append("provider heeft geen attribuut-indexen")
+        elif full_scan:
+            can_create_index = self.kind == "postgres" or self.can_create_attribute_index
+            if None in indexed.values():
+                notes.append("index-informatie niet beschikbaar")
+
+        if not full_scan:
+            used = [name for name, has_index in indexed.items() if has_index]
+            if used:
+                notes.append(f"index op {', '.join(used)}")
+
+        plan = PushdownPlan(self.kind, expression, indexed, full_scan, can_create_index,
+                            self.kind in SQL_KINDS, notes)
+        self.logger.debug(f"Pushdown plan: {plan.describe()} -> {expression}")
+        return plan
+
+    def create_indexes(self, layer, field_names):
+        """Create indexes on the given fields that are not indexed yet; returns the created field names"""
+        indexed = self.detect_indexes(field_names)
+        missing = [name for name in field_names if not indexed.get(name)]
+        created = []
+        if self.kind == "postgres":
+            connection = self._postgres_connection()
+            table = QgsDataSourceUri(self.source).table()
+            for name in missing:
+                index_name = _quote_identifier(f"{table}_{name}_idx")
+                connection.executeSql(f"CREATE INDEX IF NOT EXISTS {index_name} "
+                                      f"ON {self._postgres_table()} ({_quote_identifier(name)})")
+                created.append(name)
+        elif self.can_create_attribute_index:
+            provider = layer.dataProvider()
+            for name in missing:
+                if provider.createAttributeIndex(layer.fields().indexOf(name)):
+                    created.append(name)
+        self._indexes = None  # Re-detect on the next plan
+        self.logger.info(f"Created indexes on {created} for {self.kind} layer {layer.name()}")
+        return created
+
+
+def offer_index_creation(iface, layer, pushdown, field_names):
+    """Push a message bar item with a button that creates the missing year field indexes"""
+    bar = iface.messageBar()
+    item = bar.createMessage(
+        "Volledige scan",
+        f"De jaarvelden van laag '{layer.name()}' zijn niet geïndexeerd; het filter leest de hele bron.")
+    button = QPushButton("Index aanmaken")
+
+    def create():
+        try:
+            created = pushdown.create_indexes(layer, field_names)
+            bar.popWidget(item)
+            bar.pushMessage("Success", f"Index aangemaakt op: {', '.join(created) or 'geen velden'}",
+                            level=Qgis.Success, duration=4)
+        except Exception as e:
+            error_msg = f"Error creating index for layer {layer.name()}: {str(e)}"
+            logging.getLogger('YearRangeFilter').error(error_msg, exc_info=True)
+            bar.pushMessage("Error", error_msg, level=Qgis.Critical, duration=5)
+
+    button.clicked.connect(create)
+    item.layout().addWidget(button)
+    bar.pushWidget(item, Qgis.Warning, 10)
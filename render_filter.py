@@ -0,0 +1,107 @@
+"""Renderer-side year filtering.
+
+Instead of setting a subset string - which makes the provider drop its
+caches and reload - the layer's renderer is wrapped in a rule-based renderer
+whose single top rule carries the year expression. The full dataset stays
+loaded and moving the window only changes that rule and repaints the layer.
+"""
+import datetime
+import logging
+
+from qgis.core import QgsRuleBasedRenderer
+
+from .layer_utils import year_filter_expression, date_filter_expression, expression_date_literal
+
+# Description of the wrapping rule, used to recognise it on the layer's renderer
+RULE_DESCRIPTION = "Kaart Jaar Filter"
+
+_render_filters = {}  # layer id -> RenderYearFilter
+
+
+def render_filter_for(layer):
+    """Return the RenderYearFilter for a layer, creating it on first use"""
+    render_filter = _render_filters.get(layer.id())
+    if render_filter is None:
+        render_filter = RenderYearFilter(layer)
+        _render_filters[layer.id()] = render_filter
+        layer.willBeDeleted.connect(lambda layer_id=layer.id(): _render_filters.pop(layer_id, None))
+    return render_filter
+
+
+def clear_render_filters():
+    """Restore the original renderer of every layer (on plugin unload)"""
+    for render_filter in list(_render_filters.values()):
+        render_filter.clear()
+    _render_filters.clear()
+
+
+class RenderYearFilter:
+    """Hides features outside a year window at render time"""
+
+    def __init__(self, layer):
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.layer = layer
+        self._original_renderer = None  # Clone of the renderer before wrapping
+
+    def _year_rule(self):
+        """The wrapping rule on the layer's current renderer, or None if it is not wrapped"""
+        renderer = self.layer.renderer()
+        if not isinstance(renderer, QgsRuleBasedRenderer):
+            return None
+        children = renderer.rootRule().children()
+        if len(children) == 1 and children[0].description() == RULE_DESCRIPTION:
+            return children[0]
+        return None
+
+    def _unwrapped_renderer(self):
+        """Rule-based renderer holding the year rule's children, for a wrap this instance did not make.
+
+        After a project reload the layer comes back with the year rule in its
+        style but without the renderer that was wrapped; promoting the rules
+        below the year rule gives back the same style without the filter.
+        """
+        root = QgsRuleBasedRenderer.Rule(None)
+        for child in self._year_rule().children():
+            root.appendChild(child.clone())
+        return QgsRuleBasedRenderer(root)
+
+    @property
+    def active(self):
+        """True while the layer's renderer carries the year rule"""
+        return self._year_rule() is not None
+
+    def apply(self, begin_field, end_field, from_year, to_year):
+        """Show only the features in the window (years, or datetime.date days); only repaints if already active"""
+        if isinstance(from_year, datetime.date):
+            expression = date_filter_expression(begin_field, end_field, from_year, to_year, expression_date_literal)
+        else:
+            expression = year_filter_expression(begin_field, end_field, from_year, to_year, self.layer.fields())
+        rule = self._year_rule()
+        if rule is None:
+            # Wrap the current style: root -> year rule -> the original rules
+            self._original_renderer = self.layer.renderer().clone()
+            converted = QgsRuleBasedRenderer.convertFromRenderer(self.layer.renderer())
+            rule = converted.rootRule().clone()
+            rule.setDescription(RULE_DESCRIPTION)
+            root = QgsRuleBasedRenderer.Rule(None)
+            root.appendChild(rule)
+            self.layer.setRenderer(QgsRuleBasedRenderer(root))
+            rule = self._year_rule()
+            self.logger.debug(f"Render filter installed on {self.layer.name()}")
+        elif self._original_renderer is None:
+            # Wrapped before this instance existed (saved with the project); never keep the wrapped renderer
+            self._original_renderer = self._unwrapped_renderer()
+        rule.setFilterExpression(expression)
+        self.layer.triggerRepaint()
+        self.logger.debug(f"Render filter on {self.layer.name()}: {expression}")
+
+    def clear(self):
+        """Put the original renderer back, or unwrap the year rule when the original is not known"""
+        if self.active:
+            if self._original_renderer is not None:
+                self.layer.setRenderer(self._original_renderer.clone())
+            else:
+                self.layer.setRenderer(self._unwrapped_renderer())
+            self.layer.triggerRepaint()
+            self.logger.debug(f"Render filter removed from {self.layer.name()}")
+        self._original_renderer = None
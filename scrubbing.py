@@ -0,0 +1,116 @@
+"""Incremental "time scrubbing" of a layer through consecutive year windows"""
+import logging
+
+from qgis.core import QgsProject, QgsFeatureRequest, QgsMemoryProviderUtils
+
+from .layer_utils import unfiltered_source
+
+
+class ScrubSession:
+    """Shows the features of the current year window in a memory overlay layer.
+
+    While scrubbing, the source layer is hidden and the overlay - styled with a
+    copy of the source renderer - holds only the features inside the window.
+    Each step asks the interval index for the features that entered or left
+    the window and adds/removes just those, so a step costs O(changed
+    features) instead of a provider rescan of the whole layer.
+    """
+
+    def __init__(self, layer, index):
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.layer = layer
+        self.index = index
+        self.window = None
+        self.overlay = None
+        self._source = None
+        self._overlay_ids = {}  # source fid -> overlay fid
+        self._source_was_visible = True
+
+    @property
+    def active(self):
+        """True while the overlay layer is in the project"""
+        return self.overlay is not None
+
+    def start(self, window):
+        """Create the overlay for the given (from, to) window and hide the source layer"""
+        if self.active:
+            self.step(window)
+            return
+        self._source = unfiltered_source(self.layer)
+        self.overlay = QgsMemoryProviderUtils.createMemoryLayer(
+            f"{self.layer.name()} (scrub)", self.layer.fields(), self.layer.wkbType(), self.layer.crs())
+        self.overlay.setRenderer(self.layer.renderer().clone())
+        if self.layer.labeling():
+            self.overlay.setLabeling(self.layer.labeling().clone())
+            self.overlay.setLabelsEnabled(self.layer.labelsEnabled())
+        self.overlay.setOpacity(self.layer.opacity())
+
+        # Put the overlay right above the source layer in the layer tree
+        project = QgsProject.instance()
+        project.addMapLayer(self.overlay, False)
+        node = project.layerTreeRoot().findLayer(self.layer.id())
+        if node:
+            parent = node.parent()
+            parent.insertLayer(parent.children().index(node), self.overlay)
+            self._source_was_visible = node.itemVisibilityChecked()
+            node.setItemVisibilityChecked(False)
+        else:
+            project.layerTreeRoot().insertLayer(0, self.overlay)
+
+        self._add(self.index.feature_ids(*window))
+        self.window = tuple(window)
+        self.overlay.triggerRepaint()
+        self.logger.debug(f"Scrub session started on {self.layer.name()} for window {window}: "
+                          f"{len(self._overlay_ids)} features")
+
+    def step(self, window):
+        """Move to a new window, adding and removing only the features that changed"""
+        window = tuple(window)
+        if not self.active:
+            self.start(window)
+            return len(self._overlay_ids)
+        if window == self.window:
+            return 0
+        entered, left = self.index.window_delta(self.window, window)
+        self._remove(left)
+        self._add(entered)
+        self.window = window
+        if entered or left:
+            self.overlay.triggerRepaint()
+        self.logger.debug(f"Scrub step to {window}: +{len(entered)} -{len(left)}")
+        return len(entered) + len(left)
+
+    def stop(self):
+        """Remove the overlay and show the source layer again"""
+        if not self.active:
+            return
+        project = QgsProject.instance()
+        node = project.layerTreeRoot().findLayer(self.layer.id())
+        if node:
+            node.setItemVisibilityChecked(self._source_was_visible)
+        project.removeMapLayer(self.overlay.id())
+        self.overlay = None
+        self._source = None
+        self._overlay_ids.clear()
+        self.window = None
+        self.logger.debug(f"Scrub session on {self.layer.name()} stopped")
+
+    def _add(self, fids):
+        """Copy the given source features into the overlay"""
+        fids = [fid for fid in fids if fid not in self._overlay_ids]
+        if not fids:
+            return
+        request = QgsFeatureRequest().setFilterFids(fids)
+        features = list(self._source.getFeatures(request))
+        ok, added = self.overlay.dataProvider().addFeatures(features)
+        if not ok:
+            self.logger.warning(f"Could not add {len(features)} features to the scrub overlay")
+            return
+        for source_feature, overlay_feature in zip(features, added):
+            self._overlay_ids[source_feature.id()] = overlay_feature.id()
+
+    def _remove(self, fids):
+        """Delete the given source features from the overlay"""
+        overlay_fids = [self._overlay_ids.pop(fid) for fid in fids if fid in self._overlay_ids]
+        if overlay_fids:
+            self.overlay.dataProvider().deleteFeatures(overlay_fids)
@@ -0,0 +1,135 @@
+"""Combined spatial and temporal index for "visible extent and year window" queries.
+
+A QgsSpatialIndex over the feature bounding boxes narrows a query to the
+features in the canvas extent; their begin/end years, kept in a dict next
+to it, then decide which of those fall in the year window. The index
+follows the layer's edit buffer feature by feature instead of being
+rebuilt after every edit.
+"""
+import logging
+
+from qgis.core import QgsSpatialIndex, QgsFeature, QgsGeometry, QgsFeatureRequest
+
+from .layer_utils import to_year
+
+
+class SpatioTemporalIndex:
+    """Bounding boxes in an R-tree plus the (begin, end) years of every feature"""
+
+    # Layer signals handled one feature at a time
+    EDIT_SIGNALS = ("featureAdded", "featureDeleted", "geometryChanged", "attributeValueChanged")
+
+    def __init__(self, begin_field, end_field):
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self._spatial = QgsSpatialIndex()
+        self._bounds = {}  # fid -> QgsRectangle stored in the R-tree
+        self._years = {}  # fid -> (begin, end); NULL years are kept as None and never match
+        self.stale = False  # Set when fids may have changed (commit, rollback); the owner rebuilds
+        self._layer = None
+        self._connections = []
+
+    def __len__(self):
+        return len(self._bounds)
+
+    @classmethod
+    def from_source(cls, source, fields, begin_field, end_field, task=None):
+        """Build the index with one geometry-and-years scan of a feature source; None when the task is canceled"""
+        index = cls(begin_field, end_field)
+        begin_idx, end_idx = fields.indexOf(begin_field), fields.indexOf(end_field)
+        request = QgsFeatureRequest().setSubsetOfAttributes([begin_idx, end_idx])
+        for i, feature in enumerate(source.getFeatures(request)):
+            if task is not None and i % 10000 == 0 and task.isCanceled():
+                return None
+            index.add_feature(feature, begin_idx, end_idx)
+        return index
+
+    def add(self, fid, bounds, begin, end):
+        """Insert or replace one feature"""
+        if fid in self._bounds:
+            self.remove(fid)
+        if bounds is None or bounds.isNull():
+            self._years[fid] = (begin, end)  # No geometry: never in an extent, but keep the years
+            return
+        self._spatial.addFeature(fid, bounds)
+        self._bounds[fid] = bounds
+        self._years[fid] = (begin, end)
+
+    def remove(self, fid):
+        """Remove one feature"""
+        self._years.pop(fid, None)
+        bounds = self._bounds.pop(fid, None)
+        if bounds is not None:
+            # deleteFeature() looks the entry up by the bounding box of the feature's geometry
+            feature = QgsFeature(fid)
+            feature.setGeometry(QgsGeometry.fromRect(bounds))
+            self._spatial.deleteFeature(feature)
+
+    def add_feature(self, feature, begin_idx, end_idx):
+        """Insert a QgsFeature, reading its bounding box and years"""
+        attributes = feature.attributes()
+        bounds = feature.geometry().boundingBox() if feature.hasGeometry() else None
+        self.add(feature.id(), bounds, to_year(attributes[begin_idx]), to_year(attributes[end_idx]))
+
+    def feature_ids(self, extent, from_year, to_year_val):
+        """Ids of the features whose bounding box intersects extent and whose years overlap the window"""
+        matches = []
+        for fid in self._spatial.intersects(extent):
+            begin, end = self._years.get(fid, (None, None))
+            if begin is not None and end is not None and begin <= to_year_val and end >= from_year:
+                matches.append(fid)
+        return matches
+
+    def count(self, extent, from_year, to_year_val):
+        """Number of features in the extent and the year window"""
+        return len(self.feature_ids(extent, from_year, to_year_val))
+
+    def request(self, extent, from_year, to_year_val):
+        """QgsFeatureRequest fetching exactly the features in the extent and window"""
+        return QgsFeatureRequest().setFilterFids(self.feature_ids(extent, from_year, to_year_val))
+
+    def attach(self, layer):
+        """Follow the layer's edits so the index stays current without a rebuild"""
+        self.detach()
+        self._layer = layer
+        fields = layer.fields()
+        begin_idx, end_idx = fields.indexOf(self.begin_field), fields.indexOf(self.end_field)
+
+        def added(fid):
+            feature = layer.getFeature(fid)
+            if feature.isValid():
+                self.add_feature(feature, begin_idx, end_idx)
+
+        def geometry_changed(fid, geometry):
+            begin, end = self._years.get(fid, (None, None))
+            self.add(fid, geometry.boundingBox() if not geometry.isNull() else None, begin, end)
+
+        def attribute_changed(fid, idx, value):
+            if fid in self._years and idx in (begin_idx, end_idx):
+                begin, end = self._years[fid]
+                if idx == begin_idx:
+                    begin = to_year(value)
+                else:
+                    end = to_year(value)
+                self._years[fid] = (begin, end)
+
+        def mark_stale(*args):
+            self.stale = True
+
+        slots = [("featureAdded", added), ("featureDeleted", self.remove),
+                 ("geometryChanged", geometry_changed), ("attributeValueChanged", attribute_changed),
+                 ("afterCommitChanges", mark_stale), ("afterRollBack", mark_stale)]
+        for name, slot in slots:
+            getattr(layer, name).connect(slot)
+            self._connections.append((name, slot))
+
+    def detach(self):
+        """Stop following the layer's edits"""
+        for name, slot in self._connections:
+            try:
+                getattr(self._layer, name).disconnect(slot)
+            except (TypeError, RuntimeError):
+                pass  # Layer already deleted
+        self._connections = []
+        self._layer = None
@@ -0,0 +1,884 @@
+"""Background QgsTasks used by the Year Range Filter plugin"""
+import datetime
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from qgis.core import (QgsTask, QgsApplication, QgsProject, QgsVectorLayer,
+                       QgsFeatureRequest, QgsExpression, Qgis)
+
+from .interval_index import YearIntervalIndex
+from .year_histogram import YearHistogram
+from .year_snapshot import YearSnapshot, SNAPSHOT_MAX_AGE
+from .spatiotemporal_index import SpatioTemporalIndex
+from .multi_window import WindowTally
+from .estimation import ReservoirSample, ColumnStats, StatsEstimator, DEFAULT_SAMPLE_SIZE
+from .frame_sets import FrameSets
+from .layer_utils import (unfiltered_source, year_filter_expression, date_filter_expression,
+                          expression_date_literal, iter_year_rows, to_year, to_ordinal, set_year_subset)
+from .pushdown import FilterPushdown, offer_index_creation
+from .timing import timings
+from .window_export import export_year_window
+from .window_comparison import comparison_for
+
+# Python wrappers of running tasks must stay referenced until the task ends,
+# otherwise they are garbage collected while QGIS still owns the C++ object.
+_running_tasks = set()
+
+# (layer id, begin field, end field) of snapshots currently being retaken
+_refreshing_snapshots = set()
+
+
+def start_task(task):
+    """Hand a task to the QGIS task manager and keep it alive until it completes"""
+    _running_tasks.add(task)
+    task.taskCompleted.connect(lambda: _running_tasks.discard(task))
+    task.taskTerminated.connect(lambda: _running_tasks.discard(task))
+    QgsApplication.taskManager().addTask(task)
+    return task
+
+
+def refresh_snapshot_if_stale(layer, begin_field, end_field, index_manager):
+    """Retake a remote layer's snapshot in the background once it is older than SNAPSHOT_MAX_AGE"""
+    key = (layer.id(), begin_field, end_field)
+    snapshot = index_manager.cached_snapshot(layer, begin_field, end_field)
+    if snapshot is None or not snapshot.is_stale(SNAPSHOT_MAX_AGE) or key in _refreshing_snapshots:
+        return None
+    _refreshing_snapshots.add(key)
+    task = SnapshotTask(layer, begin_field, end_field, index_manager)
+    task.taskCompleted.connect(lambda: _refreshing_snapshots.discard(key))
+    task.taskTerminated.connect(lambda: _refreshing_snapshots.discard(key))
+    return start_task(task)
+
+
+def count_features(source, request, task=None):
+    """Count the features a request returns, stopping early when the task is canceled"""
+    request.setFlags(request.flags() | QgsFeatureRequest.NoGeometry)
+    count = 0
+    for _ in source.getFeatures(request):
+        count += 1
+        if task is not None and count % 10000 == 0 and task.isCanceled():
+            return None
+    return count
+
+
+class _TaskCanceled(Exception):
+    """Raised inside a task's run() to unwind when the user cancels it"""
+
+
+class _SourceSnapshot:
+    """The QgsFeatureSource methods export_year_window uses, readable from a worker thread.
+
+    Captured on the main thread, like _LayerJob, so the task never touches the layer itself.
+    """
+
+    def __init__(self, layer):
+        self._fields = layer.fields()
+        self._wkb_type = layer.wkbType()
+        self._crs = layer.crs()
+        self._count = layer.featureCount()
+        self._source = unfiltered_source(layer)
+
+    def fields(self):
+        return self._fields
+
+    def wkbType(self):
+        return self._wkb_type
+
+    def sourceCrs(self):
+        return self._crs
+
+    def featureCount(self):
+        return self._count
+
+    def getFeatures(self, request):
+        return self._source.getFeatures(request)
+
+
+class _LayerJob:
+    """Snapshot of one layer taken on the main thread so workers never touch the layer itself"""
+
+    def __init__(self, layer):
+        self.layer_id = layer.id()
+        self.name = layer.name()
+        self.provider = layer.providerType()
+        self.fields = layer.fields()
+        self.source = unfiltered_source(layer)
+        self.pushdown = FilterPushdown(layer)
+        self.subset = None # Provider-specific form of the filter, set by the worker
+        self.count = None
+
+
+class BatchFilterTask(QgsTask):
+    """Applies one year window to every vector layer that has the configured year fields.
+
+    Only layers with both year fields get a job; their feature counts run
+    concurrently on a thread pool, and the subset strings are set and the
+    canvas is refreshed once, on the main thread, when all layers are done.
+
+    Like FilterTask, from_year and to_year may be datetime.date values for
+    a window with day precision.
+    """
+
+    def __init__(self, layers, begin_field, end_field, from_year, to_year,
+                 iface=None, index_manager=None, max_workers=None):
+        super().__init__(f"Jaarfilter {from_year}-{to_year} op alle lagen", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.iface = iface
+        self.index_manager = index_manager
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.from_year = from_year
+        self.to_year = to_year
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.precision = "day" if isinstance(from_year, datetime.date) else "year"
+        if self.precision == "day":
+            self.expression = date_filter_expression(begin_field, end_field, from_year, to_year)
+            window = (from_year.toordinal(), to_year.toordinal())
+        else:
+            self.expression = year_filter_expression(begin_field, end_field, from_year, to_year)
+            window = (from_year, to_year)
+        self.jobs = []
+        for layer in layers:
+            if not isinstance(layer, QgsVectorLayer) or not layer.isValid():
+                continue
+            # Checked before the snapshot, so layers without the fields cost nothing on the main thread
+            fields = layer.fields()
+            if fields.indexOf(begin_field) < 0 or fields.indexOf(end_field) < 0:
+                continue
+            job = _LayerJob(layer)
+            # Layers that already have an interval index are counted without a scan
+            index = (index_manager.cached_index(layer, begin_field, end_field, self.precision)
+                     if index_manager else None)
+            if index is not None:
+                job.count = index.count(*window)
+            self.jobs.append(job)
+        self.exception = None
+
+    def _plan_and_count(self, job):
+        """Worker: plan the filter of one layer and count its matching features"""
+        if self.isCanceled():
+            return job
+        job.subset = job.pushdown.plan(self.begin_field, self.end_field, self.from_year, self.to_year).expression
+        if job.count is not None:
+            return job
+        if self.precision == "day":
+            expression = date_filter_expression(self.begin_field, self.end_field, self.from_year, self.to_year,
+                                                expression_date_literal)
+        else:
+            expression = year_filter_expression(self.begin_field, self.end_field, self.from_year, self.to_year,
+                                                job.fields)
+        request = QgsFeatureRequest().setFilterExpression(expression)
+        request.setSubsetOfAttributes([self.begin_field, self.end_field], job.fields)
+        with timings.span("count (scan)", (job.name, job.provider)):
+            job.count = count_features(job.source, request, self)
+        return job
+
+    def run(self):
+        """Check and count all layers on a worker pool"""
+        if not self.jobs:
+            return True
+        try:
+            done = 0
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(self._plan_and_count, job) for job in self.jobs]
+                for future in as_completed(futures):
+                    future.result()
+                    done += 1
+                    self.setProgress(100.0 * done / len(self.jobs))
+                    if self.isCanceled():
+                        for pending in futures:
+                            pending.cancel()
+                        return False
+            return True
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Apply the subset strings on the main thread and refresh the canvas once"""
+        if not result:
+            if self.exception is not None:
+                error_msg = f"Error filtering layers: {str(self.exception)}"
+                self.logger.error(error_msg, exc_info=self.exception)
+                self._push("Error", error_msg, Qgis.Critical, 5)
+            else:
+                self.logger.info("Batch year filter canceled.")
+                self._push("Info", "Filteren van alle lagen geannuleerd.", Qgis.Info, 3)
+            return
+
+        project = QgsProject.instance()
+        filtered_layers = 0
+        total = 0
+        for job in self.jobs:
+            layer = project.mapLayer(job.layer_id)
+            if layer is None or job.count is None:
+                continue
+            subset = job.subset or self.expression
+            with timings.span("setSubsetString", layer):
+                if self.index_manager is not None:
+                    with self.index_manager.ignoring_changes(layer):
+                        set_year_subset(layer, subset)
+                else:
+                    set_year_subset(layer, subset)
+            if self.iface and self.iface.layerTreeView():
+                with timings.span("refreshLayerSymbology", layer):
+                    self.iface.layerTreeView().refreshLayerSymbology(layer.id())
+            filtered_layers += 1
+            total += job.count
+            self.logger.debug(f"Batch filter applied to {job.name}: {job.count} features")
+
+        if self.iface and self.iface.mapCanvas():
+            with timings.span("mapCanvas.refresh", ("(alle lagen)", "")):
+                self.iface.mapCanvas().refresh()
+
+        message = (f"Filter {self.from_year}-{self.to_year} toegepast op {filtered_layers} lagen: "
+                   f"{total} objecten komen overeen.")
+        self.logger.info(message)
+        self._push("Success", message, Qgis.Success, 4)
+
+    def _push(self, title, message, level, duration):
+        """Show a message in the QGIS message bar when an interface is available"""
+        if self.iface:
+            self.iface.messageBar().pushMessage(title, message, level=level, duration=duration)
+
+
+class FilterTask(QgsTask):
+    """Validates and counts a year window for one layer off the GUI thread.
+
+    The count comes from the layer's interval index; if none is cached yet it
+    is built here, in the background, with progress reporting. Layers behind
+    remote providers use a YearSnapshot instead, so the provider is asked
+    for the three columns once rather than for a count per window. Only the
+    cheap parts - setting the subset string and refreshing the canvas -
+    happen on the main thread, in finished().
+
+    from_year and to_year may also be datetime.date values; the window is
+    then filtered with day precision and counted from an index of date
+    ordinals.
+
+    In estimation mode (estimate=True) a layer without a cached index or
+    snapshot is not scanned at all: the reported count is the estimate of
+    the layer's count estimator, if one has been prepared.
+    """
+
+    def __init__(self, layer, begin_field, end_field, from_year, to_year, iface=None, index_manager=None,
+                 pushdown=None, notify=True, estimate=False):
+        super().__init__(f"Jaarfilter {from_year}-{to_year} op {layer.name()}", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.iface = iface
+        self.notify = notify  # False for live updates: only errors reach the message bar
+        self.index_manager = index_manager
+        self.pushdown = pushdown
+        self.plan = None
+        self.layer_id = layer.id()
+        self.layer_name = layer.name()
+        self.timing_key = (layer.name(), layer.providerType())
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.from_year = from_year
+        self.to_year = to_year
+        self.fields = layer.fields()
+        self.precision = "day" if isinstance(from_year, datetime.date) else "year"
+        if self.precision == "day":
+            self.expression = date_filter_expression(begin_field, end_field, from_year, to_year)
+            self.window = (from_year.toordinal(), to_year.toordinal())
+        else:
+            self.expression = year_filter_expression(begin_field, end_field, from_year, to_year, self.fields)
+            self.window = (from_year, to_year)
+        self.index = (index_manager.cached_index(layer, begin_field, end_field, self.precision)
+                      if index_manager else None)
+        self.built_index = False
+        # Snapshots hold years, so date-precision filters use a day index even on remote layers
+        self.remote = (index_manager is not None and index_manager.is_remote(layer)
+                       and self.precision == "year")
+        self.snapshot = index_manager.cached_snapshot(layer, begin_field, end_field) if self.remote else None
+        self.built_snapshot = False
+        self.estimate_mode = estimate
+        self.estimator = (index_manager.cached_estimator(layer, begin_field, end_field)
+                          if estimate and index_manager and self.precision == "year" else None)
+        self.estimate = None
+        if self.index is None and self.snapshot is None and not self.estimate_mode:
+            self.source = unfiltered_source(layer)
+            with timings.span("featureCount", layer):
+                self.total = max(layer.featureCount(), 0)
+        self.count = None
+        self.error = None
+        self.exception = None
+
+    def _validate(self):
+        """Return an error message if the filter cannot be applied to the layer, else None"""
+        missing = [name for name in (self.begin_field, self.end_field) if self.fields.indexOf(name) < 0]
+        if missing:
+            return f"Laag '{self.layer_name}' mist de velden: {', '.join(missing)}"
+        if self.plan is not None and self.plan.native_sql:
+            return None # Native SQL is checked by the provider itself when the subset is set
+        expression = QgsExpression(self.expression)
+        if expression.hasParserError():
+            return f"Ongeldige filterexpressie: {expression.parserErrorString()}"
+        return None
+
+    def _rows(self):
+        """Year rows of the source with progress reporting and cancellation checks"""
+        convert = to_ordinal if self.precision == "day" else to_year
+        rows = iter_year_rows(self.source, self.fields, self.begin_field, self.end_field, convert)
+        for i, row in enumerate(rows):
+            if i % 10000 == 0:
+                if self.isCanceled():
+                    raise _TaskCanceled()
+                if self.total:
+                    self.setProgress(min(99.0, 100.0 * i / self.total))
+            yield row
+
+    def run(self):
+        """Validate the window and count the matching features"""
+        try:
+            if self.pushdown is not None and self.fields.indexOf(self.begin_field) >= 0:
+                with timings.span("pushdown plan", self.timing_key):
+                    self.plan = self.pushdown.plan(self.begin_field, self.end_field, self.from_year, self.to_year)
+                self.expression = self.plan.expression
+            self.error = self._validate()
+            if self.error:
+                return False
+            if self.index is None and self.snapshot is None and not self.estimate_mode:
+                if self.remote:
+                    # One attribute-only request; every later window is evaluated locally
+                    with timings.span("snapshot", self.timing_key):
+                        self.snapshot = YearSnapshot(self._rows())
+                    self.built_snapshot = True
+                else:
+                    with timings.span("index build", self.timing_key):
+                        self.index = YearIntervalIndex(self._rows())
+                    self.built_index = True
+            if self.index is not None:
+                with timings.span("count (index)", self.timing_key):
+                    self.count = self.index.count(*self.window)
+            elif self.snapshot is not None:
+                with timings.span("count (snapshot)", self.timing_key):
+                    self.count = self.snapshot.count(*self.window)
+            elif self.estimator is not None:
+                with timings.span("count (estimate)", self.timing_key):
+                    self.estimate = self.estimator.estimate(*self.window)
+            self.setProgress(100.0)
+            return True
+        except _TaskCanceled:
+            return False
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Apply the subset string and report the count on the main thread"""
+        layer = QgsProject.instance().mapLayer(self.layer_id)
+        if not result:
+            if self.error or self.exception is not None:
+                error_msg = f"Error applying filter to layer {self.layer_name}: {self.error or str(self.exception)}"
+                self.logger.error(error_msg, exc_info=self.exception)
+                self._push("Error", error_msg, Qgis.Critical, 5)
+            else:
+                self.logger.info(f"Filter on layer {self.layer_name} canceled.")
+                if self.notify:
+                    self._push("Info", f"Filter op laag '{self.layer_name}' geannuleerd.", Qgis.Info, 3)
+            return
+        if layer is None:
+            self.logger.warning(f"Layer {self.layer_name} was removed before the filter could be applied.")
+            return
+        if self.isCanceled():
+            # Superseded by a newer window after run() had already finished
+            self.logger.debug(f"Filter on layer {self.layer_name} superseded; subset string left unchanged.")
+            return
+
+        if self.index_manager is not None:
+            if self.built_index:
+                self.index_manager.store(layer, self.begin_field, self.end_field, self.index, self.precision)
+            if self.built_snapshot:
+                self.index_manager.store_snapshot(layer, self.begin_field, self.end_field, self.snapshot)
+            elif self.snapshot is not None:
+                refresh_snapshot_if_stale(layer, self.begin_field, self.end_field, self.index_manager)
+            with self.index_manager.ignoring_changes(layer), timings.span("setSubsetString", layer):
+                set_year_subset(layer, self.expression)
+        else:
+            with timings.span("setSubsetString", layer):
+                set_year_subset(layer, self.expression)
+
+        if self.iface and self.iface.mapCanvas():
+            with timings.span("mapCanvas.refresh", layer):
+                self.iface.mapCanvas().refresh()
+        if self.iface and self.iface.layerTreeView():
+            with timings.span("refreshLayerSymbology", layer):
+                self.iface.layerTreeView().refreshLayerSymbology(layer.id())
+
+        if self.estimate_mode and self.count is None:
+            matches = self.estimate.describe() if self.estimate is not None else "een onbekend aantal"
+        else:
+            matches = self.count
+        message = f"Filter toegepast op laag '{self.layer_name}': {matches} objecten komen overeen."
+        self.logger.info(message)
+        if self.notify:
+            self._push("Success", message, Qgis.Success, 4)
+
+        if self.plan is not None:
+            self.logger.info(f"Filter on {self.layer_name} evaluated by {self.plan.describe()}")
+            if self.plan.full_scan and self.plan.can_create_index and self.iface and self.notify:
+                offer_index_creation(self.iface, layer, self.pushdown, [self.begin_field, self.end_field])
+
+    def _push(self, title, message, level, duration):
+        """Show a message in the QGIS message bar when an interface is available"""
+        if self.iface:
+            self.iface.messageBar().pushMessage(title, message, level=level, duration=duration)
+
+
+class HistogramTask(QgsTask):
+    """Builds the per-year histogram of a layer in the background and stores it in the index manager.
+
+    For remote layers the same scan also yields the layer's YearSnapshot.
+    """
+
+    def __init__(self, layer, begin_field, end_field, index_manager, min_year, max_year):
+        super().__init__(f"Jaarhistogram voor {layer.name()}", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.layer_id = layer.id()
+        self.layer_name = layer.name()
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.index_manager = index_manager
+        self.min_year = min_year
+        self.max_year = max_year
+        self.fields = layer.fields()
+        self.source = unfiltered_source(layer)
+        self.total = max(layer.featureCount(), 0)
+        self.remote = index_manager.is_remote(layer)
+        self.histogram = None
+        self.snapshot = None
+        self.exception = None
+
+    def run(self):
+        """Scan the year fields once"""
+        try:
+            histogram = YearHistogram(self.min_year, self.max_year)
+            rows = iter_year_rows(self.source, self.fields, self.begin_field, self.end_field)
+            snapshot_rows = [] if self.remote else None
+            for i, row in enumerate(rows):
+                if i % 10000 == 0:
+                    if self.isCanceled():
+                        return False
+                    if self.total:
+                        self.setProgress(min(99.0, 100.0 * i / self.total))
+                _, begin, end = row
+                if begin is not None and end is not None:
+                    histogram.add(begin, end)
+                    if snapshot_rows is not None:
+                        snapshot_rows.append(row)
+            histogram.finalize()
+            self.histogram = histogram
+            if snapshot_rows is not None:
+                self.snapshot = YearSnapshot(snapshot_rows)
+            return True
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Hand the histogram to the index manager, which also persists it"""
+        layer = QgsProject.instance().mapLayer(self.layer_id)
+        if not result or layer is None:
+            if self.exception is not None:
+                self.logger.error(f"Error building year histogram for {self.layer_name}: {str(self.exception)}",
+                                  exc_info=self.exception)
+            return
+        if self.snapshot is not None:
+            self.index_manager.store_snapshot(layer, self.begin_field, self.end_field, self.snapshot)
+        self.index_manager.store_histogram(layer, self.begin_field, self.end_field, self.histogram)
+        self.logger.debug(f"Year histogram for {self.layer_name} built over {self.histogram.total} features")
+
+
+class SnapshotTask(QgsTask):
+    """Retakes the YearSnapshot of a remote layer in the background"""
+
+    def __init__(self, layer, begin_field, end_field, index_manager):
+        super().__init__(f"Jaarsnapshot voor {layer.name()}", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.layer_id = layer.id()
+        self.layer_name = layer.name()
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.index_manager = index_manager
+        self.timing_key = (layer.name(), layer.providerType())
+        self.fields = layer.fields()
+        self.source = unfiltered_source(layer)
+        self.snapshot = None
+        self.exception = None
+
+    def _rows(self):
+        """Year rows of the source with cancellation checks"""
+        for i, row in enumerate(iter_year_rows(self.source, self.fields, self.begin_field, self.end_field)):
+            if i % 10000 == 0 and self.isCanceled():
+                raise _TaskCanceled()
+            yield row
+
+    def run(self):
+        """Fetch the id and year columns with one attribute-only request"""
+        try:
+            with timings.span("snapshot", self.timing_key):
+                self.snapshot = YearSnapshot(self._rows())
+            return True
+        except _TaskCanceled:
+            return False
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Replace the cached snapshot on the main thread"""
+        layer = QgsProject.instance().mapLayer(self.layer_id)
+        if not result or layer is None:
+            if self.exception is not None:
+                self.logger.error(f"Error refreshing year snapshot for {self.layer_name}: {str(self.exception)}",
+                                  exc_info=self.exception)
+            return
+        self.index_manager.store_snapshot(layer, self.begin_field, self.end_field, self.snapshot)
+        self.logger.debug(f"Year snapshot for {self.layer_name} refreshed: {len(self.snapshot)} features")
+
+
+class MultiWindowTask(QgsTask):
+    """Counts several year windows in one pass over the layer and styles it by window combination.
+
+    The rows come from the layer's cached interval index or snapshot when
+    there is one; otherwise the year fields are read once and the index (or,
+    for remote layers, the snapshot) is kept for later filters.
+    """
+
+    def __init__(self, layer, begin_field, end_field, windows, index_manager, iface=None):
+        super().__init__(f"{len(windows)} jaarbereiken vergelijken op {layer.name()}", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.iface = iface
+        self.layer_id = layer.id()
+        self.layer_name = layer.name()
+        self.timing_key = (layer.name(), layer.providerType())
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.windows = list(windows)
+        self.index_manager = index_manager
+        self.remote = index_manager.is_remote(layer)
+        self.cached_rows = index_manager.cached_index(layer, begin_field, end_field)
+        if self.cached_rows is None:
+            self.cached_rows = index_manager.cached_snapshot(layer, begin_field, end_field)
+        if self.cached_rows is None:
+            self.fields = layer.fields()
+            self.source = unfiltered_source(layer)
+            self.total = max(layer.featureCount(), 0)
+        self.built = None  # YearIntervalIndex or YearSnapshot built from the single read
+        self.tally = None
+        self.exception = None
+
+    def _rows(self):
+        """Year rows of the source with progress reporting and cancellation checks"""
+        for i, row in enumerate(iter_year_rows(self.source, self.fields, self.begin_field, self.end_field)):
+            if i % 10000 == 0:
+                if self.isCanceled():
+                    raise _TaskCanceled()
+                if self.total:
+                    self.setProgress(min(99.0, 100.0 * i / self.total))
+            yield row
+
+    def run(self):
+        """Tag every feature with the windows it overlaps"""
+        try:
+            with timings.span("multi-window tally", self.timing_key):
+                if self.cached_rows is not None:
+                    # Cached rows leave out NULL years; count them like a fresh read does
+                    self.tally = WindowTally.from_rows(self.cached_rows.rows(), self.windows,
+                                                       self.cached_rows.skipped)
+                else:
+                    rows = list(self._rows())
+                    self.tally = WindowTally.from_rows(rows, self.windows)
+                    self.built = YearSnapshot(rows) if self.remote else YearIntervalIndex(rows)
+            return True
+        except _TaskCanceled:
+            return False
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Style the layer by window combination and report the counts"""
+        layer = QgsProject.instance().mapLayer(self.layer_id)
+        if not result or layer is None:
+            if self.exception is not None:
+                error_msg = f"Error comparing year windows on layer {self.layer_name}: {str(self.exception)}"
+                self.logger.error(error_msg, exc_info=self.exception)
+                self._push("Error", error_msg, Qgis.Critical, 5)
+            return
+        if self.built is not None:
+            if self.remote:
+                self.index_manager.store_snapshot(layer, self.begin_field, self.end_field, self.built)
+            else:
+                self.index_manager.store(layer, self.begin_field, self.end_field, self.built)
+        comparison_for(layer).apply(self.begin_field, self.end_field, self.tally)
+        message = f"Jaarbereiken op laag '{self.layer_name}': {', '.join(self.tally.summary())}"
+        self.logger.info(message)
+        self._push("Success", message, Qgis.Success, 6)
+
+    def _push(self, title, message, level, duration):
+        """Show a message in the QGIS message bar when an interface is available"""
+        if self.iface:
+            self.iface.messageBar().pushMessage(title, message, level=level, duration=duration)
+
+
+class FrameSetsTask(QgsTask):
+    """Precomputes the feature changes between the frames of a temporal animation in the background"""
+
+    def __init__(self, layer, begin_field, end_field, windows, index_manager):
+        super().__init__(f"Animatieframes voor {layer.name()}", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.layer_id = layer.id()
+        self.layer_name = layer.name()
+        self.timing_key = (layer.name(), layer.providerType())
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.windows = list(windows)
+        self.index_manager = index_manager
+        self.index = index_manager.cached_index(layer, begin_field, end_field)
+        self.built_index = False
+        if self.index is None:
+            self.fields = layer.fields()
+            self.source = unfiltered_source(layer)
+        self.frames = None
+        self.exception = None
+
+    def _rows(self):
+        """Year rows of the source with cancellation checks"""
+        for i, row in enumerate(iter_year_rows(self.source, self.fields, self.begin_field, self.end_field)):
+            if i % 10000 == 0 and self.isCanceled():
+                raise _TaskCanceled()
+            yield row
+
+    def run(self):
+        """Build the interval index if needed, then the delta of every frame step"""
+        try:
+            if self.index is None:
+                with timings.span("index build", self.timing_key):
+                    self.index = YearIntervalIndex(self._rows())
+                self.built_index = True
+            with timings.span("frame sets", self.timing_key):
+                self.frames = FrameSets(self.index, self.windows, is_canceled=self.isCanceled)
+            return self.frames.complete
+        except _TaskCanceled:
+            return False
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Keep an index built here for later filters"""
+        layer = QgsProject.instance().mapLayer(self.layer_id)
+        if not result or layer is None:
+            if self.exception is not None:
+                self.logger.error(f"Error precomputing animation frames for {self.layer_name}: "
+                                  f"{str(self.exception)}", exc_info=self.exception)
+            return
+        if self.built_index:
+            self.index_manager.store(layer, self.begin_field, self.end_field, self.index)
+        self.logger.debug(f"Precomputed {len(self.frames)} animation frames for {self.layer_name}")
+
+
+class EstimateTask(QgsTask):
+    """Prepares approximate window counts for a PostgreSQL layer without scanning the table.
+
+    The planner statistics of the year columns are used when ANALYZE has
+    collected them; otherwise a TABLESAMPLE of the table fills a reservoir
+    sample. Either way only a few catalog rows or sampled pages are read.
+    """
+
+    def __init__(self, layer, begin_field, end_field, pushdown, index_manager):
+        super().__init__(f"Schatting voor {layer.name()}", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.layer_id = layer.id()
+        self.layer_name = layer.name()
+        self.timing_key = (layer.name(), layer.providerType())
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.pushdown = pushdown
+        self.index_manager = index_manager
+        self.estimator = None
+        self.error = None
+        self.exception = None
+
+    def _statistics_estimator(self, total):
+        """StatsEstimator from pg_stats, or None when the columns have no numeric statistics"""
+        stats = self.pushdown.postgres_column_statistics([self.begin_field, self.end_field])
+        if self.begin_field not in stats or self.end_field not in stats:
+            return None
+        try:
+            return StatsEstimator(total, ColumnStats.from_pg_stats(*stats[self.begin_field]),
+                                  ColumnStats.from_pg_stats(*stats[self.end_field]))
+        except ValueError:
+            return None  # Date or text columns: their histogram bounds are not years
+
+    def run(self):
+        """Read the planner statistics, or sample the table if there are none"""
+        try:
+            with timings.span("estimator", self.timing_key):
+                total = self.pushdown.postgres_row_estimate()
+                if total is None:
+                    self.error = "de tabel heeft geen statistieken; voer ANALYZE uit"
+                    return False
+                self.estimator = self._statistics_estimator(total)
+                if self.estimator is None:
+                    percent = min(100.0, max(0.01, 200.0 * DEFAULT_SAMPLE_SIZE / total))
+                    sample = ReservoirSample(population=total)
+                    for begin, end in self.pushdown.postgres_sample([self.begin_field, self.end_field], percent):
+                        sample.add(to_year(begin), to_year(end))
+                    self.estimator = sample
+            return True
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Keep the estimator in the index manager"""
+        layer = QgsProject.instance().mapLayer(self.layer_id)
+        if not result or layer is None:
+            if self.error or self.exception is not None:
+                self.logger.warning(f"No count estimate for {self.layer_name}: {self.error or str(self.exception)}",
+                                    exc_info=self.exception)
+            return
+        self.index_manager.store_estimator(layer, self.begin_field, self.end_field, self.estimator)
+        self.logger.debug(f"Count estimator for {self.layer_name}: {type(self.estimator).__name__}")
+
+
+class ExactCountTask(QgsTask):
+    """Counts a year window exactly in the background, on request, after an estimate was shown"""
+
+    def __init__(self, layer, begin_field, end_field, window, pushdown):
+        super().__init__(f"Exact tellen {window[0]}-{window[1]} in {layer.name()}", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.layer_name = layer.name()
+        self.timing_key = (layer.name(), layer.providerType())
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.window = tuple(window)
+        self.pushdown = pushdown
+        if pushdown.kind != "postgres":
+            self.fields = layer.fields()
+            self.source = unfiltered_source(layer)
+        self.count = None
+        self.exception = None
+
+    def run(self):
+        """Let PostgreSQL count with the pushed-down predicate, or count the provider's matches"""
+        try:
+            with timings.span("exact count", self.timing_key):
+                if self.pushdown.kind == "postgres":
+                    plan = self.pushdown.plan(self.begin_field, self.end_field, *self.window)
+                    self.count = self.pushdown.postgres_count(plan.expression)
+                else:
+                    request = QgsFeatureRequest().setFilterExpression(year_filter_expression(
+                        self.begin_field, self.end_field, self.window[0], self.window[1], self.fields))
+                    request.setNoAttributes()
+                    self.count = count_features(self.source, request, self)
+            return self.count is not None
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Log failures; the panel reads the count"""
+        if not result and self.exception is not None:
+            self.logger.error(f"Error counting features in {self.layer_name}: {str(self.exception)}",
+                              exc_info=self.exception)
+
+
+class SpatioTemporalIndexTask(QgsTask):
+    """Builds the SpatioTemporalIndex of a layer in the background and stores it in the index manager"""
+
+    def __init__(self, layer, begin_field, end_field, index_manager):
+        super().__init__(f"Ruimte-tijd-index voor {layer.name()}", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.layer_id = layer.id()
+        self.layer_name = layer.name()
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.index_manager = index_manager
+        self.timing_key = (layer.name(), layer.providerType())
+        self.fields = layer.fields()
+        self.source = unfiltered_source(layer)
+        self.index = None
+        self.exception = None
+
+    def run(self):
+        """Read every bounding box and year pair once"""
+        try:
+            with timings.span("spatiotemporal index", self.timing_key):
+                self.index = SpatioTemporalIndex.from_source(self.source, self.fields, self.begin_field,
+                                                             self.end_field, task=self)
+            return self.index is not None
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Hand the index to the index manager, which attaches it to the layer's edits"""
+        layer = QgsProject.instance().mapLayer(self.layer_id)
+        if not result or layer is None:
+            if self.exception is not None:
+                self.logger.error(f"Error building spatio-temporal index for {self.layer_name}: "
+                                  f"{str(self.exception)}", exc_info=self.exception)
+            return
+        self.index_manager.store_spatiotemporal(layer, self.begin_field, self.end_field, self.index)
+        self.logger.debug(f"Spatio-temporal index for {self.layer_name} holds {len(self.index)} features")
+
+
+class ExportWindowTask(QgsTask):
+    """Streams the features of one year window to a file, leaving the layer's subset string alone"""
+
+    def __init__(self, layer, begin_field, end_field, window, path, iface=None, attributes=None):
+        super().__init__(f"Jaarbereik {window[0]}-{window[1]} exporteren uit {layer.name()}", QgsTask.CanCancel)
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.iface = iface
+        self.layer_name = layer.name()
+        self.timing_key = (layer.name(), layer.providerType())
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.window = tuple(window)
+        self.path = path
+        self.attributes = attributes
+        self.source = _SourceSnapshot(layer)
+        self.transform_context = QgsProject.instance().transformContext()
+        self.count = None
+        self.exception = None
+
+    def run(self):
+        """Read the provider once and write the matching features in batches"""
+        try:
+            with timings.span("export window", self.timing_key):
+                # A QgsTask offers the isCanceled()/setProgress() pair the exporter expects from a feedback
+                self.count = export_year_window(self.source, self.begin_field, self.end_field, self.window,
+                                                self.path, feedback=self, transform_context=self.transform_context,
+                                                attributes=self.attributes)
+            return not self.isCanceled()
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Report the export in the message bar"""
+        if not result:
+            if self.exception is not None:
+                error_msg = f"Error exporting year window from layer {self.layer_name}: {str(self.exception)}"
+                self.logger.error(error_msg, exc_info=self.exception)
+                self._push("Error", error_msg, Qgis.Critical, 5)
+            else:
+                self.logger.info(f"Export from layer {self.layer_name} canceled.")
+                self._push("Info", f"Export uit laag '{self.layer_name}' geannuleerd; {self.path} is onvolledig.",
+                           Qgis.Warning, 5)
+            return
+        message = (f"{self.count} objecten ({self.window[0]}-{self.window[1]}) uit laag '{self.layer_name}' "
+                   f"geëxporteerd naar {self.path}")
+        self.logger.info(message)
+        self._push("Success", message, Qgis.Success, 5)
+
+    def _push(self, title, message, level, duration):
+        """Show a message in the QGIS message bar when an interface is available"""
+        if self.iface:
+            self.iface.messageBar().pushMessage(title, message, level=level, duration=duration)
@@ -0,0 +1,136 @@
+"""Integration with the QGIS temporal controller.
+
+The year fields are registered as the layer's temporal properties, so the
+layer takes part in QGIS's own time handling, and the panel follows the
+controller's current frame. Frames are shown through the scrub overlay;
+the feature changes between consecutive frames of the controller's
+animation are precomputed in a background task (see frame_sets), so a
+frame change evaluates no expressions.
+"""
+import logging
+
+from qgis.core import QgsVectorLayerTemporalProperties, QgsExpression
+
+from .frame_sets import year_window, frame_windows
+from .layer_utils import field_kind, TEXT_YEAR_PATTERN
+from .tasks import FrameSetsTask, start_task
+
+# Animations with more frames than this are followed without precomputed frames
+MAX_PRECOMPUTED_FRAMES = 20000
+
+
+def temporal_expressions(fields, begin_field, end_field):
+    """Start and exclusive end expressions of a feature's time span, matching the year filter"""
+    def bound(name, start):
+        column = QgsExpression.quotedColumnRef(name)
+        kind = field_kind(fields.field(name))
+        if kind == "date":
+            return column if start else f"{column} + to_interval('1 day')"
+        if kind == "text":
+            # The leading year exactly as to_year() reads it; NULL when the text has none
+            pattern = QgsExpression.quotedString("^" + TEXT_YEAR_PATTERN)
+            year = f"to_int(nullif(regexp_substr({column}, {pattern}), ''))"
+        else:
+            year = column
+        return f"make_date({year}, 1, 1)" if start else f"make_date({year} + 1, 1, 1)"
+
+    return bound(begin_field, True), bound(end_field, False)
+
+
+def register_temporal_properties(layer, begin_field, end_field):
+    """Make the layer temporal, with its time span taken from the year fields"""
+    start, end = temporal_expressions(layer.fields(), begin_field, end_field)
+    properties = layer.temporalProperties()
+    properties.setMode(QgsVectorLayerTemporalProperties.ModeFeatureDateTimeStartAndEndFromExpressions)
+    properties.setStartExpression(start)
+    properties.setEndExpression(end)
+    properties.setIsActive(True)
+    logging.getLogger('YearRangeFilter').info(f"Temporal properties of {layer.name()} set to {start} - {end}")
+
+
+def _python_range(date_range):
+    """(begin, end, include end) of a QgsDateTimeRange as Python datetimes"""
+    return date_range.begin().toPyDateTime(), date_range.end().toPyDateTime(), date_range.includeEnd()
+
+
+class TemporalSync:
+    """Follows the temporal controller of a map canvas for one layer.
+
+    on_window((from, to)) is called for every frame the controller shows;
+    on_frames(FrameSets) once the frames of the current animation range
+    have been precomputed.
+    """
+
+    def __init__(self, controller, layer, begin_field, end_field, index_manager, on_window, on_frames):
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.controller = controller
+        self.layer = layer
+        self.begin_field = begin_field
+        self.end_field = end_field
+        self.index_manager = index_manager
+        self.on_window = on_window
+        self.on_frames = on_frames
+        self.frames = None  # FrameSets of the current animation range, once precomputed
+        self.frames_task = None
+        self._connections = []
+
+    def start(self):
+        """Register the temporal properties and start following the controller"""
+        register_temporal_properties(self.layer, self.begin_field, self.end_field)
+        signals = [("updateTemporalRange", self._on_range)]
+        # Only the navigation object of the main canvas knows its animation frames
+        for name in ("temporalExtentsChanged", "temporalFrameDurationChanged"):
+            if hasattr(self.controller, name):
+                signals.append((name, self.prepare_frames))
+        for name, slot in signals:
+            getattr(self.controller, name).connect(slot)
+            self._connections.append((name, slot))
+        self.prepare_frames()
+
+    def _on_range(self, date_range):
+        """Show the controller's current frame"""
+        if not date_range.begin().isValid() or not date_range.end().isValid():
+            return  # Infinite range: temporal navigation is off
+        self.on_window(year_window(*_python_range(date_range)))
+
+    def prepare_frames(self, *args):
+        """Precompute the frames of the controller's animation range in the background"""
+        self.frames = None
+        if self.frames_task is not None:
+            self.frames_task.cancel()
+            self.frames_task = None
+        if not hasattr(self.controller, "totalFrameCount"):
+            return
+        total = self.controller.totalFrameCount()
+        if total <= 0 or total > MAX_PRECOMPUTED_FRAMES:
+            self.logger.info(f"Animation of {total} frames is followed without precomputed frames")
+            return
+        frame_ranges = (self.controller.dateTimeRangeForFrameNumber(n) for n in range(total))
+        ranges = [_python_range(r) for r in frame_ranges if r.begin().isValid() and r.end().isValid()]
+        if not ranges:
+            return
+        task = FrameSetsTask(self.layer, self.begin_field, self.end_field, frame_windows(ranges),
+                             self.index_manager)
+        task.taskCompleted.connect(lambda: self._frames_ready(task))
+        self.frames_task = start_task(task)
+
+    def _frames_ready(self, task):
+        """Hand the precomputed frames to the panel, unless a newer range superseded them"""
+        if task is not self.frames_task:
+            return
+        self.frames_task = None
+        self.frames = task.frames
+        self.on_frames(self.frames)
+
+    def stop(self):
+        """Stop following the controller; the layer keeps its temporal properties"""
+        for name, slot in self._connections:
+            try:
+                getattr(self.controller, name).disconnect(slot)
+            except (TypeError, RuntimeError):
+                pass  # Controller already deleted
+        self._connections = []
+        if self.frames_task is not None:
+            self.frames_task.cancel()
+            self.frames_task = None
+        self.frames = None
@@ -0,0 +1,62 @@
+import unittest
+import random
+from estimation import ReservoirSample, ColumnStats, StatsEstimator, parse_pg_array
+
+class TestEstimation(unittest.TestCase):
+    def setUp(self):
+        """Random intervals and their exact window counts"""
+        rng = random.Random(23)
+        self.rows = [(b, b + rng.randint(0, 40)) for b in (rng.randint(1800, 2000) for _ in range(50000))]
+
+    def exact(self, from_year, to_year):
+        return sum(1 for begin, end in self.rows if begin <= to_year and end >= from_year)
+
+    def test_reservoir_bounds_contain_exact_count(self):
+        """Test that the 95% interval of a 2000-row sample contains the exact counts"""
+        sample = ReservoirSample(2000, seed=1)
+        for begin, end in self.rows:
+            sample.add(begin, end)
+        self.assertEqual(len(sample), 2000)
+        for window in [(1842, 1860), (1900, 1900), (1950, 2000)]:
+            estimate = sample.estimate(*window)
+            self.assertFalse(estimate.exact)
+            self.assertLessEqual(estimate.low, self.exact(*window))
+            self.assertGreaterEqual(estimate.high, self.exact(*window))
+
+    def test_small_reservoir_is_exact(self):
+        """Test that a sample holding every row gives the exact count"""
+        sample = ReservoirSample(100)
+        for begin, end in self.rows[:50] + [(None, None)]:
+            sample.add(begin, end)
+        estimate = sample.estimate(1842, 1900)
+        self.assertTrue(estimate.exact)
+        self.assertEqual(estimate.value, sum(1 for b, e in self.rows[:50] if b <= 1900 and e >= 1842))
+
+    def column_stats(self, values, buckets=100):
+        """Histogram-only statistics like ANALYZE would produce for the full column"""
+        ordered = sorted(values)
+        bounds = [ordered[min(i * len(ordered) // buckets, len(ordered) - 1)] for i in range(buckets + 1)]
+        return ColumnStats(0.0, [], [], bounds)
+
+    def test_stats_bounds_contain_exact_count(self):
+        """Test the pg_stats estimator against exact counts"""
+        estimator = StatsEstimator(len(self.rows), self.column_stats([b for b, _ in self.rows]),
+                                   self.column_stats([e for _, e in self.rows]))
+        for window in [(1842, 1860), (1900, 1900), (1700, 2100)]:
+            estimate = estimator.estimate(*window)
+            self.assertLessEqual(estimate.low, self.exact(*window))
+            self.assertGreaterEqual(estimate.high, self.exact(*window))
+        self.assertIsNone(estimator.estimate(1900, 1800))
+
+    def test_pg_stats_parsing(self):
+        """Test parsing of pg_stats array text, including common values"""
+        self.assertEqual(parse_pg_array('{1800,1850,"a,b"}'), ["1800", "1850", "a,b"])
+        self.assertEqual(parse_pg_array("{}"), [])
+        self.assertIsNone(parse_pg_array(None))
+        stats = ColumnStats.from_pg_stats("0.1", "{1900}", "{0.4}", "{1800,1850,2000}")
+        self.assertAlmostEqual(stats.fraction_le(1900)[0], 0.4 + 0.5 * (1 + 50 / 150) / 2)
+        with self.assertRaises(ValueError):
+            ColumnStats.from_pg_stats("0", "{abc}", "{1.0}", None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from field_detection import rank_year_fields, detect_year_fields
+
+class TestFieldDetection(unittest.TestCase):
+    def test_known_names(self):
+        """Test that the standard Dutch field names are found among other attributes"""
+        fields = [("fid", "int"), ("naam", "text"), ("beginjaar", "int"), ("eindjaar", "int"), ("opp", "int")]
+        self.assertEqual(detect_year_fields(fields), ("beginjaar", "eindjaar"))
+
+    def test_name_variants_and_types(self):
+        """Test separators, English names and date fields"""
+        self.assertEqual(detect_year_fields([("Begin_Jaar", "int"), ("Eind_Jaar", "int")]),
+                         ("Begin_Jaar", "Eind_Jaar"))
+        self.assertEqual(detect_year_fields([("start_year", "int"), ("end_year", "int")]),
+                         ("start_year", "end_year"))
+        self.assertEqual(detect_year_fields([("geom_area", "int"), ("valid_from", "date"), ("valid_to", "date")]),
+                         ("valid_from", "valid_to"))
+
+    def test_ranking_and_rejections(self):
+        """Test that integer fields beat text fields and that unrelated fields are not candidates"""
+        begin, end = rank_year_fields([("start_jaar_txt", "text"), ("start_jaar", "int"), ("total", "int"),
+                                       ("eind_jaar", "int"), ("stopcontact", "text"), ("van", "double")])
+        self.assertEqual(begin, ["start_jaar", "start_jaar_txt"])
+        self.assertEqual(end, ["eind_jaar"])
+        self.assertEqual(detect_year_fields([("naam", "text"), ("opp", "int")]), (None, None))
+
+if __name__ == '__main__':
+    unittest.main()
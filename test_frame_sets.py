@@ -0,0 +1,42 @@
+import unittest
+import random
+from datetime import datetime
+from interval_index import YearIntervalIndex
+from frame_sets import FrameSets, year_window, frame_windows
+
+class TestFrameSets(unittest.TestCase):
+    def setUp(self):
+        """Index over random intervals and one frame per year"""
+        rng = random.Random(22)
+        self.rows = [(fid, b, b + rng.randint(0, 30)) for fid, b in
+                     ((fid, rng.randint(1800, 1950)) for fid in range(1500))]
+        self.index = YearIntervalIndex(self.rows)
+        self.windows = [(year, year) for year in range(1840, 1900)]
+        self.frames = FrameSets(self.index, self.windows)
+
+    def test_deltas_match_index(self):
+        """Test that precomputed steps, forward and backward, equal the index's deltas"""
+        for old, new in [((1850, 1850), (1851, 1851)), ((1851, 1851), (1850, 1850)),
+                         ((1840, 1840), (1899, 1899)), ((1700, 1710), (1850, 1850))]:
+            self.assertEqual(self.frames.window_delta(old, new), self.index.window_delta(old, new))
+        self.assertEqual(len(self.frames), 60)
+        self.assertTrue(self.frames.complete)
+
+    def test_walk_reproduces_every_frame(self):
+        """Test that applying the deltas frame by frame gives each frame's feature set"""
+        current = set(self.frames.feature_ids(*self.windows[0]))
+        for old, new in zip(self.windows, self.windows[1:]):
+            entered, left = self.frames.window_delta(old, new)
+            current = (current - left) | entered
+            self.assertEqual(current, set(self.index.feature_ids(*new)))
+
+    def test_year_window(self):
+        """Test conversion of frame ranges with exclusive and inclusive ends"""
+        self.assertEqual(year_window(datetime(1850, 1, 1), datetime(1851, 1, 1)), (1850, 1850))
+        self.assertEqual(year_window(datetime(1850, 1, 1), datetime(1851, 1, 1), include_end=True), (1850, 1851))
+        self.assertEqual(year_window(datetime(1850, 1, 1), datetime(1859, 12, 31, 23, 59)), (1850, 1859))
+        monthly = [(datetime(1850, m, 1), datetime(1850, m + 1, 1), False) for m in range(1, 12)]
+        self.assertEqual(frame_windows(monthly), [(1850, 1850)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from image_cache import LruImageCache
+
+class TestLruImageCache(unittest.TestCase):
+    def setUp(self):
+        """Cache of byte strings whose size is their length"""
+        self.cache = LruImageCache(10, size_of=len)
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest unused image goes first when the budget is exceeded"""
+        self.cache.put("a", b"xxxx")
+        self.cache.put("b", b"xxxx")
+        self.assertEqual(self.cache.get("a"), b"xxxx")  # 'b' is now least recently used
+        self.cache.put("c", b"xxxx")
+        self.assertIn("a", self.cache)
+        self.assertNotIn("b", self.cache)
+        self.assertIn("c", self.cache)
+        self.assertEqual(self.cache.used_bytes, 8)
+
+    def test_replace_and_oversized(self):
+        """Test that replacing a key updates the size and oversized images are skipped"""
+        self.cache.put("a", b"xxxx")
+        self.cache.put("a", b"xx")
+        self.assertEqual(self.cache.used_bytes, 2)
+        self.cache.put("big", b"x" * 11)
+        self.assertNotIn("big", self.cache)
+        self.assertEqual(len(self.cache), 1)
+        self.cache.clear()
+        self.assertEqual((len(self.cache), self.cache.used_bytes), (0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
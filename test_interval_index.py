@@ -0,0 +1,59 @@
+import unittest
+import random
+from interval_index import YearIntervalIndex
+
+class TestYearIntervalIndex(unittest.TestCase):
+    def setUp(self):
+        """Build an index over random intervals, including NULL and reversed rows"""
+        rng = random.Random(42)
+        self.rows = []
+        for fid in range(2000):
+            begin = rng.randint(1800, 2000)
+            end = begin + rng.randint(0, 80)
+            self.rows.append((fid, begin, end))
+        self.rows.append((5000, None, 1900))
+        self.rows.append((5001, 1950, 1900))  # begin > end
+        self.index = YearIntervalIndex(self.rows)
+
+    def brute_force(self, from_year, to_year):
+        """Reference implementation of the subset string rule"""
+        return {fid for fid, begin, end in self.rows
+                if begin is not None and end is not None
+                and begin <= to_year and end >= from_year}
+
+    def test_counts_match_brute_force(self):
+        """Test counts for a range of windows, including from > to"""
+        for from_year, to_year in [(1842, 1900), (1900, 1900), (1700, 1799), (1990, 2100),
+                                   (1000, 3000), (1950, 1900), (1920, 1880)]:
+            self.assertEqual(self.index.count(from_year, to_year),
+                             len(self.brute_force(from_year, to_year)))
+
+    def test_feature_ids_match_brute_force(self):
+        """Test feature id sets for a range of windows"""
+        for from_year, to_year in [(1842, 1900), (1900, 1900), (2050, 2060), (1950, 1900)]:
+            self.assertEqual(self.index.feature_ids(from_year, to_year),
+                             self.brute_force(from_year, to_year))
+
+    def test_window_delta(self):
+        """Test that the delta between two windows turns one window's fids into the other's"""
+        for old_window, new_window in [((1842, 1900), (1843, 1901)), ((1842, 1900), (1841, 1899)),
+                                       ((1842, 1900), (1950, 1990)), ((1900, 1950), (1950, 1900))]:
+            entered, left = self.index.window_delta(old_window, new_window)
+            old_fids = self.brute_force(*old_window)
+            new_fids = self.brute_force(*new_window)
+            self.assertEqual(entered, new_fids - old_fids)
+            self.assertEqual(left, old_fids - new_fids)
+
+    def test_null_rows_skipped(self):
+        """Test that rows with NULL years are excluded"""
+        self.assertEqual(self.index.skipped, 1)
+        self.assertEqual(len(self.index), len(self.rows) - 1)
+
+    def test_empty_index(self):
+        """Test an index without rows"""
+        index = YearIntervalIndex([])
+        self.assertEqual(index.count(1842, 1900), 0)
+        self.assertEqual(index.feature_ids(1842, 1900), set())
+
+if __name__ == '__main__':
+    unittest.main()
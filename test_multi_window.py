@@ -0,0 +1,56 @@
+import unittest
+import random
+from multi_window import parse_windows, window_mask, combination_label, mask_expression, WindowTally, MAX_WINDOWS
+
+class TestMultiWindow(unittest.TestCase):
+    def setUp(self):
+        """Random intervals, including NULL rows, and three overlapping windows"""
+        rng = random.Random(20)
+        self.rows = [(fid, None, None) if fid % 50 == 0 else (fid, b, b + rng.randint(0, 40))
+                     for fid, b in ((fid, rng.randint(1800, 1950)) for fid in range(2000))]
+        self.windows = [(1842, 1860), (1855, 1870), (1900, 1920)]
+
+    def test_counts_match_separate_filters(self):
+        """Test that one pass gives the same counts as filtering each window separately"""
+        tally = WindowTally.from_rows(self.rows, self.windows)
+        for n, (from_year, to_year) in enumerate(self.windows):
+            expected = sum(1 for _, begin, end in self.rows
+                           if begin is not None and begin <= to_year and end >= from_year)
+            self.assertEqual(tally.counts[n], expected)
+        self.assertEqual(tally.total, len(self.rows))
+        self.assertEqual(sum(tally.combinations.values()), len(self.rows))
+
+    def test_skipped_rows_count_as_no_window(self):
+        """Test that rows left out of a cached index tally the same as NULL rows read directly"""
+        kept = [row for row in self.rows if row[1] is not None]
+        direct = WindowTally.from_rows(self.rows, self.windows)
+        cached = WindowTally.from_rows(kept, self.windows, len(self.rows) - len(kept))
+        self.assertEqual(cached.total, direct.total)
+        self.assertEqual(cached.combinations, direct.combinations)
+        self.assertEqual(cached.counts, direct.counts)
+
+    def test_mask(self):
+        """Test tagging of single features"""
+        self.assertEqual(window_mask(1856, 1858, self.windows), 0b011)
+        self.assertEqual(window_mask(1800, 1950, self.windows), 0b111)
+        self.assertEqual(window_mask(1880, 1890, self.windows), 0)
+        self.assertEqual(window_mask(None, 1850, self.windows), 0)
+        self.assertEqual(combination_label(0b101, self.windows), "1842-1860 + 1900-1920")
+        self.assertEqual(combination_label(0, self.windows), "Geen bereik")
+
+    def test_mask_expression(self):
+        """Test that the expression has one weighted term per window"""
+        expression = mask_expression(self.windows, lambda f, t: f'"b" <= {t} AND "e" >= {f}')
+        self.assertEqual(expression.count("CASE WHEN"), 3)
+        self.assertIn('"b" <= 1920 AND "e" >= 1900 THEN 4', expression)
+
+    def test_parse_windows(self):
+        """Test window parsing and limits"""
+        self.assertEqual(parse_windows("1842-1860; 1900:1920,"), [(1842, 1860), (1900, 1920)])
+        with self.assertRaises(ValueError):
+            parse_windows("1900-1800")
+        with self.assertRaises(ValueError):
+            WindowTally([(y, y) for y in range(MAX_WINDOWS + 1)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import csv
+import json
+import os
+import tempfile
+from timing import TimingRecorder
+
+class TestTimingRecorder(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        """Test that spans are no-ops while timing is disabled"""
+        recorder = TimingRecorder(enabled=False)
+        with recorder.span("setSubsetString", ("percelen", "ogr")):
+            pass
+        self.assertEqual(recorder.rows(), [])
+
+    def test_aggregates_per_layer_and_stage(self):
+        """Test count/total/min/max aggregation per (layer, provider, stage)"""
+        recorder = TimingRecorder(enabled=True)
+        recorder.add("featureCount", ("percelen", "ogr"), 0.010)
+        recorder.add("featureCount", ("percelen", "ogr"), 0.030)
+        recorder.add("featureCount", ("adressen", "postgres"), 0.5)
+        rows = recorder.rows()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["layer"], "adressen")
+        percelen = rows[1]
+        self.assertEqual(percelen["count"], 2)
+        self.assertAlmostEqual(percelen["mean_ms"], 20.0)
+        self.assertAlmostEqual(percelen["min_ms"], 10.0)
+        self.assertAlmostEqual(percelen["max_ms"], 30.0)
+
+    def test_export(self):
+        """Test CSV and JSON export"""
+        recorder = TimingRecorder(enabled=True)
+        with recorder.span("setSubsetString", ("percelen", "ogr")):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "timing.csv")
+            json_path = os.path.join(tmp, "timing.json")
+            recorder.export_csv(csv_path)
+            recorder.export_json(json_path)
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                self.assertEqual(next(csv.DictReader(f))["stage"], "setSubsetString")
+            with open(json_path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)[0]["count"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
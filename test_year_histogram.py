@@ -0,0 +1,54 @@
+import unittest
+import os
+import random
+import tempfile
+from year_histogram import YearHistogram, file_signature, load_histogram, save_histogram
+
+class TestYearHistogram(unittest.TestCase):
+    def setUp(self):
+        """Build a histogram over random intervals, some outside the year range"""
+        rng = random.Random(7)
+        self.rows = []
+        for fid in range(3000):
+            begin = rng.randint(900, 2100)
+            end = begin + rng.randint(0, 120)
+            self.rows.append((fid, begin, end))
+        self.rows.append((9000, None, 1900))
+        self.rows.append((9001, 1950, 1900))  # begin > end
+        self.histogram = YearHistogram.from_rows(self.rows, 1000, 3000)
+
+    def brute_force(self, from_year, to_year):
+        """Reference count using the subset string rule"""
+        return sum(1 for _, begin, end in self.rows
+                   if begin is not None and end is not None
+                   and begin <= to_year and end >= from_year)
+
+    def test_counts_match_brute_force(self):
+        """Test counts for windows inside and at the edges of the range"""
+        for from_year, to_year in [(1842, 1900), (1000, 1000), (1000, 3000), (2999, 3000), (1920, 1920)]:
+            self.assertEqual(self.histogram.count(from_year, to_year), self.brute_force(from_year, to_year))
+
+    def test_reversed_window(self):
+        """Test that from > to is left to the caller"""
+        self.assertIsNone(self.histogram.count(1900, 1842))
+
+    def test_persistence_roundtrip(self):
+        """Test saving and loading, and that a changed signature invalidates the cache"""
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "percelen.gpkg")
+            with open(data_file, "wb") as f:
+                f.write(b"data")
+            cache_file = data_file + ".yearhist.json"
+            signature = file_signature([data_file])
+            save_histogram(cache_file, "percelen|beginjaar|eindjaar", signature, self.histogram)
+
+            loaded = load_histogram(cache_file, "percelen|beginjaar|eindjaar", signature)
+            self.assertEqual(loaded.count(1842, 1900), self.brute_force(1842, 1900))
+            self.assertIsNone(load_histogram(cache_file, "other|beginjaar|eindjaar", signature))
+
+            with open(data_file, "ab") as f:
+                f.write(b"more data")
+            self.assertIsNone(load_histogram(cache_file, "percelen|beginjaar|eindjaar", file_signature([data_file])))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,13 @@
 import unittest
 import os
-from qgis.core import QgsProject, QgsVectorLayer
+import datetime
+from qgis.core import QgsProject, QgsVectorLayer, QgsFeature, QgsExpression, QgsExpressionContext, NULL
+from qgis.PyQt.QtCore import QDate
 from qgis.PyQt.QtWidgets import QApplication
 from year_range_filter import YearRangeFilterDialog
+from tasks import BatchFilterTask
+from temporal import temporal_expressions
+from layer_utils import to_year
 
 class TestYearRangeFilter(unittest.TestCase):
     @classmethod
@@ -70,5 +75,46 @@ class TestYearRangeFilter(unittest.TestCase):
         cls.project.removeAllMapLayers()
         del cls.app
 
+class TestBatchFilterDates(unittest.TestCase):
+    def test_date_window(self):
+        """Batch filtering with date bounds filters and counts by day, not by year"""
+        layer = QgsVectorLayer("None?field=begindatum:date&field=einddatum:date", "test_datums", "memory")
+        features = []
+        for begin, end in [((2020, 1, 10), (2020, 2, 1)),
+                           ((2020, 3, 1), (2020, 3, 31)),
+                           ((2020, 3, 6), (2020, 12, 31)),
+                           ((2019, 12, 1), (2020, 1, 14))]:
+            feature = QgsFeature(layer.fields())
+            feature.setAttributes([QDate(*begin), QDate(*end)])
+            features.append(feature)
+        layer.dataProvider().addFeatures(features)
+        QgsProject.instance().addMapLayer(layer)
+        try:
+            task = BatchFilterTask([layer], "begindatum", "einddatum",
+                                   datetime.date(2020, 1, 15), datetime.date(2020, 3, 5))
+            self.assertTrue(task.run())
+            task.finished(True)
+
+            # A year window 2020-2020 would also match the last two features
+            self.assertEqual(task.jobs[0].count, 2)
+            self.assertEqual(layer.featureCount(), 2)
+        finally:
+            QgsProject.instance().removeMapLayer(layer.id())
+
+class TestTemporalExpressions(unittest.TestCase):
+    def test_text_years_match_to_year(self):
+        """The temporal start expression of a text field reads the same year as to_year()"""
+        layer = QgsVectorLayer("None?field=beginjaar:string&field=eindjaar:string", "test_tekst", "memory")
+        start, _ = temporal_expressions(layer.fields(), "beginjaar", "eindjaar")
+        expression = QgsExpression(start)
+        for value in ["1850", "1850-03-01", " 1850 ca.", "950", "950 ca.", "-12", "ca. 1850", ""]:
+            feature = QgsFeature(layer.fields())
+            feature.setAttributes([value, value])
+            context = QgsExpressionContext()
+            context.setFeature(feature)
+            result = expression.evaluate(context)
+            year = None if result is None or result == NULL else result.year()
+            self.assertEqual(year, to_year(value), value)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
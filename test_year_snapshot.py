@@ -0,0 +1,37 @@
+import unittest
+import random
+from year_snapshot import YearSnapshot
+
+class TestYearSnapshot(unittest.TestCase):
+    def setUp(self):
+        """Take a snapshot of random intervals, including NULL rows"""
+        rng = random.Random(3)
+        self.rows = [(fid, rng.randint(1800, 2000), None) if fid % 97 == 0 else
+                     (fid, b, b + rng.randint(0, 60)) for fid, b in
+                     ((fid, rng.randint(1800, 2000)) for fid in range(1500))]
+        self.snapshot = YearSnapshot(self.rows, taken_at=0)
+
+    def brute_force(self, from_year, to_year):
+        """Reference fids using the subset string rule"""
+        return sorted(fid for fid, begin, end in self.rows
+                      if begin is not None and end is not None and begin <= to_year and end >= from_year)
+
+    def test_count_and_feature_ids(self):
+        """Test window evaluation against a brute-force scan"""
+        for from_year, to_year in [(1842, 1900), (1900, 1900), (2100, 2200), (1950, 1900)]:
+            self.assertEqual(self.snapshot.count(from_year, to_year), len(self.brute_force(from_year, to_year)))
+            self.assertEqual(sorted(self.snapshot.feature_ids(from_year, to_year)),
+                             self.brute_force(from_year, to_year))
+
+    def test_skipped(self):
+        """Test that rows with a NULL year are counted as skipped"""
+        self.assertEqual(self.snapshot.skipped, sum(1 for _, begin, end in self.rows if end is None))
+        self.assertEqual(len(self.snapshot) + self.snapshot.skipped, len(self.rows))
+
+    def test_staleness(self):
+        """Test that a snapshot taken at time 0 is stale"""
+        self.assertTrue(self.snapshot.is_stale(60))
+        self.assertFalse(YearSnapshot([]).is_stale(60))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Timing spans around the stages of the filter path.
+
+Spans are aggregated per (layer, provider, stage) and can be exported as
+CSV or JSON. When the recorder is disabled, span() returns a shared no-op
+context manager, so instrumented code pays one attribute check per stage.
+"""
+import csv
+import json
+import threading
+from time import perf_counter
+
+
+class _NullSpan:
+    """No-op context manager returned while timing is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Measures the wall time of one stage and reports it to the recorder"""
+    __slots__ = ("recorder", "stage", "layer", "start")
+
+    def __init__(self, recorder, stage, layer):
+        self.recorder = recorder
+        self.stage = stage
+        self.layer = layer
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.add(self.stage, self.layer, perf_counter() - self.start)
+        return False
+
+
+def _layer_key(layer):
+    """(layer name, provider) for a map layer, a (name, provider) tuple or None"""
+    if layer is None:
+        return "", ""
+    if isinstance(layer, tuple):
+        return layer
+    return layer.name(), layer.providerType()
+
+
+class TimingRecorder:
+    """Aggregates stage timings per layer and provider"""
+
+    FIELDS = ["layer", "provider", "stage", "count", "total_ms", "mean_ms", "min_ms", "max_ms"]
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._stats = {}  # (layer, provider, stage) -> [count, total, min, max] in seconds
+        self._lock = threading.Lock()  # Spans are also recorded from QgsTask threads
+
+    def span(self, stage, layer=None):
+        """Context manager timing one stage; layer may be a map layer or a (name, provider) tuple"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, layer)
+
+    def add(self, stage, layer, seconds):
+        """Record one measurement"""
+        key = _layer_key(layer) + (stage,)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                self._stats[key] = [1, seconds, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = min(stats[2], seconds)
+                stats[3] = max(stats[3], seconds)
+
+    def rows(self):
+        """Aggregated statistics as a list of dicts, slowest total first"""
+        with self._lock:
+            items = [(key, list(stats)) for key, stats in self._stats.items()]
+        rows = []
+        for (layer, provider, stage), (count, total, minimum, maximum) in items:
+            rows.append({
+                "layer": layer,
+                "provider": provider,
+                "stage": stage,
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total * 1000 / count, 3),
+                "min_ms": round(minimum * 1000, 3),
+                "max_ms": round(maximum * 1000, 3),
+            })
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+    def reset(self):
+        """Forget all measurements"""
+        with self._lock:
+            self._stats.clear()
+
+    def export_csv(self, path):
+        """Write the aggregated statistics to a CSV file"""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def export_json(self, path):
+        """Write the aggregated statistics to a JSON file"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.rows(), f, indent=2)
+
+
+# Shared by the dialog, the background tasks and the stats panel
+timings = TimingRecorder()
@@ -0,0 +1,106 @@
+"""Small panel showing the timing statistics of the filter path"""
+from qgis.PyQt.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QCheckBox, QTableWidget,
+                                 QTableWidgetItem, QPushButton, QFileDialog, QHeaderView,
+                                 QLabel, QComboBox)
+from qgis.PyQt.QtCore import QSettings, QTimer
+
+from .timing import timings, TimingRecorder
+from .plugin_logging import LEVELS, current_level, set_log_level
+
+SETTINGS_KEY = "YearRangeFilter/timingEnabled"
+
+
+def load_timing_setting():
+    """Apply the persisted on/off state to the shared recorder"""
+    timings.enabled = QSettings().value(SETTINGS_KEY, False, type=bool)
+
+
+class TimingStatsDialog(QDialog):
+    """Table of per-layer, per-provider stage timings with CSV/JSON export"""
+
+    def __init__(self, parent=None):
+        super(TimingStatsDialog, self).__init__(parent)
+        self.setWindowTitle("Kaart Jaar Filter - Timing")
+        layout = QVBoxLayout()
+
+        self.enabled_checkbox = QCheckBox("Timing registreren")
+        self.enabled_checkbox.setChecked(timings.enabled)
+        self.enabled_checkbox.toggled.connect(self.set_enabled)
+
+        # Runtime log level switch
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(LEVELS)
+        if current_level() in LEVELS:
+            self.level_combo.setCurrentText(current_level())
+        self.level_combo.currentTextChanged.connect(set_log_level)
+
+        options = QHBoxLayout()
+        options.addWidget(self.enabled_checkbox)
+        options.addStretch(1)
+        options.addWidget(QLabel("Logniveau:"))
+        options.addWidget(self.level_combo)
+        layout.addLayout(options)
+
+        self.table = QTableWidget(0, len(TimingRecorder.FIELDS))
+        self.table.setHorizontalHeaderLabels(TimingRecorder.FIELDS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset)
+        csv_btn = QPushButton("Export CSV")
+        csv_btn.clicked.connect(lambda: self.export("CSV (*.csv)", timings.export_csv))
+        json_btn = QPushButton("Export JSON")
+        json_btn.clicked.connect(lambda: self.export("JSON (*.json)", timings.export_json))
+        close_btn = QPushButton("Sluiten")
+        close_btn.clicked.connect(self.close)
+        buttons.addWidget(reset_btn)
+        buttons.addStretch(1)
+        buttons.addWidget(csv_btn)
+        buttons.addWidget(json_btn)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+        self.resize(720, 360)
+
+        # Refresh while the panel is open so new spans show up without clicking
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        """Refresh now and keep refreshing while the panel is visible"""
+        self.refresh()
+        self.refresh_timer.start()
+        super(TimingStatsDialog, self).showEvent(event)
+
+    def hideEvent(self, event):
+        """Stop refreshing once the panel is closed; the plugin keeps the dialog alive"""
+        self.refresh_timer.stop()
+        super(TimingStatsDialog, self).hideEvent(event)
+
+    def set_enabled(self, enabled):
+        """Switch timing on or off and remember the choice"""
+        timings.enabled = enabled
+        QSettings().setValue(SETTINGS_KEY, enabled)
+
+    def refresh(self):
+        """Fill the table from the shared recorder"""
+        rows = timings.rows()
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, field in enumerate(TimingRecorder.FIELDS):
+                self.table.setItem(r, c, QTableWidgetItem(str(row[field])))
+
+    def reset(self):
+        """Clear all measurements"""
+        timings.reset()
+        self.refresh()
+
+    def export(self, file_filter, writer):
+        """Ask for a file name and export the statistics"""
+        path, _ = QFileDialog.getSaveFileName(self, "Timing exporteren", "", file_filter)
+        if path:
+            writer(path)
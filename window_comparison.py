@@ -0,0 +1,101 @@
+"""Categorized symbology comparing several year windows on one layer.
+
+A virtual (expression) field holds each feature's window mask, and a
+categorized renderer on that field gives every combination of windows its
+own colour. The legend labels carry the counts of the single pass made by
+MultiWindowTask, so no window needs a filter of its own.
+"""
+import logging
+
+from qgis.core import (QgsCategorizedSymbolRenderer, QgsRendererCategory, QgsSymbol, QgsField, QgsFields)
+from qgis.PyQt.QtCore import QVariant
+from qgis.PyQt.QtGui import QColor
+
+from .layer_utils import year_filter_expression
+from .multi_window import mask_expression, combination_label
+
+# Name of the virtual field holding the window mask
+MASK_FIELD = "jaarbereiken"
+
+_comparisons = {}  # layer id -> WindowComparison
+
+
+def comparison_for(layer):
+    """Return the WindowComparison for a layer, creating it on first use"""
+    comparison = _comparisons.get(layer.id())
+    if comparison is None:
+        comparison = WindowComparison(layer)
+        _comparisons[layer.id()] = comparison
+        layer.willBeDeleted.connect(lambda layer_id=layer.id(): _comparisons.pop(layer_id, None))
+    return comparison
+
+
+def clear_comparisons():
+    """Restore the original renderer of every compared layer (on plugin unload)"""
+    for comparison in list(_comparisons.values()):
+        comparison.clear()
+    _comparisons.clear()
+
+
+class WindowComparison:
+    """Colours the features of a layer by the year windows they overlap"""
+
+    def __init__(self, layer):
+        self.logger = logging.getLogger('YearRangeFilter')
+        self.layer = layer
+        self._original_renderer = None  # Clone of the renderer before the comparison style
+
+    @property
+    def active(self):
+        """True while the mask field is on the layer"""
+        return self._mask_field_index() >= 0
+
+    def _mask_field_index(self):
+        """Index of the virtual mask field, or -1"""
+        fields = self.layer.fields()
+        index = fields.indexOf(MASK_FIELD)
+        if index >= 0 and fields.fieldOrigin(index) == QgsFields.OriginExpression:
+            return index
+        return -1
+
+    def apply(self, begin_field, end_field, tally):
+        """Add the mask field and a category per window combination that occurs in the tally"""
+        fields = self.layer.fields()
+        expression = mask_expression(
+            tally.windows, lambda from_year, to_year: year_filter_expression(begin_field, end_field, from_year,
+                                                                             to_year, fields))
+        index = self._mask_field_index()
+        if index >= 0:
+            self.layer.updateExpressionField(index, expression)
+        else:
+            self.layer.addExpressionField(expression, QgsField(MASK_FIELD, QVariant.Int))
+        if self._original_renderer is None:
+            self._original_renderer = self.layer.renderer().clone()
+
+        categories = []
+        masks = sorted(mask for mask in tally.combinations if mask)
+        for n, mask in enumerate(masks):
+            symbol = QgsSymbol.defaultSymbol(self.layer.geometryType())
+            symbol.setColor(QColor.fromHsv(int(360 * n / len(masks)), 200, 220))
+            label = f"{combination_label(mask, tally.windows)} ({tally.combinations[mask]})"
+            categories.append(QgsRendererCategory(mask, symbol, label))
+        if tally.combinations.get(0):
+            symbol = QgsSymbol.defaultSymbol(self.layer.geometryType())
+            symbol.setColor(QColor(200, 200, 200))
+            symbol.setOpacity(0.4)
+            categories.append(QgsRendererCategory(0, symbol, f"{combination_label(0, tally.windows)} "
+                                                             f"({tally.combinations[0]})"))
+        self.layer.setRenderer(QgsCategorizedSymbolRenderer(MASK_FIELD, categories))
+        self.layer.triggerRepaint()
+        self.logger.debug(f"Window comparison on {self.layer.name()}: {'; '.join(tally.summary())}")
+
+    def clear(self):
+        """Remove the mask field and put the original renderer back"""
+        index = self._mask_field_index()
+        if self._original_renderer is not None:
+            self.layer.setRenderer(self._original_renderer.clone())
+            self._original_renderer = None
+        if index >= 0:
+            self.layer.removeExpressionField(index)
+            self.layer.triggerRepaint()
+            self.logger.debug(f"Window comparison removed from {self.layer.name()}")
@@ -0,0 +1,169 @@
+"""Single-pass extraction of several year windows into separate files.
+
+The core of the Processing algorithm and the headless command line entry
+point: the source is read once, and every feature is written to each output
+whose year window it overlaps, so twenty decade slices cost one read
+instead of twenty. The dialog's "Exporteren" action uses the same code to
+stream a single window to a file.
+"""
+import datetime
+import logging
+import os
+
+from qgis.core import (QgsVectorFileWriter, QgsFeatureRequest, QgsFeatureSink, QgsCoordinateTransformContext,
+                       QgsFeature, QgsFields)
+
+from .layer_utils import (to_year, to_ordinal, year_filter_expression, date_filter_expression,
+                          expression_date_literal)
+
+# Output file extension per OGR driver
+DRIVER_EXTENSIONS = {
+    "GPKG": "gpkg",
+    "FlatGeobuf": "fgb",
+    "CSV": "csv",
+    "ESRI Shapefile": "shp",
+}
+
+# Features buffered per output before they are handed to its writer
+BATCH_SIZE = 1000
+
+
+def decade_windows(first_year, last_year, width=10):
+    """Consecutive windows of `width` years covering [first_year, last_year]"""
+    return [(start, min(start + width - 1, last_year)) for start in range(first_year, last_year + 1, width)]
+
+
+def window_output_path(output_dir, window, driver, prefix=""):
+    """File path for one window's output"""
+    from_year, to_year = window
+    return os.path.join(output_dir, f"{prefix}{from_year}_{to_year}.{DRIVER_EXTENSIONS[driver]}")
+
+
+def driver_for_path(path):
+    """OGR driver for an output path, from its file extension"""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    for driver, driver_extension in DRIVER_EXTENSIONS.items():
+        if driver_extension == extension:
+            return driver
+    raise ValueError(f"Unsupported output format: .{extension}")
+
+
+def export_year_windows(source, begin_field, end_field, windows, output_dir, driver="GPKG", prefix="",
+                        feedback=None, transform_context=None, attributes=None):
+    """Write the features of each year window to its own file in a single pass over `source`.
+
+    `source` is any QgsFeatureSource (a vector layer or a Processing source).
+    Returns {(from, to): (output path, feature count)}.
+    """
+    logger = logging.getLogger('YearRangeFilter')
+    if driver not in DRIVER_EXTENSIONS:
+        raise ValueError(f"Unsupported output format: {driver}")
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = [(window_output_path(output_dir, window, driver, prefix), f"{prefix}{window[0]}_{window[1]}")
+               for window in windows]
+    result = _export(source, begin_field, end_field, windows, outputs, driver, feedback, transform_context,
+                     attributes)
+    logger.info(f"Exported {len(windows)} year windows to {output_dir}: "
+                + ", ".join(f"{w[0]}-{w[1]}={c}" for w, (_, c) in result.items()))
+    return result
+
+
+def export_year_window(source, begin_field, end_field, window, path, driver=None, feedback=None,
+                       transform_context=None, attributes=None):
+    """Stream the features of one year window from `source` into a single file; returns the feature count"""
+    driver = driver or driver_for_path(path)
+    layer_name = os.path.splitext(os.path.basename(path))[0]
+    result = _export(source, begin_field, end_field, [tuple(window)], [(path, layer_name)], driver, feedback,
+                     transform_context, attributes)
+    count = result[tuple(window)][1]
+    logging.getLogger('YearRangeFilter').info(f"Exported year window {window[0]}-{window[1]} to {path}: {count}")
+    return count
+
+
+def _export(source, begin_field, end_field, windows, outputs, driver, feedback, transform_context, attributes):
+    """Stream `source` once into one writer per window; `outputs` holds (path, layer name) per window.
+
+    Windows hold years, or datetime.date days for day-precision exports.
+    Only the requested attributes (all of them if `attributes` is None) and
+    the year fields are fetched, and features are handed to the writers in
+    batches of BATCH_SIZE, so memory use does not grow with the source.
+    """
+    fields = source.fields()
+    begin_idx = fields.indexOf(begin_field)
+    end_idx = fields.indexOf(end_field)
+    if begin_idx < 0 or end_idx < 0:
+        raise ValueError(f"Source does not have the fields {begin_field} and {end_field}")
+    out_fields = fields
+    out_indexes = None
+    if attributes is not None:
+        missing = [name for name in attributes if fields.indexOf(name) < 0]
+        if missing:
+            raise ValueError(f"Source does not have the fields {', '.join(missing)}")
+        out_indexes = [fields.indexOf(name) for name in attributes]
+        out_fields = QgsFields()
+        for i in out_indexes:
+            out_fields.append(fields.at(i))
+
+    writers = []
+    paths = []
+    counts = [0] * len(windows)
+    try:
+        for path, layer_name in outputs:
+            options = QgsVectorFileWriter.SaveVectorOptions()
+            options.driverName = driver
+            options.layerName = layer_name
+            writer = QgsVectorFileWriter.create(path, out_fields, source.wkbType(), source.sourceCrs(),
+                                                transform_context or QgsCoordinateTransformContext(), options)
+            if writer.hasError() != QgsVectorFileWriter.NoError:
+                raise RuntimeError(f"Could not create {path}: {writer.errorMessage()}")
+            writers.append(writer)
+            paths.append(path)
+
+        # Let the provider drop everything outside the union of the windows
+        first, last = min(w[0] for w in windows), max(w[1] for w in windows)
+        if isinstance(first, datetime.date):
+            expression = date_filter_expression(begin_field, end_field, first, last, expression_date_literal)
+            convert = to_ordinal
+            bounds = [(w[0].toordinal(), w[1].toordinal()) for w in windows]
+        else:
+            expression = year_filter_expression(begin_field, end_field, first, last, fields)
+            convert = to_year
+            bounds = windows
+        request = QgsFeatureRequest().setFilterExpression(expression)
+        if out_indexes is not None:
+            request.setSubsetOfAttributes(sorted(set(out_indexes) | {begin_idx, end_idx}))
+        batches = [[] for _ in windows]
+        total = source.featureCount()
+        for i, feature in enumerate(source.getFeatures(request)):
+            if feedback is not None:
+                if feedback.isCanceled():
+                    break
+                if total > 0 and i % 1000 == 0:
+                    feedback.setProgress(100.0 * i / total)
+            attributes_in = feature.attributes()
+            begin, end = convert(attributes_in[begin_idx]), convert(attributes_in[end_idx])
+            if begin is None or end is None:
+                continue
+            if out_indexes is not None:
+                out_feature = QgsFeature(out_fields, feature.id())
+                out_feature.setGeometry(feature.geometry())
+                out_feature.setAttributes([attributes_in[j] for j in out_indexes])
+                feature = out_feature
+            for n, (from_year, to_year_val) in enumerate(bounds):
+                if begin <= to_year_val and end >= from_year:
+                    batches[n].append(feature)
+                    counts[n] += 1
+                    if len(batches[n]) >= BATCH_SIZE:
+                        writers[n].addFeatures(batches[n], QgsFeatureSink.FastInsert)
+                        batches[n] = []
+        for writer, batch in zip(writers, batches):
+            if batch:
+                writer.addFeatures(batch, QgsFeatureSink.FastInsert)
+    finally:
+        for writer in writers:
+            writer.flushBuffer()
+        # Deleting the writers closes the output files
+        writer = None
+        del writers[:]
+
+    return {tuple(window): (path, count) for window, path, count in zip(windows, paths, counts)}
@@ -0,0 +1,141 @@
+"""Cumulative per-year histograms of begin/end values for O(1) count previews.
+
+A YearHistogram stores, for every year in a fixed range, how many features
+begin at or before that year and how many end before it. The number of
+features matching ``begin <= to AND end >= from`` is then the difference of
+two array lookups. Histograms can be saved as JSON next to the data source,
+keyed by the source file's modification time and size.
+"""
+import json
+import os
+from array import array
+from itertools import accumulate
+
+# Year range of the dialog's spinboxes
+DEFAULT_MIN_YEAR = 1000
+DEFAULT_MAX_YEAR = 3000
+
+CACHE_VERSION = 1
+
+
+class YearHistogram:
+    """Cumulative begin/end year counts over [min_year, max_year]"""
+
+    def __init__(self, min_year=DEFAULT_MIN_YEAR, max_year=DEFAULT_MAX_YEAR):
+        self.min_year = min_year
+        self.max_year = max_year
+        # One bucket per year plus one below min_year and one above max_year
+        size = max_year - min_year + 3
+        self._begin_counts = array("q", bytes(8 * size))
+        self._end_counts = array("q", bytes(8 * size))
+        self._reversed = []  # (begin, end) pairs with begin > end, checked linearly
+        self._cum_begins = None
+        self._cum_ends = None
+        self.total = 0
+
+    @classmethod
+    def from_rows(cls, rows, min_year=DEFAULT_MIN_YEAR, max_year=DEFAULT_MAX_YEAR):
+        """Build a histogram from (fid, begin, end) rows, skipping NULL years"""
+        histogram = cls(min_year, max_year)
+        for _, begin, end in rows:
+            if begin is not None and end is not None:
+                histogram.add(begin, end)
+        histogram.finalize()
+        return histogram
+
+    def _bucket(self, year):
+        """Bucket index of a year, clamping values outside the range to the edge buckets"""
+        return min(max(year, self.min_year - 1), self.max_year + 1) - (self.min_year - 1)
+
+    def add(self, begin, end):
+        """Count one feature; call finalize() after the last one"""
+        self.total += 1
+        if begin > end:
+            self._reversed.append((begin, end))
+            return
+        self._begin_counts[self._bucket(begin)] += 1
+        self._end_counts[self._bucket(end)] += 1
+
+    def finalize(self):
+        """Compute the cumulative arrays used by count()"""
+        self._cum_begins = array("q", accumulate(self._begin_counts))
+        self._cum_ends = array("q", accumulate(self._end_counts))
+
+    def count(self, from_year, to_year):
+        """Number of features with begin <= to_year and end >= from_year.
+
+        Returns None when from_year > to_year: that question needs both
+        values of each feature at once, which a histogram does not keep.
+        """
+        if from_year > to_year:
+            return None
+        from_year = min(max(from_year, self.min_year), self.max_year)
+        to_year = min(max(to_year, self.min_year), self.max_year)
+        begins_le_to = self._cum_begins[self._bucket(to_year)]
+        ends_lt_from = self._cum_ends[self._bucket(from_year) - 1]
+        reversed_matches = sum(1 for begin, end in self._reversed if begin <= to_year and end >= from_year)
+        return begins_le_to - ends_lt_from + reversed_matches
+
+    def to_dict(self):
+        """JSON-serialisable representation"""
+        return {
+            "min_year": self.min_year,
+            "max_year": self.max_year,
+            "total": self.total,
+            "begin_counts": list(self._begin_counts),
+            "end_counts": list(self._end_counts),
+            "reversed": self._reversed,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict()"""
+        histogram = cls(data["min_year"], data["max_year"])
+        histogram._begin_counts = array("q", data["begin_counts"])
+        histogram._end_counts = array("q", data["end_counts"])
+        histogram._reversed = [tuple(pair) for pair in data["reversed"]]
+        histogram.total = data["total"]
+        histogram.finalize()
+        return histogram
+
+
+def file_signature(paths):
+    """(mtime_ns, size) of each existing file, used to detect stale caches"""
+    signature = []
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signature.append([os.path.basename(path), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def load_histogram(cache_file, entry_key, signature):
+    """Return the cached histogram for entry_key, or None if missing or stale"""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != CACHE_VERSION or data.get("signature") != signature:
+        return None
+    entry = data.get("entries", {}).get(entry_key)
+    return YearHistogram.from_dict(entry) if entry else None
+
+
+def save_histogram(cache_file, entry_key, signature, histogram):
+    """Store a histogram in the cache file, dropping entries from an older signature"""
+    data = {}
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if data.get("version") != CACHE_VERSION or data.get("signature") != signature:
+        data = {"version": CACHE_VERSION, "signature": signature, "entries": {}}
+    data["entries"][entry_key] = histogram.to_dict()
+
+    # Write to a temporary file first so a crash never leaves a truncated cache behind
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_file, cache_file)
@@ -1,22 +1,87 @@
-from qgis.PyQt.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
-                                 QSpinBox, QPushButton, QLineEdit, QGroupBox, QMessageBox)
-from qgis.PyQt.QtCore import Qt
+from qgis.PyQt.QtWidgets import (QDialog, QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                                 QSpinBox, QPushButton, QLineEdit, QGroupBox, QMessageBox,
+                                 QCheckBox, QSlider, QComboBox, QFileDialog, QCompleter, QDateEdit)
+from qgis.PyQt.QtCore import Qt, QSettings, QTimer, QDate
 from qgis.core import QgsProject, QgsVectorLayer, Qgis
-from qgis.gui import QgsMessageBar
-import os
-import logging
+from qgis.gui import QgsMessageBar, QgsCheckableComboBox
+import datetime
+
+from .index_manager import YearIndexManager
+from .scrubbing import ScrubSession
+from .tasks import (BatchFilterTask, FilterTask, HistogramTask, ExportWindowTask, SpatioTemporalIndexTask,
+                    MultiWindowTask, EstimateTask, ExactCountTask, start_task, refresh_snapshot_if_stale)
+from .pushdown import FilterPushdown
+from .timing import timings
+from .plugin_logging import configure_logging
+from .render_filter import render_filter_for
+from .window_comparison import comparison_for
+from .multi_window import parse_windows, MAX_WINDOWS
+from .temporal import TemporalSync
+from .playback import YearPlayback, JOBS_SETTINGS_KEY, playback_settings
+from .layer_utils import (configured_year_fields, remember_year_fields, year_field_candidates, field_kind,
+                          is_year_subset)
+from .plugin import YearRangeFilterPlugin # The plugin class lives in the lightweight startup module
+
+# Filter modes offered in the dialog: provider subset string or renderer rule
+MODE_SUBSET = "subset"
+MODE_RENDER = "render"
+MODE_SETTINGS_KEY = "YearRangeFilter/filterMode"
+
+# Quiet time after the last window change before live mode applies the filter
+LIVE_APPLY_DELAY_MS = 250
+
+class _LayerState:
+    """What the docked panel remembers about a layer while another one is selected"""
+
+    def __init__(self, window, pushdown):
+        self.window = window # (from, to) last shown for the layer: years, or datetime.date days
+        self.pushdown = pushdown # FilterPushdown with the layer's cached index information
 
 class YearRangeFilterDialog(QDialog):
-    def __init__(self, parent=None, iface=None):
+    def __init__(self, parent=None, iface=None, index_manager=None, docked=False):
         super(YearRangeFilterDialog, self).__init__(parent)
         self.iface = iface
+        self.docked = docked # Embedded in the dock panel: stays open and follows the current layer
+        self.layer_states = {} # layer id -> _LayerState of layers shown earlier in the docked panel
+        self._layer_bound = False # True while the widgets show an eligible layer
+        self.begin_field_name = None
+        self.end_field_name = None
+        self._date_fields = False # Both year fields hold dates, so day precision is offered
+        # Interval indexes outlive the dialog when the plugin passes in its own manager
+        self.index_manager = index_manager if index_manager is not None else YearIndexManager()
+        self.scrub_session = None
+        self.temporal_sync = None # Follows the QGIS temporal controller while "Tijdbeheer volgen" is on
+        self.playback = None # Pre-rendered window images while playback mode is on
+        self._adjusting_window = False # Set while both spinboxes are moved as one step
+        self.filter_task = None # Background task of the last apply_filter call
+        self.pushdown = None # Created on first apply, caches the provider's index information
+        self.histogram_task = None # Background build of the histogram behind the count preview
+        self._histogram_failed = False # The histogram build failed for the current layer and fields
+        self.spatiotemporal_task = None # Background build of the index behind the visible-extent count
+        self.estimate_task = None # Background preparation of the count estimator
+        self._estimate_failed = False # No estimate possible for the current layer and fields
+        self.exact_counts = {} # (from, to) -> exact count requested while estimating
+        self._live_update = False # Set while live mode applies the filter
+        self.live_timer = QTimer(self) # Restarted on every window change, fires once they stop
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_APPLY_DELAY_MS)
+        self.live_timer.timeout.connect(self.apply_live_window)
         self.setup_logging()
         self.logger.info("Initializing Year Range Filter Dialog")
         self.setWindowTitle("Kaart Jaar Filter")
-        self.setModal(True)
+        self.setModal(False) # Filtering runs in a background task, so don't block the main window
 
         # Check if there's a selected layer before setting up UI
         self.selected_layer = self.get_selected_layer()
+        if self.docked:
+            # The panel is built once; set_layer() points it at the current layer, eligible or not
+            self.setWindowFlags(Qt.Widget)
+            layer = self.selected_layer
+            self.selected_layer = None
+            self.setup_ui()
+            self._ui_initialized = True
+            self.set_layer(layer)
+            return
         if not self.selected_layer:
             self.logger.warning("No layer selected")
             # Parent the QMessageBox to self for proper display if iface is None (e.g. during tests)
@@ -33,13 +98,15 @@ class YearRangeFilterDialog(QDialog):
             QMessageBox.warning(
                 self,
                 "Warning",
-                f"Layer '{self.selected_layer.name()}' does not have the required fields (beginjaar, eindjaar)!"
+                f"Layer '{self.selected_layer.name()}' does not have recognisable begin and end year fields "
+                f"(e.g. beginjaar, eindjaar)!"
             )
             self._ui_initialized = False
             return
 
         self.setup_ui()
         self._ui_initialized = True # Flag to indicate UI is ready
+        self._layer_bound = True
 
     def get_selected_layer(self):
         """Get the currently selected layer"""
@@ -64,78 +131,41 @@ class YearRangeFilterDialog(QDialog):
             self.logger.warning(f"Selected item '{self.selected_layer.name()}' is not a vector layer.")
             return False
 
-        fields = self.selected_layer.fields()
-        field_names = [field.name() for field in fields]
-        required_fields = ["beginjaar", "eindjaar"] # Hardcoded as per current UI
-
-        has_fields = all(field in field_names for field in required_fields)
-        self.logger.debug(f"Layer fields: {field_names}")
-        self.logger.debug(f"Required fields: {required_fields}")
+        # Stored per layer, otherwise detected once per schema from field names and types
+        self.begin_field_name, self.end_field_name = configured_year_fields(self.selected_layer)
+        has_fields = self.begin_field_name is not None and self.end_field_name is not None
+        self.logger.debug(f"Year fields: {self.begin_field_name}, {self.end_field_name}")
         self.logger.debug(f"Has required fields: {has_fields}")
         return has_fields
 
     def setup_logging(self):
         """Setup logging configuration"""
-        self.logger = logging.getLogger('YearRangeFilter')
-        # Check if handlers are already present to avoid duplication if class is instantiated multiple times
-        if not self.logger.handlers:
-            self.logger.setLevel(logging.DEBUG)
-
-            # Create logs directory if it doesn't exist
-            # __file__ is the path to the current script (year_range_filter.py)
-            plugin_dir = os.path.dirname(__file__)
-            log_dir = os.path.join(plugin_dir, 'logs')
-            if not os.path.exists(log_dir):
-                try:
-                    os.makedirs(log_dir)
-                except OSError as e:
-                    # This can happen if the plugin is in a read-only location
-                    # or due to permission issues.
-                    # Fallback or notify user. For now, log to console.
-                    print(f"Could not create log directory: {log_dir}. Error: {e}")
-                    # Add a console handler as a fallback if file handler fails
-                    console_handler = logging.StreamHandler()
-                    console_handler.setLevel(logging.DEBUG)
-                    console_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-                    console_handler.setFormatter(console_formatter)
-                    self.logger.addHandler(console_handler)
-                    self.logger.warning("Logging to console as log file setup failed.")
-                    return
-
-
-            # File handler
-            log_file = os.path.join(log_dir, 'year_range_filter.log')
-            try:
-                file_handler = logging.FileHandler(log_file)
-                file_handler.setLevel(logging.DEBUG)
-                file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-                file_handler.setFormatter(file_formatter)
-                self.logger.addHandler(file_handler)
-            except IOError as e:
-                print(f"Could not set up log file: {log_file}. Error: {e}")
-                console_handler = logging.StreamHandler()
-                console_handler.setLevel(logging.DEBUG)
-                console_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-                console_handler.setFormatter(console_formatter)
-                self.logger.addHandler(console_handler)
-                self.logger.warning("Logging to console as log file setup failed.")
-
+        # Records go through a queue to a background writer, so logging never blocks the GUI thread
+        self.logger = configure_logging()
 
     def setup_ui(self):
         """Setup the user interface components"""
         self.logger.debug("Setting up UI components")
-        layout = QVBoxLayout()
+        outer_layout = QVBoxLayout()
 
         # Add selected layer information
         if self.selected_layer: # Check if a layer is selected
             layer_name = self.selected_layer.name()
+        elif self.docked: # set_layer() fills in the layer
+            layer_name = ""
         else: # Should not happen if checks in __init__ are effective, but as a fallback
             layer_name = "None (Error: UI setup with no layer)"
             self.logger.error("setup_ui called but self.selected_layer is None.")
 
-        layer_info = QLabel(f"Selected Layer: {layer_name}")
-        layer_info.setStyleSheet("font-weight: bold; color: #0066cc;")
-        layout.addWidget(layer_info)
+        self.layer_info = QLabel(f"Selected Layer: {layer_name}")
+        self.layer_info.setStyleSheet("font-weight: bold; color: #0066cc;")
+        outer_layout.addWidget(self.layer_info)
+
+        # Everything below the layer name is disabled while the docked panel shows no eligible layer
+        self.controls = QWidget()
+        layout = QVBoxLayout(self.controls)
+        layout.setContentsMargins(0, 0, 0, 0)
+        outer_layout.addWidget(self.controls)
 
         # Create property name inputs
         property_group = QGroupBox("Veld Namen")
@@ -145,8 +175,8 @@ class YearRangeFilterDialog(QDialog):
         from_prop_layout = QHBoxLayout()
         from_prop_label = QLabel("Begin Jaar Veld:")
         self.from_property = QLineEdit()
-        self.from_property.setText("beginjaar") # Hardcoded field name
-        self.from_property.setEnabled(False)  # Make read-only as per current behavior
+        self.from_property.setText(self.begin_field_name or "")
+        self.from_property.editingFinished.connect(self.on_year_fields_changed)
         from_prop_layout.addWidget(from_prop_label)
         from_prop_layout.addWidget(self.from_property)
 
@@ -154,8 +184,8 @@ class YearRangeFilterDialog(QDialog):
         to_prop_layout = QHBoxLayout()
         to_prop_label = QLabel("Eind Jaar Veld:")
         self.to_property = QLineEdit()
-        self.to_property.setText("eindjaar") # Hardcoded field name
-        self.to_property.setEnabled(False)  # Make read-only as per current behavior
+        self.to_property.setText(self.end_field_name or "")
+        self.to_property.editingFinished.connect(self.on_year_fields_changed)
         to_prop_layout.addWidget(to_prop_label)
         to_prop_layout.addWidget(self.to_property)
 
@@ -164,6 +194,22 @@ class YearRangeFilterDialog(QDialog):
         property_group.setLayout(property_layout)
         layout.addWidget(property_group)
 
+        # Choose between filtering in the provider and hiding features in the renderer
+        mode_layout = QHBoxLayout()
+        mode_label = QLabel("Filtermodus:")
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("Subset (provider)", MODE_SUBSET)
+        self.mode_combo.addItem("Weergave (renderer)", MODE_RENDER)
+        self.mode_combo.setToolTip("Subset: de provider filtert de data. Weergave: alle data blijft geladen "
+                                   "en objecten buiten het bereik worden alleen niet getekend.")
+        mode_index = self.mode_combo.findData(QSettings().value(MODE_SETTINGS_KEY, MODE_SUBSET, type=str))
+        self.mode_combo.setCurrentIndex(max(mode_index, 0))
+        self.mode_combo.currentIndexChanged.connect(
+            lambda index: QSettings().setValue(MODE_SETTINGS_KEY, self.mode_combo.itemData(index)))
+        mode_layout.addWidget(mode_label)
+        mode_layout.addWidget(self.mode_combo)
+        layout.addLayout(mode_layout)
+
         # Create year range inputs
         year_group = QGroupBox("Jaar Bereik")
         year_layout = QVBoxLayout()
@@ -186,8 +232,62 @@ class YearRangeFilterDialog(QDialog):
         to_layout.addWidget(to_label)
         to_layout.addWidget(self.to_year)
 
+        # Live preview of the number of matching features, updated on every spinbox change
+        self.count_preview = QLabel("")
+        self.count_preview.setToolTip("Aantal objecten binnen het jaarbereik, voordat het filter wordt toegepast")
+
+        # Day precision, only shown when both fields are date fields
+        self.date_row = QWidget()
+        date_layout = QHBoxLayout(self.date_row)
+        date_layout.setContentsMargins(0, 0, 0, 0)
+        self.date_checkbox = QCheckBox("Op datum:")
+        self.date_checkbox.setToolTip("Filter op dag nauwkeurig in plaats van op hele jaren")
+        self.date_checkbox.toggled.connect(self.toggle_date_precision)
+        self.from_date = QDateEdit()
+        self.to_date = QDateEdit()
+        for date_edit in (self.from_date, self.to_date):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("dd-MM-yyyy")
+            date_edit.setDateRange(QDate(1000, 1, 1), QDate(3000, 12, 31))
+            date_edit.setEnabled(False)
+            date_edit.dateChanged.connect(self.on_year_window_changed)
+        date_layout.addWidget(self.date_checkbox)
+        date_layout.addWidget(self.from_date)
+        date_layout.addWidget(QLabel("t/m"))
+        date_layout.addWidget(self.to_date)
+        self.date_row.setVisible(False)
+
         year_layout.addLayout(from_layout)
         year_layout.addLayout(to_layout)
+        year_layout.addWidget(self.date_row)
+        year_layout.addWidget(self.count_preview)
+
+        # Limit the count and selection to what the canvas shows, answered by the spatio-temporal index
+        self.extent_checkbox = QCheckBox("Alleen kaartbeeld")
+        self.extent_checkbox.setToolTip("Tel en selecteer alleen de objecten binnen het huidige kaartbeeld")
+        self.extent_checkbox.setEnabled(self.iface is not None)
+        self.extent_checkbox.toggled.connect(self.toggle_extent_mode)
+        year_layout.addWidget(self.extent_checkbox)
+
+        # Estimation mode for huge PostgreSQL tables: approximate counts from statistics or a sample
+        estimate_layout = QHBoxLayout()
+        self.estimate_checkbox = QCheckBox("Schatting (grote lagen)")
+        self.estimate_checkbox.setToolTip("Toon een geschat aantal met foutmarge uit de tabelstatistieken in plaats "
+                                          "van de hele tabel te tellen")
+        self.estimate_checkbox.toggled.connect(self.toggle_estimation)
+        self.exact_count_btn = QPushButton("Exact tellen")
+        self.exact_count_btn.setToolTip("Tel het huidige jaarbereik exact op de achtergrond")
+        self.exact_count_btn.clicked.connect(self.count_exactly)
+        self.exact_count_btn.setVisible(False)
+        estimate_layout.addWidget(self.estimate_checkbox)
+        estimate_layout.addWidget(self.exact_count_btn)
+        year_layout.addLayout(estimate_layout)
+
+        # Live mode: apply the latest window once the spinboxes have been still for a moment
+        self.live_checkbox = QCheckBox("Live toepassen")
+        self.live_checkbox.setToolTip("Pas het filter automatisch toe zodra het jaarbereik even niet verandert")
+        self.live_checkbox.toggled.connect(self.toggle_live_mode)
+        year_layout.addWidget(self.live_checkbox)
         year_group.setLayout(year_layout)
         layout.addWidget(year_group)
 
@@ -209,6 +309,80 @@ class YearRangeFilterDialog(QDialog):
         year_adjust_layout.addWidget(self.increase_year_range_btn)
         layout.addLayout(year_adjust_layout)
 
+        # Scrub mode: slide the window through time without re-querying the provider
+        scrub_group = QGroupBox("Tijd Scrubben")
+        scrub_layout = QVBoxLayout()
+        self.scrub_checkbox = QCheckBox("Live scrub modus")
+        self.scrub_checkbox.setToolTip("Werk de zichtbare objecten direct bij bij elke stap, zonder het filter opnieuw toe te passen")
+        self.scrub_checkbox.toggled.connect(self.toggle_scrub_mode)
+        self.year_slider = QSlider(Qt.Horizontal)
+        self.year_slider.setRange(self.from_year.minimum(), self.from_year.maximum())
+        self.year_slider.setValue(self.from_year.value())
+        self.year_slider.setToolTip("Verschuif het jaarbereik met behoud van de breedte")
+        self.year_slider.valueChanged.connect(self.slide_year_range)
+        # Playback mode: windows are rendered ahead in the background and stepping shows a cached image
+        playback_layout = QHBoxLayout()
+        self.playback_checkbox = QCheckBox("Afspeelmodus (vooraf gerenderd)")
+        self.playback_checkbox.setToolTip("Render de jaren rond het huidige bereik alvast op de achtergrond, "
+                                          "zodat stappen door de tijd direct een kant-en-klaar beeld toont")
+        self.playback_checkbox.setEnabled(self.iface is not None)
+        self.playback_checkbox.toggled.connect(self.toggle_playback)
+        self.playback_jobs = QSpinBox()
+        self.playback_jobs.setRange(1, 8)
+        self.playback_jobs.setValue(playback_settings()[0])
+        self.playback_jobs.setToolTip("Aantal jaarbereiken dat tegelijk gerenderd wordt")
+        self.playback_jobs.valueChanged.connect(self.set_playback_jobs)
+        playback_layout.addWidget(self.playback_checkbox)
+        playback_layout.addWidget(QLabel("Gelijktijdig:"))
+        playback_layout.addWidget(self.playback_jobs)
+        # Follow the QGIS temporal controller, showing its frames through the scrub overlay
+        self.temporal_checkbox = QCheckBox("Tijdbeheer volgen")
+        self.temporal_checkbox.setToolTip("Stel de jaarvelden in als tijdeigenschappen van de laag en volg de "
+                                          "QGIS-tijdbeheerder; de frames van de animatie worden vooraf berekend")
+        self.temporal_checkbox.setEnabled(self.iface is not None)
+        self.temporal_checkbox.toggled.connect(self.toggle_temporal_sync)
+        scrub_layout.addWidget(self.scrub_checkbox)
+        scrub_layout.addWidget(self.temporal_checkbox)
+        scrub_layout.addLayout(playback_layout)
+        scrub_layout.addWidget(self.year_slider)
+        scrub_group.setLayout(scrub_layout)
+        layout.addWidget(scrub_group)
+
+        # Comparison mode: several windows counted in one pass and coloured per combination
+        compare_group = QGroupBox("Jaarbereiken Vergelijken")
+        compare_layout = QHBoxLayout()
+        self.compare_windows_input = QLineEdit()
+        self.compare_windows_input.setPlaceholderText("1842-1860; 1900-1920")
+        self.compare_windows_input.setToolTip(f"Maximaal {MAX_WINDOWS} jaarbereiken, gescheiden door ';'")
+        compare_btn = QPushButton("Vergelijken")
+        compare_btn.setToolTip("Tel alle bereiken in één keer en kleur de objecten per combinatie van bereiken")
+        compare_btn.clicked.connect(self.compare_windows)
+        compare_clear_btn = QPushButton("Stoppen")
+        compare_clear_btn.setToolTip("Herstel de oorspronkelijke stijl van de laag")
+        compare_clear_btn.clicked.connect(self.clear_comparison)
+        compare_layout.addWidget(self.compare_windows_input)
+        compare_layout.addWidget(compare_btn)
+        compare_layout.addWidget(compare_clear_btn)
+        compare_group.setLayout(compare_layout)
+        layout.addWidget(compare_group)
+
+        self.from_year.valueChanged.connect(self.on_year_window_changed)
+        self.to_year.valueChanged.connect(self.on_year_window_changed)
+
+
+        # Columns written by "Exporteren"; all of them unless the user unticks some
+        export_fields_layout = QHBoxLayout()
+        export_fields_label = QLabel("Exportvelden:")
+        self.export_fields = QgsCheckableComboBox()
+        self.export_fields.setToolTip("Velden die naar het exportbestand worden geschreven")
+        self.export_fields.setDefaultText("Geen velden (alleen geometrie)")
+        export_fields_layout.addWidget(export_fields_label)
+        export_fields_layout.addWidget(self.export_fields, 1)
+        layout.addLayout(export_fields_layout)
+
+        # Progress of a running background filter task
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
 
         # Create main action buttons
         action_buttons_layout = QHBoxLayout()
@@ -222,19 +396,286 @@ class YearRangeFilterDialog(QDialog):
         apply_btn.setDefault(True) # Make Apply the default button
         apply_btn.clicked.connect(self.apply_filter)
 
+        apply_all_btn = QPushButton("Alle Lagen")
+        apply_all_btn.setToolTip("Pas het jaarfilter toe op alle vectorlagen met de opgegeven velden")
+        apply_all_btn.clicked.connect(self.apply_filter_all_layers)
+
+        select_btn = QPushButton("Selecteren")
+        select_btn.setToolTip("Selecteer de objecten binnen het jaarbereik zonder de laag te filteren")
+        select_btn.clicked.connect(self.select_window)
+
+        export_btn = QPushButton("Exporteren")
+        export_btn.setToolTip("Schrijf de objecten binnen het jaarbereik naar een bestand zonder de laag te filteren")
+        export_btn.clicked.connect(self.export_window)
+
         cancel_btn = QPushButton("Annuleren")
         cancel_btn.setToolTip("Sluit het dialoogvenster zonder wijzigingen toe te passen")
         cancel_btn.clicked.connect(self.reject) # QDialog's reject() slot
+        cancel_btn.setVisible(not self.docked) # The dock has its own close button
 
         action_buttons_layout.addWidget(reset_btn)
         action_buttons_layout.addStretch(1) # Add stretch to space out buttons
+        action_buttons_layout.addWidget(select_btn)
+        action_buttons_layout.addWidget(export_btn)
+        action_buttons_layout.addWidget(apply_all_btn)
         action_buttons_layout.addWidget(apply_btn)
         action_buttons_layout.addWidget(cancel_btn)
         layout.addLayout(action_buttons_layout)
 
-        self.setLayout(layout)
+        self.setLayout(outer_layout)
+        if self.selected_layer:
+            self.update_field_completers()
+            self.update_export_fields()
+            self.update_date_inputs()
+            self.update_estimate_input()
+            self.update_count_preview()
         self.logger.debug("UI setup completed")
 
+    def _field_completer(self, candidates, field_names):
+        """Completer offering the detected candidates first, then the other fields of the layer"""
+        completer = QCompleter(candidates + [name for name in field_names if name not in candidates], self)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        return completer
+
+    def update_field_completers(self):
+        """Offer the selected layer's fields, detected candidates first, in the field inputs"""
+        begin_candidates, end_candidates = year_field_candidates(self.selected_layer)
+        field_names = self.selected_layer.fields().names()
+        self.from_property.setCompleter(self._field_completer(begin_candidates, field_names))
+        self.to_property.setCompleter(self._field_completer(end_candidates, field_names))
+
+    def update_export_fields(self):
+        """Offer the selected layer's fields for export, all of them ticked"""
+        self.export_fields.clear()
+        names = self.selected_layer.fields().names()
+        self.export_fields.addItems(names)
+        self.export_fields.setCheckedItems(names)
+
+    def export_attributes(self):
+        """Names of the fields to export, or None when every field is ticked"""
+        checked = self.export_fields.checkedItems()
+        return None if len(checked) == self.export_fields.count() else checked
+
+    def set_layer(self, layer):
+        """Point the docked panel at another layer, restoring the window last used on it.
+
+        Interval indexes, histograms and snapshots live in the shared index
+        manager, so switching back to a layer reuses everything built for it.
+        """
+        if layer is self.selected_layer and self._layer_bound:
+            return
+        self.save_layer_state()
+        self.cancel_filter_task()
+        self.stop_interactive_modes()
+        self.histogram_task = None
+        self._histogram_failed = False
+        self.spatiotemporal_task = None
+        self.reset_estimation()
+        self.selected_layer = layer
+        self._layer_bound = layer is not None and self.check_layer_fields()
+        self.controls.setEnabled(self._layer_bound)
+        if not self._layer_bound:
+            self.selected_layer = None
+            self.pushdown = None
+            self.layer_info.setText("Selecteer een vectorlaag met begin- en eindjaarvelden")
+            self.count_preview.setText("")
+            return
+
+        state = self.layer_states.get(layer.id())
+        self.pushdown = state.pushdown if state is not None else None
+        self.layer_info.setText(f"Selected Layer: {layer.name()}")
+        self.from_property.setText(self.begin_field_name)
+        self.to_property.setText(self.end_field_name)
+        self.update_field_completers()
+        self.update_export_fields()
+        self.update_date_inputs()
+        self.update_estimate_input()
+        if state is not None:
+            self.restore_window(state.window)
+        self.year_slider.setValue(self.from_year.value())
+        self.update_count_preview()
+        self.logger.debug(f"Panel switched to layer {layer.name()}")
+
+    def restore_window(self, window):
+        """Show a remembered window without triggering filters, in day precision if it holds dates"""
+        by_day = isinstance(window[0], datetime.date)
+        widgets = (self.from_year, self.to_year, self.from_date, self.to_date, self.date_checkbox)
+        for widget in widgets:
+            widget.blockSignals(True)
+        try:
+            if by_day:
+                self.from_year.setValue(window[0].year)
+                self.to_year.setValue(window[1].year)
+                self.from_date.setDate(QDate(window[0]))
+                self.to_date.setDate(QDate(window[1]))
+            else:
+                self.from_year.setValue(window[0])
+                self.to_year.setValue(window[1])
+            self.date_checkbox.setChecked(by_day and self._date_fields)
+        finally:
+            for widget in widgets:
+                widget.blockSignals(False)
+        self.from_date.setEnabled(self.date_checkbox.isChecked())
+        self.to_date.setEnabled(self.date_checkbox.isChecked())
+
+    def save_layer_state(self):
+        """Remember the current layer's window and provider information for when it is selected again"""
+        if self.selected_layer is not None and self._layer_bound:
+            self.layer_states[self.selected_layer.id()] = _LayerState(self.current_window(), self.pushdown)
+
+    def forget_layer(self, layer_id):
+        """Drop the state of a layer that is removed from the project"""
+        self.layer_states.pop(layer_id, None)
+        if self.selected_layer is not None and self.selected_layer.id() == layer_id:
+            self._layer_bound = False
+            self.set_layer(None)
+
+    def on_year_fields_changed(self):
+        """Remember edited year fields on the layer and recount for them"""
+        begin, end = self.from_property.text().strip(), self.to_property.text().strip()
+        fields = self.selected_layer.fields()
+        if fields.indexOf(begin) < 0 or fields.indexOf(end) < 0:
+            self.count_preview.setText("Onbekend veld")
+            return
+        if (begin, end) == (self.begin_field_name, self.end_field_name):
+            return
+        self.begin_field_name, self.end_field_name = begin, end
+        remember_year_fields(self.selected_layer, begin, end)
+        self.logger.info(f"Year fields of {self.selected_layer.name()} set to {begin}, {end}")
+        self.update_date_inputs()
+        self.histogram_task = None # Build the histogram for the new fields
+        self._histogram_failed = False
+        self.spatiotemporal_task = None
+        self.reset_estimation()
+        self.update_count_preview()
+
+    def update_date_inputs(self):
+        """Offer day precision only when both year fields are date fields"""
+        fields = self.selected_layer.fields()
+        self._date_fields = all(fields.indexOf(name) >= 0 and field_kind(fields.field(name)) == "date"
+                                for name in (self.begin_field_name, self.end_field_name))
+        self.date_row.setVisible(self._date_fields)
+        if not self._date_fields:
+            # Quietly: the window of the new layer or fields must not be applied as a side effect
+            self.date_checkbox.blockSignals(True)
+            self.date_checkbox.setChecked(False)
+            self.date_checkbox.blockSignals(False)
+            self.from_date.setEnabled(False)
+            self.to_date.setEnabled(False)
+
+    def update_estimate_input(self):
+        """Offer estimation only for PostgreSQL layers, whose statistics it reads"""
+        available = self.selected_layer.providerType() == "postgres"
+        self.estimate_checkbox.setEnabled(available)
+        if not available:
+            self.estimate_checkbox.setChecked(False)
+
+    def reset_estimation(self):
+        """Forget the estimate state of the previous layer or fields"""
+        self.estimate_task = None
+        self._estimate_failed = False
+        self.exact_counts = {}
+
+    def toggle_estimation(self, checked):
+        """Switch the count preview between exact counts and estimates"""
+        self.logger.debug(f"Estimation mode {'enabled' if checked else 'disabled'}.")
+        self.exact_count_btn.setVisible(checked)
+        self.update_count_preview()
+
+    def show_estimate(self):
+        """Show the estimated count of the current window, or an exact count the user asked for"""
+        window = (self.from_year.value(), self.to_year.value())
+        exact = self.exact_counts.get(window)
+        if exact is not None:
+            self.count_preview.setText(f"{exact} objecten (exact)")
+            return
+        estimator = self.index_manager.cached_estimator(
+            self.selected_layer, self.from_property.text(), self.to_property.text())
+        if estimator is None:
+            if self._estimate_failed:
+                self.count_preview.setText("Geen schatting beschikbaar")
+            else:
+                self.count_preview.setText("Schatting wordt opgehaald...")
+                self.start_estimate_task()
+            return
+        estimate = estimator.estimate(*window)
+        self.count_preview.setText(f"{estimate.describe()} objecten" if estimate is not None else "")
+
+    def start_estimate_task(self):
+        """Read the table statistics (or a sample) in the background, once per layer and fields"""
+        if self.estimate_task is not None:
+            return
+        if self.pushdown is None:
+            self.pushdown = FilterPushdown(self.selected_layer)
+        task = EstimateTask(self.selected_layer, self.from_property.text(), self.to_property.text(),
+                            self.pushdown, self.index_manager)
+        task.taskCompleted.connect(lambda: self.on_estimate_done(task, True))
+        task.taskTerminated.connect(lambda: self.on_estimate_done(task, False))
+        self.estimate_task = start_task(task)
+
+    def on_estimate_done(self, task, succeeded):
+        """Show the estimate once the estimator is ready, unless the layer or fields changed meanwhile"""
+        if task is not self.estimate_task:
+            return
+        self.estimate_task = None
+        self._estimate_failed = not succeeded
+        if not succeeded and task.error:
+            self.status_label.setText(f"Geen schatting: {task.error}")
+        self.update_count_preview()
+
+    def count_exactly(self):
+        """Count the current window exactly in the background"""
+        window = (self.from_year.value(), self.to_year.value())
+        if self.pushdown is None:
+            self.pushdown = FilterPushdown(self.selected_layer)
+        task = ExactCountTask(self.selected_layer, self.from_property.text(), self.to_property.text(),
+                              window, self.pushdown)
+        layer_id = self.selected_layer.id()
+        task.taskCompleted.connect(lambda: self.on_exact_count(task, layer_id))
+        task.taskTerminated.connect(lambda: self.status_label.setText(""))
+        start_task(task)
+        self.status_label.setText(f"Exact tellen van {window[0]}-{window[1]}...")
+
+    def on_exact_count(self, task, layer_id):
+        """Remember and show an exact count"""
+        self.status_label.setText("")
+        if self.selected_layer is None or self.selected_layer.id() != layer_id:
+            return
+        self.exact_counts[task.window] = task.count
+        self.logger.info(f"Exact count of {task.window[0]}-{task.window[1]} in {task.layer_name}: {task.count}")
+        self.update_count_preview()
+
+    def toggle_date_precision(self, checked):
+        """Switch between whole years and day precision, starting from the current year window"""
+        if checked:
+            for date_edit in (self.from_date, self.to_date):
+                date_edit.blockSignals(True)
+            self.from_date.setDate(QDate(self.from_year.value(), 1, 1))
+            self.to_date.setDate(QDate(self.to_year.value(), 12, 31))
+            for date_edit in (self.from_date, self.to_date):
+                date_edit.blockSignals(False)
+        self.from_date.setEnabled(checked)
+        self.to_date.setEnabled(checked)
+        # The scrub overlay steps through years or days, so a running session starts over in the new unit
+        if self.scrub_session is not None:
+            self.stop_scrubbing()
+        self.on_year_window_changed()
+
+    def use_date_precision(self):
+        """True when the filter compares dates instead of whole years"""
+        return self._date_fields and self.date_checkbox.isChecked()
+
+    def date_window(self):
+        """(from, to) as datetime.date values from the date inputs"""
+        return self.from_date.date().toPyDate(), self.to_date.date().toPyDate()
+
+    def current_window(self):
+        """The window every action works on: dates with day precision on, else the years of the spinboxes"""
+        if self.use_date_precision():
+            return self.date_window()
+        return self.from_year.value(), self.to_year.value()
+
     def increase_year_range(self):
         """Increases both 'From Year' and 'To Year' by 1."""
         self.logger.debug("Increasing year range by 1.")
@@ -242,11 +683,16 @@ class YearRangeFilterDialog(QDialog):
         current_to = self.to_year.value()
         
         # Ensure we don't exceed max range of spinboxes
-        if current_from < self.from_year.maximum():
-            self.from_year.setValue(current_from + 1)
-        if current_to < self.to_year.maximum():
-            self.to_year.setValue(current_to + 1)
+        self._adjusting_window = True
+        try:
+            if current_from < self.from_year.maximum():
+                self.from_year.setValue(current_from + 1)
+            if current_to < self.to_year.maximum():
+                self.to_year.setValue(current_to + 1)
+        finally:
+            self._adjusting_window = False
         self.logger.debug(f"New range: {self.from_year.value()}-{self.to_year.value()}")
+        self.on_year_window_changed()
 
     def decrease_year_range(self):
         """Decreases both 'From Year' and 'To Year' by 1."""
@@ -255,11 +701,338 @@ class YearRangeFilterDialog(QDialog):
         current_to = self.to_year.value()
 
         # Ensure we don't go below min range of spinboxes
-        if current_from > self.from_year.minimum():
-            self.from_year.setValue(current_from - 1)
-        if current_to > self.to_year.minimum():
-            self.to_year.setValue(current_to - 1)
+        self._adjusting_window = True
+        try:
+            if current_from > self.from_year.minimum():
+                self.from_year.setValue(current_from - 1)
+            if current_to > self.to_year.minimum():
+                self.to_year.setValue(current_to - 1)
+        finally:
+            self._adjusting_window = False
         self.logger.debug(f"New range: {self.from_year.value()}-{self.to_year.value()}")
+        self.on_year_window_changed()
+
+    def slide_year_range(self, value):
+        """Move the window so it starts at the slider value, keeping its width"""
+        width = self.to_year.value() - self.from_year.value()
+        self._adjusting_window = True
+        try:
+            self.from_year.setValue(value)
+            self.to_year.setValue(min(value + width, self.to_year.maximum()))
+        finally:
+            self._adjusting_window = False
+        self.on_year_window_changed()
+
+    def on_year_window_changed(self, *args):
+        """Keep the slider in sync and advance the scrub overlay when the window changes"""
+        if self._adjusting_window:
+            return
+        self.year_slider.blockSignals(True)
+        self.year_slider.setValue(self.from_year.value())
+        self.year_slider.blockSignals(False)
+        self.update_count_preview()
+        # An active render filter follows the window live: it only costs a repaint
+        if self.filter_mode() == MODE_RENDER and render_filter_for(self.selected_layer).active:
+            render_filter_for(self.selected_layer).apply(
+                self.from_property.text(), self.to_property.text(), *self.current_window())
+        if self.playback_checkbox.isChecked():
+            self.play_current_window()
+        elif self.scrub_checkbox.isChecked() or self.temporal_sync is not None:
+            self.scrub_to_current_window()
+        elif self.live_checkbox.isChecked():
+            self.schedule_live_apply()
+
+    def toggle_live_mode(self, checked):
+        """Start or stop applying the window automatically"""
+        self.logger.debug(f"Live mode {'enabled' if checked else 'disabled'}.")
+        if not checked:
+            self.live_timer.stop()
+        elif not self.scrub_checkbox.isChecked():
+            self.schedule_live_apply()
+
+    def schedule_live_apply(self):
+        """Coalesce rapid window changes: drop the running filter and restart the debounce timer"""
+        self.cancel_filter_task()
+        self.live_timer.start()
+
+    def apply_live_window(self):
+        """Apply the latest window without closing the dialog or filling the message bar"""
+        from_value, to_value = self.current_window()
+        if from_value > to_value:
+            self.status_label.setText("'Van Jaar' ligt na 'Tot Jaar'; filter niet toegepast.")
+            return
+        self._live_update = True
+        try:
+            self.apply_filter()
+        finally:
+            self._live_update = False
+
+    def cached_count(self, from_year_val, to_year_val):
+        """Matching count from the histogram, a cached index or snapshot; None if none can answer without a scan"""
+        from_property_name = self.from_property.text()
+        to_property_name = self.to_property.text()
+        if isinstance(from_year_val, datetime.date):
+            # Day windows are only answered by an index of date ordinals
+            index = self.index_manager.cached_index(self.selected_layer, from_property_name, to_property_name, "day")
+            return index.count(from_year_val.toordinal(), to_year_val.toordinal()) if index is not None else None
+        histogram = self.index_manager.cached_histogram(self.selected_layer, from_property_name, to_property_name)
+        count = histogram.count(from_year_val, to_year_val) if histogram is not None else None
+        if count is None:
+            # 'Van' after 'Tot' needs both years per feature, so only an existing index can answer it
+            index = self.index_manager.cached_index(self.selected_layer, from_property_name, to_property_name)
+            if index is None:
+                index = self.index_manager.cached_snapshot(self.selected_layer, from_property_name, to_property_name)
+            count = index.count(from_year_val, to_year_val) if index is not None else None
+        return count
+
+    def update_count_preview(self):
+        """Show the number of matching features for the current window, in O(1) from the year histogram"""
+        if self.use_date_precision():
+            count = self.cached_count(*self.current_window())
+            self.count_preview.setText(f"{count} objecten" if count is not None else
+                                       "Aantal objecten volgt bij toepassen")
+            return
+        if self.estimate_checkbox.isChecked():
+            # Never scan a table that is too large to count
+            self.show_estimate()
+            return
+        if self.index_manager.cached_histogram(
+                self.selected_layer, self.from_property.text(), self.to_property.text()) is None:
+            if self._histogram_failed:
+                self.count_preview.setText("Aantal objecten niet beschikbaar")
+            else:
+                self.count_preview.setText("Aantal objecten wordt berekend...")
+                self.start_histogram_task()
+            return
+        count = self.cached_count(self.from_year.value(), self.to_year.value())
+        text = f"{count} objecten" if count is not None else ""
+        if self.extent_checkbox.isChecked():
+            index = self.spatiotemporal_index()
+            if index is None:
+                text += " (kaartbeeld wordt geïndexeerd...)"
+            else:
+                visible = index.count(self.visible_extent(), self.from_year.value(), self.to_year.value())
+                text += f" ({visible} in kaartbeeld)"
+        self.count_preview.setText(text)
+        refresh_snapshot_if_stale(self.selected_layer, self.from_property.text(), self.to_property.text(),
+                                  self.index_manager)
+
+    def start_histogram_task(self):
+        """Build the year histogram in the background, once per dialog"""
+        if self.histogram_task is not None:
+            return
+        task = HistogramTask(self.selected_layer, self.from_property.text(), self.to_property.text(),
+                             self.index_manager, self.from_year.minimum(), self.from_year.maximum())
+        task.taskCompleted.connect(lambda: self.on_histogram_ready(task, True))
+        task.taskTerminated.connect(lambda: self.on_histogram_ready(task, False))
+        self.histogram_task = start_task(task)
+
+    def on_histogram_ready(self, task, succeeded):
+        """Refresh the preview once the histogram has been built, unless the layer or fields changed meanwhile"""
+        if task is not self.histogram_task or not self._layer_bound:
+            return
+        self.histogram_task = None
+        self._histogram_failed = not succeeded
+        self.update_count_preview()
+
+    def toggle_extent_mode(self, checked):
+        """Follow the canvas extent in the count preview and selection, or stop doing so"""
+        self.logger.debug(f"Extent mode {'enabled' if checked else 'disabled'}.")
+        canvas = self.iface.mapCanvas()
+        if checked:
+            canvas.extentsChanged.connect(self.update_count_preview)
+        else:
+            try:
+                canvas.extentsChanged.disconnect(self.update_count_preview)
+            except (TypeError, RuntimeError):
+                pass # Not connected
+        self.update_count_preview()
+
+    def spatiotemporal_index(self):
+        """The spatio-temporal index of the selected layer; starts building it and returns None if missing"""
+        index = self.index_manager.cached_spatiotemporal(
+            self.selected_layer, self.from_property.text(), self.to_property.text())
+        if index is None and self.spatiotemporal_task is None:
+            task = SpatioTemporalIndexTask(self.selected_layer, self.from_property.text(), self.to_property.text(),
+                                           self.index_manager)
+            task.taskCompleted.connect(self.on_spatiotemporal_ready)
+            task.taskTerminated.connect(self.on_spatiotemporal_ready)
+            self.spatiotemporal_task = start_task(task)
+        return index
+
+    def on_spatiotemporal_ready(self):
+        """Refresh the preview once the spatio-temporal index has been built"""
+        self.spatiotemporal_task = None
+        if self._layer_bound or not self.docked:
+            self.update_count_preview()
+
+    def visible_extent(self):
+        """The canvas extent in the selected layer's coordinates"""
+        canvas = self.iface.mapCanvas()
+        return canvas.mapSettings().mapToLayerCoordinates(self.selected_layer, canvas.extent())
+
+    def toggle_scrub_mode(self, checked):
+        """Start or stop the incremental scrub overlay"""
+        self.logger.debug(f"Scrub mode {'enabled' if checked else 'disabled'}.")
+        if checked:
+            self.scrub_to_current_window()
+        else:
+            self.stop_scrubbing()
+
+    def scrubs_by_day(self):
+        """True when the scrub overlay steps through day windows; the temporal controller's frames hold years"""
+        return self.use_date_precision() and self.temporal_sync is None
+
+    def scrub_to_current_window(self):
+        """Show the current window in the scrub overlay, updating only the changed features"""
+        if self.scrubs_by_day():
+            from_date, to_date = self.date_window()
+            window = (from_date.toordinal(), to_date.toordinal()) # The day index holds date ordinals
+        else:
+            window = (self.from_year.value(), self.to_year.value())
+        try:
+            if self.scrub_session is None:
+                self.scrub_session = ScrubSession(self.selected_layer, self.scrub_index())
+            changed = self.scrub_session.step(window)
+            self.logger.debug(f"Scrubbed to {window[0]}-{window[1]}: {changed} features changed")
+        except Exception as e:
+            error_msg = f"Error while scrubbing layer {self.selected_layer.name()}: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            self.stop_temporal_sync()
+            self.stop_scrubbing()
+            for checkbox in (self.scrub_checkbox, self.temporal_checkbox):
+                checkbox.blockSignals(True)
+                checkbox.setChecked(False)
+                checkbox.blockSignals(False)
+            if self.iface:
+                self.iface.messageBar().pushMessage("Error", error_msg, level=Qgis.Critical, duration=5)
+            else:
+                QMessageBox.critical(self, "Error", error_msg)
+
+    def scrub_index(self):
+        """The precomputed animation frames while following the temporal controller, else the interval index"""
+        if self.temporal_sync is not None and self.temporal_sync.frames is not None:
+            return self.temporal_sync.frames
+        return self.year_index("day" if self.scrubs_by_day() else "year")
+
+    def toggle_temporal_sync(self, checked):
+        """Start or stop following the QGIS temporal controller"""
+        self.logger.debug(f"Temporal controller sync {'enabled' if checked else 'disabled'}.")
+        if not checked:
+            self.stop_temporal_sync()
+            if not self.scrub_checkbox.isChecked():
+                self.stop_scrubbing()
+            return
+        try:
+            self.temporal_sync = TemporalSync(self.iface.mapCanvas().temporalController(), self.selected_layer,
+                                              self.from_property.text(), self.to_property.text(),
+                                              self.index_manager, self.on_temporal_window, self.on_frames_ready)
+            self.temporal_sync.start()
+            self.iface.messageBar().pushMessage(
+                "Info", f"Laag '{self.selected_layer.name()}' volgt nu de tijdbeheerder.", level=Qgis.Info, duration=3)
+        except Exception as e:
+            error_msg = f"Error following the temporal controller for layer {self.selected_layer.name()}: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            self.stop_temporal_sync()
+            self.temporal_checkbox.blockSignals(True)
+            self.temporal_checkbox.setChecked(False)
+            self.temporal_checkbox.blockSignals(False)
+            self.iface.messageBar().pushMessage("Error", error_msg, level=Qgis.Critical, duration=5)
+
+    def on_temporal_window(self, window):
+        """Show the temporal controller's current frame in the spinboxes and the scrub overlay"""
+        self._adjusting_window = True
+        try:
+            self.from_year.setValue(window[0])
+            self.to_year.setValue(window[1])
+        finally:
+            self._adjusting_window = False
+        self.year_slider.blockSignals(True)
+        self.year_slider.setValue(self.from_year.value())
+        self.year_slider.blockSignals(False)
+        self.update_count_preview()
+        self.scrub_to_current_window()
+
+    def on_frames_ready(self, frames):
+        """Let a running scrub session step through the precomputed frames"""
+        self.logger.debug(f"{len(frames)} animation frames ready for {self.selected_layer.name()}")
+        if self.scrub_session is not None:
+            self.scrub_session.index = frames
+
+    def stop_temporal_sync(self):
+        """Stop following the temporal controller; the layer keeps its temporal properties"""
+        if self.temporal_sync is not None:
+            self.temporal_sync.stop()
+            self.temporal_sync = None
+
+    def stop_scrubbing(self):
+        """Remove the scrub overlay, if any, and show the source layer again"""
+        if self.scrub_session is not None:
+            self.scrub_session.stop()
+            self.scrub_session = None
+
+    def toggle_playback(self, checked):
+        """Start or stop showing pre-rendered year windows"""
+        self.logger.debug(f"Playback mode {'enabled' if checked else 'disabled'}.")
+        if checked:
+            self.play_current_window()
+        else:
+            self.stop_playback()
+
+    def set_playback_jobs(self, value):
+        """Store the render concurrency limit and apply it to running playback"""
+        QSettings().setValue(JOBS_SETTINGS_KEY, value)
+        if self.playback is not None:
+            self.playback.max_jobs = value
+
+    def play_current_window(self):
+        """Show the current window from the playback cache and render its neighbours ahead"""
+        try:
+            if self.playback is None:
+                self.playback = YearPlayback(self.iface.mapCanvas(), self.selected_layer, self.from_property.text(),
+                                             self.to_property.text(), max_jobs=self.playback_jobs.value())
+            self.playback.show(self.current_window())
+        except Exception as e:
+            error_msg = f"Error during playback of layer {self.selected_layer.name()}: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            self.stop_playback()
+            self.playback_checkbox.blockSignals(True)
+            self.playback_checkbox.setChecked(False)
+            self.playback_checkbox.blockSignals(False)
+            self.iface.messageBar().pushMessage("Error", error_msg, level=Qgis.Critical, duration=5)
+
+    def stop_playback(self):
+        """Remove the playback image and free the cached renders"""
+        if self.playback is not None:
+            self.playback.stop()
+            self.playback = None
+
+    def stop_interactive_modes(self):
+        """Stop live updates, playback, scrubbing and following the canvas extent or temporal controller"""
+        self.live_timer.stop()
+        self.stop_playback()
+        self.stop_temporal_sync()
+        self.stop_scrubbing()
+        if self._ui_initialized:
+            if self.extent_checkbox.isChecked():
+                self.extent_checkbox.blockSignals(True)
+                self.extent_checkbox.setChecked(False)
+                self.extent_checkbox.blockSignals(False)
+                try:
+                    self.iface.mapCanvas().extentsChanged.disconnect(self.update_count_preview)
+                except (TypeError, RuntimeError):
+                    pass # Not connected
+            for checkbox in (self.scrub_checkbox, self.playback_checkbox, self.temporal_checkbox):
+                checkbox.blockSignals(True)
+                checkbox.setChecked(False)
+                checkbox.blockSignals(False)
+
+    def done(self, result):
+        """Make sure the scrub overlay, playback and live updates never outlive the dialog"""
+        if self.docked:
+            return # The docked panel stays open after applying; YearRangeFilterDock cleans it up
+        self.stop_interactive_modes()
+        super(YearRangeFilterDialog, self).done(result)
 
 
     def reset_filter(self):
@@ -273,13 +1046,19 @@ class YearRangeFilterDialog(QDialog):
                 QMessageBox.critical(self, "Error", "No layer selected to reset filter.")
             return
         try:
-            self.selected_layer.setSubsetString("") # Empty string removes the subset filter
+            with self.index_manager.ignoring_changes(self.selected_layer), \
+                    timings.span("setSubsetString", self.selected_layer):
+                self.selected_layer.setSubsetString("") # Empty string removes the subset filter
+            render_filter_for(self.selected_layer).clear()
+            comparison_for(self.selected_layer).clear()
             # Force a refresh of the map canvas if an interface is available
             if self.iface and self.iface.mapCanvas():
-                self.iface.mapCanvas().refresh()
+                with timings.span("mapCanvas.refresh", self.selected_layer):
+                    self.iface.mapCanvas().refresh()
             # Also refresh layer's feature count if displayed in legend
             if self.iface and self.iface.layerTreeView():
-                self.iface.layerTreeView().refreshLayerSymbology(self.selected_layer.id())
+                with timings.span("refreshLayerSymbology", self.selected_layer):
+                    self.iface.layerTreeView().refreshLayerSymbology(self.selected_layer.id())
 
 
             message = f"Filter reset for layer: {self.selected_layer.name()}"
@@ -297,6 +1076,124 @@ class YearRangeFilterDialog(QDialog):
             else:
                 QMessageBox.critical(self, "Error", error_msg)
 
+    def year_index(self, precision="year"):
+        """Return the interval index for the selected layer and configured fields"""
+        return self.index_manager.index_for(
+            self.selected_layer, self.from_property.text(), self.to_property.text(), precision)
+
+    def matching_count(self, from_year_val, to_year_val):
+        """Number of features in the year window, falling back to featureCount() if indexing fails"""
+        try:
+            return self.year_index().count(from_year_val, to_year_val)
+        except Exception as e:
+            self.logger.warning(f"Interval index unavailable, falling back to featureCount(): {str(e)}")
+            with timings.span("featureCount", self.selected_layer):
+                return self.selected_layer.featureCount()
+
+    def matching_feature_ids(self, from_year_val, to_year_val):
+        """Feature ids in the year window, from the snapshot of a remote layer or else the interval index.
+
+        With "Alleen kaartbeeld" checked only the features in the canvas extent
+        are returned, once the spatio-temporal index is available. Day windows
+        (datetime.date values) are answered by the index of date ordinals.
+        """
+        if isinstance(from_year_val, datetime.date):
+            fids = self.year_index("day").feature_ids(from_year_val.toordinal(), to_year_val.toordinal())
+            if self.extent_checkbox.isChecked():
+                index = self.spatiotemporal_index()
+                if index is not None:
+                    visible = index.feature_ids(self.visible_extent(), from_year_val.year, to_year_val.year)
+                    fids = set(fids) & set(visible)
+            return fids
+        if self.extent_checkbox.isChecked():
+            index = self.spatiotemporal_index()
+            if index is not None:
+                return index.feature_ids(self.visible_extent(), from_year_val, to_year_val)
+        snapshot = self.index_manager.cached_snapshot(
+            self.selected_layer, self.from_property.text(), self.to_property.text())
+        if snapshot is not None:
+            return snapshot.feature_ids(from_year_val, to_year_val)
+        return self.year_index().feature_ids(from_year_val, to_year_val)
+
+    def select_window(self):
+        """Select the features in the year window by id, without a provider query for remote layers"""
+        from_year_val, to_year_val = self.current_window()
+        try:
+            with timings.span("select window", self.selected_layer):
+                fids = list(self.matching_feature_ids(from_year_val, to_year_val))
+                self.selected_layer.selectByIds(fids)
+            message = (f"{len(fids)} objecten geselecteerd in laag '{self.selected_layer.name()}' "
+                       f"({from_year_val}-{to_year_val}).")
+            self.logger.info(message)
+            if self.iface:
+                self.iface.messageBar().pushMessage("Success", message, level=Qgis.Success, duration=3)
+        except Exception as e:
+            error_msg = f"Error selecting features in layer {self.selected_layer.name()}: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            if self.iface:
+                self.iface.messageBar().pushMessage("Error", error_msg, level=Qgis.Critical, duration=5)
+            else:
+                QMessageBox.critical(self, "Error", error_msg)
+
+    def export_window(self):
+        """Stream the features of the year window to a GeoPackage, FlatGeobuf or CSV file in the background"""
+        window = self.current_window()
+        default_name = f"{self.selected_layer.name()}_{window[0]}_{window[1]}.gpkg"
+        path, _ = QFileDialog.getSaveFileName(self, "Jaarbereik exporteren", default_name,
+                                              "GeoPackage (*.gpkg);;FlatGeobuf (*.fgb);;CSV (*.csv)")
+        if not path:
+            return
+        try:
+            task = ExportWindowTask(self.selected_layer, self.from_property.text(), self.to_property.text(),
+                                    window, path, iface=self.iface, attributes=self.export_attributes())
+            start_task(task)
+            self.logger.info(f"Exporting {window[0]}-{window[1]} from {self.selected_layer.name()} to {path}")
+            if self.iface:
+                self.iface.messageBar().pushMessage("Info", f"Export naar {path} gestart...", level=Qgis.Info, duration=2)
+        except Exception as e:
+            error_msg = f"Error exporting year window from layer {self.selected_layer.name()}: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            if self.iface:
+                self.iface.messageBar().pushMessage("Error", error_msg, level=Qgis.Critical, duration=5)
+            else:
+                QMessageBox.critical(self, "Error", error_msg)
+
+    def compare_windows(self):
+        """Count several year windows in one pass and style the layer by the windows each feature overlaps"""
+        try:
+            windows = parse_windows(self.compare_windows_input.text())
+            if len(windows) > MAX_WINDOWS:
+                raise ValueError(f"At most {MAX_WINDOWS} year windows can be compared")
+        except ValueError as e:
+            self.status_label.setText(f"Ongeldige jaarbereiken: {str(e)}")
+            return
+        try:
+            # The comparison shows the whole layer, so an active year filter is lifted first
+            self.stop_interactive_modes()
+            self.cancel_filter_task()
+            render_filter_for(self.selected_layer).clear()
+            if self.selected_layer.subsetString():
+                with self.index_manager.ignoring_changes(self.selected_layer):
+                    self.selected_layer.setSubsetString("")
+            task = MultiWindowTask(self.selected_layer, self.from_property.text(), self.to_property.text(),
+                                   windows, self.index_manager, iface=self.iface)
+            start_task(task)
+            self.logger.info(f"Comparing {len(windows)} year windows on {self.selected_layer.name()}")
+            self.status_label.setText("Jaarbereiken worden vergeleken...")
+            task.taskCompleted.connect(lambda: self.status_label.setText(""))
+            task.taskTerminated.connect(lambda: self.status_label.setText(""))
+        except Exception as e:
+            error_msg = f"Error comparing year windows on layer {self.selected_layer.name()}: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            if self.iface:
+                self.iface.messageBar().pushMessage("Error", error_msg, level=Qgis.Critical, duration=5)
+            else:
+                QMessageBox.critical(self, "Error", error_msg)
+
+    def clear_comparison(self):
+        """Remove the comparison style from the selected layer"""
+        comparison_for(self.selected_layer).clear()
+
     def apply_filter(self):
         """Apply the year range filter to the selected layer"""
         self.logger.debug("Apply filter called.")
@@ -309,8 +1206,7 @@ class YearRangeFilterDialog(QDialog):
             return
 
         try:
-            from_year_val = self.from_year.value()
-            to_year_val = self.to_year.value()
+            from_year_val, to_year_val = self.current_window()
             
             # It's good practice to ensure 'from_year_val' is not greater than 'to_year_val'
             if from_year_val > to_year_val:
@@ -326,32 +1222,39 @@ class YearRangeFilterDialog(QDialog):
                              f"Properties: '{from_property_name}', '{to_property_name}'. "
                              f"Year range: {from_year_val}-{to_year_val}")
 
-            # Construct the filter expression
-            # Ensure property names are correctly quoted if they contain spaces or special characters.
-            # QGIS usually requires double quotes for field names.
-            expr = f'"{from_property_name}" <= {to_year_val} AND "{to_property_name}" >= {from_year_val}'
-            self.logger.debug(f"Filter expression: {expr}")
-
-            self.selected_layer.setSubsetString(expr)
-            
-            # Force a refresh of the map canvas and legend
-            if self.iface and self.iface.mapCanvas():
-                self.iface.mapCanvas().refresh()
-            if self.iface and self.iface.layerTreeView():
-                 self.iface.layerTreeView().refreshLayerSymbology(self.selected_layer.id())
-
+            # The real filter replaces the scrub overlay, the temporal controller frames and the playback image
+            self.temporal_checkbox.setChecked(False)
+            self.stop_scrubbing()
+            self.stop_playback()
+            # Only the latest window matters, so a filter still running is superseded
+            self.cancel_filter_task()
+            # A single window replaces the comparison style
+            comparison_for(self.selected_layer).clear()
 
-            # featureCount() on a filtered layer gives the count of matching features
-            filtered_count = self.selected_layer.featureCount()
+            if self.filter_mode() == MODE_RENDER:
+                # The renderer rule takes over from a year filter set earlier in subset mode
+                if is_year_subset(self.selected_layer):
+                    with self.index_manager.ignoring_changes(self.selected_layer):
+                        self.selected_layer.setSubsetString("")
+                self.apply_render_filter(from_property_name, to_property_name, from_year_val, to_year_val)
+                return
+            # Switching back to subset mode removes the renderer rule
+            render_filter_for(self.selected_layer).clear()
 
-            message = f"Filter toegepast op laag '{self.selected_layer.name()}': {filtered_count} objecten komen overeen."
-            self.logger.info(message)
-            if self.iface:
-                self.iface.messageBar().pushMessage("Success", message, level=Qgis.Success, duration=4)
-            else:
-                QMessageBox.information(self, "Success", message)
-            
-            self.accept() # Close the dialog after applying
+            # Validation and counting run in a background task; the subset string
+            # is set and the canvas refreshed on the main thread once it finishes.
+            if self.pushdown is None:
+                self.pushdown = FilterPushdown(self.selected_layer)
+            task = FilterTask(self.selected_layer, from_property_name, to_property_name,
+                              from_year_val, to_year_val, iface=self.iface, index_manager=self.index_manager,
+                              pushdown=self.pushdown, notify=not self._live_update,
+                              estimate=self.estimate_checkbox.isChecked())
+            self.logger.debug(f"Filter expression: {task.expression}")
+            task.progressChanged.connect(self.on_filter_progress)
+            task.taskCompleted.connect(lambda: self.on_filter_task_completed(task))
+            task.taskTerminated.connect(lambda: self.on_filter_task_terminated(task))
+            self.filter_task = start_task(task)
+            self.status_label.setText("Filter wordt toegepast...")
 
         except Exception as e:
             error_msg = f"Error applying filter to layer {self.selected_layer.name()}: {str(e)}"
@@ -362,94 +1265,130 @@ class YearRangeFilterDialog(QDialog):
                 QMessageBox.critical(self, "Error", error_msg)
 
 
-class YearRangeFilterPlugin:
-    def __init__(self, iface):
-        self.iface = iface
-        self.action = None
-        self.dialog = None # Keep track of the dialog instance
-
-        # Setup logging for the plugin itself
-        self.logger = logging.getLogger('YearRangeFilter')
-        # Basic configuration if not already configured by the dialog's logger setup
-        if not self.logger.handlers:
-            self.logger.setLevel(logging.INFO) # Default to INFO for plugin level
-            # Attempt to set up file logging similar to dialog if needed, or console
-            plugin_dir = os.path.dirname(__file__)
-            log_dir = os.path.join(plugin_dir, 'logs')
-            if not os.path.exists(log_dir):
-                try:
-                    os.makedirs(log_dir)
-                except OSError:
-                    pass # Silently fail if log dir cannot be created by plugin main class
+    def filter_mode(self):
+        """MODE_SUBSET or MODE_RENDER, as chosen in the dialog"""
+        return self.mode_combo.currentData()
+
+    def apply_render_filter(self, from_property_name, to_property_name, from_year_val, to_year_val):
+        """Hide features outside the window in the renderer; the provider and its caches are left alone"""
+        with timings.span("render filter", self.selected_layer):
+            render_filter_for(self.selected_layer).apply(from_property_name, to_property_name,
+                                                         from_year_val, to_year_val)
+        if self._live_update:
+            return
+        count = self.cached_count(from_year_val, to_year_val)
+        message = (f"Weergavefilter toegepast op laag '{self.selected_layer.name()}'"
+                   + (f": {count} objecten komen overeen." if count is not None else "."))
+        self.logger.info(message)
+        if self.iface:
+            self.iface.messageBar().pushMessage("Success", message, level=Qgis.Success, duration=4)
+        else:
+            QMessageBox.information(self, "Success", message)
+        self.accept() # Close the dialog after applying
+
+    def on_filter_progress(self, progress):
+        """Show the progress of the running filter task"""
+        self.status_label.setText(f"Filter wordt toegepast... {progress:.0f}%")
 
-            log_file = os.path.join(log_dir, 'year_range_filter_plugin.log') # Different log file for plugin class
+    def on_filter_task_completed(self, task):
+        """Close the dialog once the filter has been applied, unless it was a live update or superseded"""
+        if task is not self.filter_task:
+            return
+        self.filter_task = None
+        self.status_label.setText("")
+        if task.notify:
+            self.accept() # Close the dialog after applying
+
+    def on_filter_task_terminated(self, task):
+        """Keep the dialog open after a failed or canceled filter task"""
+        if task is not self.filter_task:
+            return
+        self.filter_task = None
+        self.status_label.setText("")
+
+    def cancel_filter_task(self):
+        """Cancel the running filter task, if any"""
+        if self.filter_task is not None:
+            self.logger.debug(f"Canceling filter task '{self.filter_task.description()}'")
             try:
-                file_handler = logging.FileHandler(log_file)
-                file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-                self.logger.addHandler(file_handler)
-            except IOError: # Fallback to console if file logging fails
-                ch = logging.StreamHandler()
-                ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-                self.logger.addHandler(ch)
-                self.logger.warning("Plugin file logging failed, using console.")
-        
-        self.logger.info("YearRangeFilterPlugin initialized")
+                self.filter_task.cancel()
+            except RuntimeError:
+                pass # The task manager already deleted the task
+            self.filter_task = None
 
-    def initGui(self):
-        """Initialize the plugin GUI components (action, menu, toolbar)"""
-        from qgis.PyQt.QtWidgets import QAction
-        from qgis.PyQt.QtGui import QIcon # For icon (optional)
+    def reject(self):
+        """Cancel a running filter task before closing"""
+        self.cancel_filter_task()
+        super(YearRangeFilterDialog, self).reject()
 
-        # Optionally, add an icon to your plugin
-        # Ensure you have an 'icon.png' in the same directory as this script,
-        # or update the path accordingly.
-        icon_path = os.path.join(os.path.dirname(__file__), 'icon.png') 
-        
-        self.action = QAction('Kaart Jaar Filter', self.iface.mainWindow())
-        if os.path.exists(icon_path): # Check if icon exists before trying to set it
-             self.action.setIcon(QIcon(icon_path))
-        else:
-            self.logger.warning(f"Plugin icon not found at: {icon_path}")
-
-        self.action.setToolTip("Filter lagen op jaarbereik") # Tooltip for the action
-        self.action.triggered.connect(self.run)
-
-        # Add to toolbar and menu
-        self.iface.addToolBarIcon(self.action)
-        # This adds a new top-level menu named "Kaart Jaar Filter"
-        self.iface.addPluginToMenu('&Kaart Jaar Filter', self.action) 
-        self.logger.debug("Plugin GUI initialized (action, toolbar, menu)")
-
-    def unload(self):
-        """Clean up when plugin is unloaded"""
-        if self.action:
-            self.iface.removeToolBarIcon(self.action)
-            # Correctly remove the plugin menu item using its text and the action
-            self.iface.removePluginMenu('&Kaart Jaar Filter', self.action) 
-            del self.action # Explicitly delete to help with garbage collection
-            self.action = None
-        self.logger.info("YearRangeFilterPlugin unloaded")
-
-    def run(self):
-        """Run the plugin: show the YearRangeFilterDialog"""
-        self.logger.debug("Plugin run method called.")
+    def apply_filter_all_layers(self):
+        """Apply the current window (years, or dates with day precision) to every eligible vector layer in the project"""
+        self.logger.debug("Apply filter to all layers called.")
         try:
-            # Create a new dialog instance each time, or reuse if self.dialog is managed
-            # For modal dialogs, creating a new instance is often simpler.
-            # Pass the QGIS interface (iface) to the dialog
-            dialog = YearRangeFilterDialog(self.iface.mainWindow(), self.iface)
-
-            # The dialog's __init__ now handles checks and might return early if conditions not met.
-            # It sets _ui_initialized flag.
-            if hasattr(dialog, '_ui_initialized') and dialog._ui_initialized:
-                dialog.show()
-                # exec_() is for modal dialogs, it blocks until the dialog is closed.
-                result = dialog.exec_() 
-                self.logger.debug(f"Dialog execution completed with result: {result} (Accepted: {QDialog.Accepted}, Rejected: {QDialog.Rejected})")
-            else:
-                self.logger.warning("Dialog UI was not initialized, not showing. Check logs for reasons (e.g., no layer selected, missing fields).")
-                # No need to show a message here, as the dialog's __init__ should have already shown one.
+            from_year_val, to_year_val = self.current_window()
+            from_property_name = self.from_property.text()
+            to_property_name = self.to_property.text()
+
+            # Like apply_filter: the subset strings replace the overlays, the comparison style and a
+            # renderer rule on the current layer, and a single-layer filter still running is superseded
+            self.live_timer.stop()
+            self.temporal_checkbox.setChecked(False)
+            self.stop_scrubbing()
+            self.stop_playback()
+            self.cancel_filter_task()
+            if self.selected_layer is not None:
+                comparison_for(self.selected_layer).clear()
+                render_filter_for(self.selected_layer).clear()
+            layers = list(QgsProject.instance().mapLayers().values())
+            self.logger.info(f"Applying filter {from_year_val}-{to_year_val} to all eligible layers "
+                             f"({len(layers)} layers in project)")
+            task = BatchFilterTask(layers, from_property_name, to_property_name, from_year_val, to_year_val,
+                                   iface=self.iface, index_manager=self.index_manager)
+            start_task(task)
+            if self.iface:
+                self.iface.messageBar().pushMessage("Info", f"Filteren van {len(task.jobs)} vectorlagen gestart...", level=Qgis.Info, duration=2)
+
+            self.accept() # The task reports its result in the message bar
 
         except Exception as e:
-            self.logger.error(f"Error running plugin: {str(e)}", exc_info=True)
-            QMessageBox.critical(self.iface.mainWindow(), "Plugin Error", f"An unexpected error occurred while running the plugin: {str(e)}")
+            error_msg = f"Error applying filter to all layers: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            if self.iface:
+                self.iface.messageBar().pushMessage("Error", error_msg, level=Qgis.Critical, duration=5)
+            else:
+                QMessageBox.critical(self, "Error", error_msg)
+
+
+class YearRangeFilterDock(QDockWidget):
+    """Long-lived dock panel hosting one YearRangeFilterDialog that follows the current layer"""
+
+    def __init__(self, iface, index_manager):
+        super(YearRangeFilterDock, self).__init__("Kaart Jaar Filter", iface.mainWindow())
+        self.setObjectName("YearRangeFilterDock") # Lets QGIS restore the dock position
+        self.iface = iface
+        self.panel = YearRangeFilterDialog(self, iface, index_manager, docked=True)
+        self.setWidget(self.panel)
+        iface.currentLayerChanged.connect(self.panel.set_layer)
+        QgsProject.instance().layersWillBeRemoved.connect(self.on_layers_removed)
+
+    def closeEvent(self, event):
+        """Remove overlays when the dock is closed; the per-layer state is kept for reopening"""
+        self.panel.stop_interactive_modes()
+        super(YearRangeFilterDock, self).closeEvent(event)
+
+    def on_layers_removed(self, layer_ids):
+        """Forget the panel state of removed layers"""
+        for layer_id in layer_ids:
+            self.panel.forget_layer(layer_id)
+
+    def cleanup(self):
+        """Disconnect from QGIS and stop everything the panel has running"""
+        for signal, slot in ((self.iface.currentLayerChanged, self.panel.set_layer),
+                             (QgsProject.instance().layersWillBeRemoved, self.on_layers_removed)):
+            try:
+                signal.disconnect(slot)
+            except (TypeError, RuntimeError):
+                pass # Already disconnected
+        self.panel.cancel_filter_task()
+        self.panel.stop_interactive_modes()
+        self.panel.layer_states.clear()
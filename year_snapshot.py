@@ -0,0 +1,82 @@
+"""Compact columnar snapshot of feature id, begin and end year.
+
+Meant for layers behind slow remote providers (WFS, PostGIS over a VPN):
+the three columns are fetched once with an attribute-only request and every
+later window is evaluated locally with vectorised comparisons. NumPy is used
+when it is available (it ships with QGIS on most platforms); otherwise the
+snapshot falls back to plain arrays and a Python loop.
+"""
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the QGIS installation
+    np = None
+
+# Providers where every request is a network round trip
+REMOTE_PROVIDERS = ("WFS", "OAPIF", "postgres", "arcgisfeatureserver", "mssql", "oracle", "hana")
+
+# Seconds after which a snapshot is refreshed in the background
+SNAPSHOT_MAX_AGE = 300
+
+
+class YearSnapshot:
+    """Feature ids with their begin/end years, evaluated as whole columns"""
+
+    def __init__(self, rows, taken_at=None):
+        """Build the snapshot from (fid, begin, end) rows; rows with NULL years never match"""
+        fids = array("q")
+        begins = array("q")
+        ends = array("q")
+        self.skipped = 0  # Rows left out because a year was NULL
+        for fid, begin, end in rows:
+            if begin is None or end is None:
+                self.skipped += 1
+                continue
+            fids.append(fid)
+            begins.append(begin)
+            ends.append(end)
+        if np is not None:
+            self._fids = np.frombuffer(fids, dtype=np.int64) if fids else np.empty(0, dtype=np.int64)
+            self._begins = np.frombuffer(begins, dtype=np.int64) if begins else np.empty(0, dtype=np.int64)
+            self._ends = np.frombuffer(ends, dtype=np.int64) if ends else np.empty(0, dtype=np.int64)
+        else:
+            self._fids, self._begins, self._ends = fids, begins, ends
+        self.taken_at = time.time() if taken_at is None else taken_at
+
+    def __len__(self):
+        """Number of features with both years set"""
+        return len(self._fids)
+
+    def age(self):
+        """Seconds since the snapshot was taken"""
+        return time.time() - self.taken_at
+
+    def is_stale(self, max_age):
+        """True if the snapshot is older than max_age seconds"""
+        return self.age() > max_age
+
+    def _mask(self, from_year, to_year):
+        """Boolean column of features with begin <= to_year and end >= from_year"""
+        return (self._begins <= to_year) & (self._ends >= from_year)
+
+    def count(self, from_year, to_year):
+        """Number of features in the window"""
+        if np is not None:
+            return int(np.count_nonzero(self._mask(from_year, to_year)))
+        return sum(1 for begin, end in zip(self._begins, self._ends) if begin <= to_year and end >= from_year)
+
+    def feature_ids(self, from_year, to_year):
+        """List of fids in the window"""
+        if np is not None:
+            return self._fids[self._mask(from_year, to_year)].tolist()
+        return [fid for fid, begin, end in zip(self._fids, self._begins, self._ends)
+                if begin <= to_year and end >= from_year]
+
+    def rows(self):
+        """Yield the (fid, begin, end) rows of the snapshot"""
+        if np is not None:
+            yield from zip(self._fids.tolist(), self._begins.tolist(), self._ends.tolist())
+        else:
+            yield from zip(self._fids, self._begins, self._ends)